@@ -0,0 +1,10 @@
+import os
+
+from dotenv import load_dotenv
+
+# Same as run.py, for the async serving mode: uvicorn asgi:app
+load_dotenv()
+
+from focus_flow_app.asgi import create_asgi_app  # noqa: E402
+
+app = create_asgi_app(os.getenv("FLASK_CONFIG", "development").lower())
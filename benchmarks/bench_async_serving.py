@@ -0,0 +1,289 @@
+"""Concurrent throughput of the sync and async serving modes.
+
+Seeds a SQLite file, then serves it with gunicorn.conf.py (gthread
+workers, run.py) and with uvicorn (asgi.py), and has --clients keep-alive
+connections request the task list or toggle a task as fast as the server
+answers, for --seconds each.
+
+SQLite answers in microseconds, unlike a database across the network,
+which would leave nothing for async I/O to overlap. --db-latency-ms adds
+a sleep to every statement, on the driver's own thread in both modes. A
+request then waits on the database the way it does in production, without
+using the CPU.
+
+    python benchmarks/bench_async_serving.py --clients 1000 --seconds 20
+    python benchmarks/bench_async_serving.py --clients 1000 --db-latency-ms 0
+
+Needs gunicorn, and the async mode's starlette, uvicorn, a2wsgi and
+aiosqlite.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.util import await_only  # noqa: E402
+
+from config import TestingConfig, config_map  # noqa: E402
+from focus_flow_app.__init__app import create_app  # noqa: E402
+
+# Passed from the benchmark to the servers it starts
+DATABASE_ENV = "BENCH_DATABASE_URL"
+LATENCY_ENV = "BENCH_DB_LATENCY_MS"
+POOL_ENV = "BENCH_POOL_SIZE"
+
+
+def bench_config():
+    class AsyncBenchConfig(TestingConfig):
+        TESTING = False
+        SQLALCHEMY_DATABASE_URI = os.environ[DATABASE_ENV]
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            "pool_size": int(os.environ.get(POOL_ENV, 16)),
+            "max_overflow": 0,
+            "pool_timeout": 60,
+        }
+        SQLITE_PRAGMAS = {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 30_000,
+        }
+        # Only the Flask app has these hooks, leave them out of both modes
+        METRICS_ENABLED = False
+        SQL_PROFILE_HEADER = False
+        RATELIMIT_BACKEND = "none"
+
+    config_map["async_bench"] = AsyncBenchConfig
+
+
+def add_latency():
+    delay = float(os.environ.get(LATENCY_ENV, 0)) / 1000
+    if not delay:
+        return
+
+    def trace(_statement):
+        time.sleep(delay)
+
+    @event.listens_for(Engine, "connect")
+    def slow_down(dbapi_connection, _):
+        # sqlite3 runs the callback on the thread executing the statement:
+        # the request's thread for pysqlite, aiosqlite's own for aiosqlite
+        driver = getattr(dbapi_connection, "driver_connection", None)
+        if driver is None:
+            dbapi_connection.set_trace_callback(trace)
+        else:
+            await_only(driver.set_trace_callback(trace))
+
+
+def wsgi_app():
+    """gunicorn "benchmarks.bench_async_serving:wsgi_app()" """
+    bench_config()
+    add_latency()
+    return create_app("async_bench")
+
+
+def asgi_app():
+    """uvicorn benchmarks.bench_async_serving:asgi_app --factory"""
+    from focus_flow_app.asgi import create_asgi_app
+
+    bench_config()
+    add_latency()
+    return create_asgi_app("async_bench")
+
+
+def start_server(mode, args, env, port):
+    if mode == "sync":
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "benchmarks.bench_async_serving:wsgi_app()",
+        ]
+        env = dict(
+            env,
+            PORT=str(port),
+            WEB_CONCURRENCY=str(args.workers),
+            GUNICORN_THREADS=str(args.threads),
+        )
+    else:
+        command = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "benchmarks.bench_async_serving:asgi_app",
+            "--factory",
+            "--port",
+            str(port),
+            "--workers",
+            str(args.workers),
+            "--backlog",
+            "4096",
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ]
+
+    server = subprocess.Popen(
+        command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health/live").read()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"The {mode} server didn't start")
+
+
+async def read_response(reader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def client(port, users, rng, measure_from, deadline, write_ratio, stats):
+    # Spread the connects out instead of opening every one at once
+    await asyncio.sleep(rng.random())
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.monotonic() < deadline:
+            user = rng.choice(users)
+            auth = f"Authorization: Bearer {user['access_token']}\r\n"
+            if rng.random() < write_ratio:
+                task_id = rng.choice(user["task_ids"])
+                request = (
+                    f"PATCH /api/tasks/{task_id}/done/ HTTP/1.1\r\nHost: bench\r\n"
+                    f"{auth}Content-Length: 0\r\n\r\n"
+                )
+            else:
+                request = (
+                    f"GET /api/tasks/?limit=20 HTTP/1.1\r\nHost: bench\r\n{auth}\r\n"
+                )
+
+            sent = time.monotonic()
+            writer.write(request.encode())
+            status = await read_response(reader)
+            if sent >= measure_from:
+                stats["latencies"].append(time.monotonic() - sent)
+                if status >= 400:
+                    stats["errors"] += 1
+    except (OSError, asyncio.IncompleteReadError):
+        stats["dropped"] += 1
+    finally:
+        writer.close()
+
+
+async def drive(port, users, args):
+    rng = random.Random(args.seed)
+    stats = {"latencies": [], "errors": 0, "dropped": 0}
+    measure_from = time.monotonic() + args.warmup
+    deadline = measure_from + args.seconds
+    await asyncio.gather(
+        *(
+            client(
+                port,
+                users,
+                random.Random(rng.random()),
+                measure_from,
+                deadline,
+                args.write_ratio,
+                stats,
+            )
+            for _ in range(args.clients)
+        )
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="sync mode")
+    parser.add_argument("--pool-size", type=int, default=16)
+    parser.add_argument("--db-latency-ms", type=float, default=2)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    args = parser.parse_args()
+
+    from bench_startup import free_port, pss_mb
+    from loadtest import seed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            **{
+                DATABASE_ENV: f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                LATENCY_ENV: str(args.db_latency_ms),
+                POOL_ENV: str(args.pool_size),
+            },
+        )
+        os.environ.update(env)
+        bench_config()
+        seed_args = argparse.Namespace(
+            users=args.users,
+            tasks=args.tasks,
+            seed=args.seed,
+            hash_method="pbkdf2:sha256:1000",
+        )
+        users = seed(create_app("async_bench"), seed_args)
+
+        print(
+            f"{args.clients} clients, {args.workers} workers, pool {args.pool_size}, "
+            f"{args.db_latency_ms} ms per statement, {args.write_ratio:.0%} writes"
+        )
+        for mode in args.modes:
+            port = free_port()
+            server = start_server(mode, args, env, port)
+            try:
+                stats = asyncio.run(drive(port, users, args))
+                memory = pss_mb(server.pid)[0]
+            finally:
+                server.terminate()
+                server.wait()
+
+            latencies = sorted(stats["latencies"])
+            quantiles = statistics.quantiles(latencies, n=100)
+            label = f"sync ({args.threads} threads)" if mode == "sync" else "async"
+            print(
+                f"{label:<18} {len(latencies) / args.seconds:8.0f} req/s"
+                f"  p50 {quantiles[49] * 1000:7.1f} ms"
+                f"  p95 {quantiles[94] * 1000:7.1f} ms"
+                f"  p99 {quantiles[98] * 1000:7.1f} ms"
+                f"  errors {stats['errors']}  dropped {stats['dropped']}"
+                f"  PSS {memory:.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
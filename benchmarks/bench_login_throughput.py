@@ -0,0 +1,153 @@
+"""Login throughput and latency under concurrent load, inline vs pooled hashing.
+
+Starts the app on a threaded werkzeug server backed by a temporary SQLite
+file, then for each mode has `--clients` threads log in back to back for
+`--seconds` (backing off for Retry-After on a 503) while one more thread
+polls GET /api/health/ to show what the login burst does to cheap
+requests. "inline" is PASSWORD_HASH_WORKERS=0, the old behaviour; "pool"
+uses --workers/--queue-size.
+
+    python benchmarks/bench_login_throughput.py --clients 32 --seconds 10
+    python benchmarks/bench_login_throughput.py --method pbkdf2:sha256:600000
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from werkzeug.serving import make_server  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from config import TestingConfig, config_map  # noqa: E402
+from focus_flow_app.__init__app import create_app, db  # noqa: E402
+from focus_flow_app.models import User  # noqa: E402
+
+EMAIL = "bench@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_mode(args, workers, database_url):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        PASSWORD_HASH_METHOD = args.method
+        PASSWORD_HASH_WORKERS = workers
+        PASSWORD_HASH_QUEUE_SIZE = args.queue_size
+
+    config_map["bench"] = BenchConfig
+    app = create_app("bench")
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(
+            User(
+                username="bench",
+                email=EMAIL,
+                password=generate_password_hash(PASSWORD, args.method),
+            )
+        )
+        db.session.commit()
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port = server.socket.getsockname()[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    body = json.dumps({"email": EMAIL, "password": PASSWORD})
+    deadline = time.perf_counter() + args.seconds
+    logins, health, rejected = [], [], []
+    lock = threading.Lock()
+
+    def login_client():
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            conn.request(
+                "POST",
+                "/api/auth/login",
+                body,
+                {"Content-Type": "application/json"},
+            )
+            response = conn.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status == 200:
+                    logins.append(elapsed)
+                elif response.status == 503:
+                    rejected.append(elapsed)
+                else:
+                    raise RuntimeError(f"unexpected status {response.status}")
+            if response.status == 503:
+                time.sleep(float(response.getheader("Retry-After", 1)))
+
+    def health_client():
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            conn.request("GET", "/api/health/")
+            conn.getresponse().read()
+            health.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_client) for _ in range(args.clients)]
+    threads.append(threading.Thread(target=health_client))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    with app.app_context():
+        db.engine.dispose()
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        "logins_per_sec": round(len(logins) / args.seconds, 1),
+        "login_p50_ms": ms(percentile(logins, 50)),
+        "login_p95_ms": ms(percentile(logins, 95)),
+        "login_p99_ms": ms(percentile(logins, 99)),
+        "rejected_503": len(rejected),
+        "rejected_p50_ms": ms(percentile(rejected, 50)),
+        "health_p50_ms": ms(statistics.median(health) if health else None),
+        "health_p95_ms": ms(percentile(health, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--method", default="scrypt:32768:8:1")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--queue-size", type=int, default=8)
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        results = {
+            "inline": run_mode(args, 0, database_url),
+            "pool": run_mode(args, args.workers, database_url),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""What purging old done tasks buys the requests, and what it costs them.
+
+Seeds a SQLite file with --users x --tasks, --done of them completed more
+than --age-days ago, and times a few requests for one user: the first page
+of the task list, a search and an export of all their tasks. It then runs the
+done_tasks job at each --chunk-sizes, reporting how long it took and its
+longest transaction, the time other writers of the same users can be kept
+waiting. The requests are timed again on the smaller table.
+
+    python benchmarks/bench_maintenance.py --users 200 --tasks 2000
+    python benchmarks/bench_maintenance.py --chunk-sizes 100 500 5000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import event, insert, select  # noqa: E402
+
+from config import TestingConfig, config_map  # noqa: E402
+from focus_flow_app.__init__app import create_app, db  # noqa: E402
+from focus_flow_app.maintenance import database_upkeep  # noqa: E402
+from focus_flow_app.maintenance import purge_done_tasks  # noqa: E402
+from focus_flow_app.models import Task, User  # noqa: E402
+
+REQUESTS = {
+    "list": "/api/tasks/?limit=50",
+    "search": "/api/tasks/search?q=report",
+    "export": "/api/tasks/export",
+}
+
+
+def bench_app(path):
+    class MaintenanceBenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        SQLITE_PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL"}
+        # Every request has to reach the database
+        TASK_CACHE_BACKEND = "none"
+        METRICS_ENABLED = False
+
+    config_map["maintenance_bench"] = MaintenanceBenchConfig
+    return create_app("maintenance_bench")
+
+
+def seed(app, args):
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(
+            insert(User),
+            [
+                {"username": f"u{i}", "email": f"u{i}@example.com", "password": "x"}
+                for i in range(args.users)
+            ],
+        )
+        user_ids = db.session.scalars(select(User.id)).all()
+        rows = []
+        for user_id in user_ids:
+            for j in range(args.tasks):
+                old = rng.random() < args.done
+                age = rng.uniform(args.age_days, args.age_days * 4) if old else 1
+                rows.append(
+                    {
+                        "user_id": user_id,
+                        "name": f"task {j} {rng.choice(['report', 'call', 'buy'])}",
+                        "description": "x" * rng.randint(0, 80),
+                        "done": old or rng.random() < 0.2,
+                        "date": now - timedelta(days=age, minutes=rng.random()),
+                    }
+                )
+                if len(rows) >= 10_000:
+                    db.session.execute(insert(Task), rows)
+                    rows = []
+        if rows:
+            db.session.execute(insert(Task), rows)
+        db.session.commit()
+        database_upkeep(db.engine)
+        return user_ids[len(user_ids) // 2]
+
+
+def time_requests(app, user_id, runs):
+    client = app.test_client()
+    with app.app_context():
+        token = create_access_token(identity=str(user_id))
+    headers = {"Authorization": f"Bearer {token}"}
+    results = {}
+    for name, url in REQUESTS.items():
+        client.get(url, headers=headers)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            # Reads the streamed export to the end
+            response.get_data()
+            assert response.status_code == 200
+            timings.append(time.perf_counter() - start)
+        results[name] = statistics.median(timings) * 1000
+    return results
+
+
+def purge(app, args, chunk_size):
+    transactions = []
+
+    def begin(conn):
+        conn.info["began"] = time.perf_counter()
+
+    def commit(conn):
+        transactions.append(time.perf_counter() - conn.info.pop("began"))
+
+    with app.app_context():
+        event.listen(db.engine, "begin", begin)
+        event.listen(db.engine, "commit", commit)
+        start = time.perf_counter()
+        rows = purge_done_tasks(args.age_days, chunk_size, pause=0)
+        elapsed = time.perf_counter() - start
+        event.remove(db.engine, "begin", begin)
+        event.remove(db.engine, "commit", commit)
+        db.session.remove()
+    return rows, elapsed, max(transactions, default=0.0), len(transactions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--done", type=float, default=0.7, help="share purged")
+    parser.add_argument("--age-days", type=float, default=90)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[100, 500, 5000])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded = os.path.join(tmp, "seeded.db")
+        app = bench_app(seeded)
+        user_id = seed(app, args)
+        with app.app_context():
+            # Checkpoints the WAL, so copying the file copies every row
+            db.engine.dispose()
+
+        print(
+            f"{args.users} users x {args.tasks} tasks, {args.done:.0%} done more "
+            f"than {args.age_days:g} days ago, median of {args.runs} runs"
+        )
+        before = time_requests(app, user_id, args.runs)
+
+        after = None
+        for chunk_size in args.chunk_sizes:
+            # Each chunk size purges its own copy of the seeded database
+            path = os.path.join(tmp, f"chunk-{chunk_size}.db")
+            shutil.copy(seeded, path)
+            app = bench_app(path)
+            rows, elapsed, longest, chunks = purge(app, args, chunk_size)
+            print(
+                f"chunk {chunk_size:>6}: {rows} rows in {elapsed:6.2f} s, "
+                f"{chunks} transactions, longest {longest * 1000:7.1f} ms"
+            )
+            if after is None:
+                with app.app_context():
+                    database_upkeep(db.engine)
+                after = time_requests(app, user_id, args.runs)
+
+        print(f"{'request':<10} {'before':>10} {'after':>10}")
+        for name in REQUESTS:
+            print(f"{name:<10} {before[name]:8.2f}ms {after[name]:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
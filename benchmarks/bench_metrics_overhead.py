@@ -0,0 +1,74 @@
+"""Per-request cost of the metrics hooks in focus_flow_app/metrics.py.
+
+Times GET /api/health/live through the test client with METRICS_ENABLED on
+and off, and the before/after_request hooks on their own.
+
+    python benchmarks/bench_metrics_overhead.py --requests 20000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Response  # noqa: E402
+
+from config import TestingConfig, config_map  # noqa: E402
+from focus_flow_app import metrics  # noqa: E402
+from focus_flow_app.__init__app import create_app  # noqa: E402
+
+
+def app_with_metrics(enabled):
+    class BenchConfig(TestingConfig):
+        METRICS_ENABLED = enabled
+
+    config_map["bench"] = BenchConfig
+    return create_app("bench")
+
+
+def time_requests(app, requests, repeat):
+    client = app.test_client()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get("/api/health/live")
+        runs.append((time.perf_counter() - start) / requests)
+    return statistics.median(runs)
+
+
+def time_hooks(app, requests, repeat):
+    response = Response(b'{"status":"ok"}\n', mimetype="application/json")
+    runs = []
+    with app.test_request_context("/api/health/live"):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(requests):
+                metrics._before_request()
+                metrics._after_request(response)
+                metrics._teardown_request(None)
+            runs.append((time.perf_counter() - start) / requests)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    without = time_requests(app_with_metrics(False), args.requests, args.repeat)
+    enabled = app_with_metrics(True)
+    with_metrics = time_requests(enabled, args.requests, args.repeat)
+    hooks = time_hooks(enabled, args.requests, args.repeat)
+
+    print(f"request without metrics: {without * 1e6:8.1f} us")
+    print(f"request with metrics:    {with_metrics * 1e6:8.1f} us")
+    print(f"hooks alone:             {hooks * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
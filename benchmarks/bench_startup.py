@@ -0,0 +1,180 @@
+"""Cold start of the app, as a freshly booted worker sees it.
+
+Each run starts a new interpreter that imports run.py (what gunicorn does
+to load run:app) and sends the first request through the test client, and
+reports the median of every step across runs. --root points it at another
+checkout, to compare before and after a change:
+
+    python benchmarks/bench_startup.py --runs 20
+    git worktree add /tmp/focus-flow-before HEAD~1
+    python benchmarks/bench_startup.py --runs 20 --root /tmp/focus-flow-before
+
+--gunicorn instead boots gunicorn.conf.py with and without preload_app and
+reports the time until the first request is answered and the proportional
+memory (PSS) of the master and its workers together, Linux only:
+
+    python benchmarks/bench_startup.py --gunicorn --workers 4
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import socket
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD = """
+import json, resource, sys, time
+
+start = time.perf_counter()
+import run
+loaded = time.perf_counter()
+
+# The test client's own imports aren't part of serving a request
+client = run.app.test_client()
+ready = time.perf_counter()
+status = client.get(sys.argv[1]).status_code
+first = time.perf_counter()
+client.get(sys.argv[1])
+second = time.perf_counter()
+
+print(json.dumps({
+    "import_run_ms": (loaded - start) * 1000,
+    "first_request_ms": (first - ready) * 1000,
+    "warm_request_ms": (second - first) * 1000,
+    "modules": len(sys.modules),
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "status": status,
+}))
+"""
+
+
+def run_once(root, config, path):
+    env = dict(os.environ, FLASK_CONFIG=config)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, path],
+        cwd=root,
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def pss_mb(pid):
+    """PSS of a process and its children, shared pages split between them"""
+    pids = [pid]
+    with open(f"/proc/{pid}/task/{pid}/children") as file:
+        pids += [int(child) for child in file.read().split()]
+
+    total = 0
+    for each in pids:
+        with open(f"/proc/{each}/smaps_rollup") as file:
+            for line in file:
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1])
+    return total / 1024, len(pids) - 1
+
+
+def boot_gunicorn(root, config, path, workers, preload):
+    port = free_port()
+    env = dict(
+        os.environ,
+        FLASK_CONFIG=config,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_PRELOAD=str(preload).lower(),
+    )
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "run:app"],
+        cwd=root,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}{path}"
+        while True:
+            try:
+                urllib.request.urlopen(url, timeout=1).read()
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("gunicorn exited") from None
+                time.sleep(0.005)
+        first = time.perf_counter() - start
+
+        # Let every worker boot and answer a few requests before measuring
+        deadline = time.monotonic() + 30
+        while pss_mb(server.pid)[1] < workers and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(1)
+        for _ in range(workers * 20):
+            urllib.request.urlopen(url, timeout=5).read()
+        return first * 1000, pss_mb(server.pid)[0]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--root", default=ROOT, help="checkout to measure")
+    parser.add_argument("--config", default="testing")
+    parser.add_argument("--path", default="/api/health/live")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--gunicorn", action="store_true")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.gunicorn:
+        print(f"gunicorn, {args.workers} workers, median of {args.runs} runs")
+        for preload in (False, True):
+            runs = [
+                boot_gunicorn(args.root, args.config, args.path, args.workers, preload)
+                for _ in range(args.runs)
+            ]
+            first = statistics.median(run[0] for run in runs)
+            pss = statistics.median(run[1] for run in runs)
+            print(
+                f"preload_app={preload!s:<5}  first response {first:7.1f} ms"
+                f"  total PSS {pss:6.1f} MB"
+            )
+        return
+
+    # Once untimed so every timed run reads compiled bytecode
+    run_once(args.root, args.config, args.path)
+    runs = [run_once(args.root, args.config, args.path) for _ in range(args.runs)]
+
+    print(f"{args.root} ({args.config}), median of {args.runs} runs")
+    print(f"status of {args.path}: {runs[0]['status']}")
+    for name, unit in (
+        ("import_run_ms", "ms"),
+        ("first_request_ms", "ms"),
+        ("warm_request_ms", "ms"),
+        ("process_ms", "ms"),
+        ("modules", ""),
+        ("max_rss_mb", "MB"),
+    ):
+        value = statistics.median(run[name] for run in runs)
+        print(f"{name:<18} {value:9.1f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
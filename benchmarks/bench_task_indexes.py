@@ -0,0 +1,209 @@
+"""Query plans and latency for the task access paths, before and after
+the indexes from migration 7c2d9a41f0b3.
+
+Seeds a throwaway database (SQLite file by default, or whatever
+--database-url points at, e.g. a local Postgres), times each query with no
+indexes on `task`, creates the indexes declared on the Task model and times
+them again.
+
+    python benchmarks/bench_task_indexes.py --rows 1000000 --users 1000
+    python benchmarks/bench_task_indexes.py \\
+        --database-url postgresql+psycopg2://localhost/focusflow_bench
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from urllib.parse import parse_qsl
+
+from sqlalchemy import MetaData, create_engine, text
+from werkzeug.datastructures import MultiDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from focus_flow_app.__init__app import create_app  # noqa: E402
+from focus_flow_app.models import Task, User  # noqa: E402
+from focus_flow_app.pagination import encode_cursor  # noqa: E402
+from focus_flow_app.routes.task_routes import (  # noqa: E402
+    parse_task_list_args,
+    task_list_query,
+)
+
+
+def build_schema(engine):
+    """Create bare copies of the user/task tables with no secondary indexes"""
+    metadata = MetaData()
+    user = User.__table__.to_metadata(metadata)
+    task = Task.__table__.to_metadata(metadata)
+    for index in list(task.indexes):
+        task.indexes.discard(index)
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    return user, task
+
+
+def seed(engine, user, task, users, rows, chunk=20_000):
+    start = datetime(2024, 1, 1)
+    rng = random.Random(1234)
+
+    with engine.begin() as conn:
+        conn.execute(
+            user.insert(),
+            [
+                {
+                    "id": uid,
+                    "username": f"user{uid}",
+                    "email": f"user{uid}@example.com",
+                    "password": "x",
+                }
+                for uid in range(1, users + 1)
+            ],
+        )
+
+    for offset in range(0, rows, chunk):
+        batch = [
+            {
+                "id": offset + i + 1,
+                "user_id": rng.randint(1, users),
+                "name": f"task {offset + i}",
+                "description": "benchmark task",
+                "done": rng.random() < 0.3,
+                "date": start + timedelta(seconds=rng.randint(0, 60 * 60 * 24 * 365)),
+            }
+            for i in range(min(chunk, rows - offset))
+        ]
+        with engine.begin() as conn:
+            conn.execute(task.insert(), batch)
+
+
+def list_query(dialect, user_id, query_string):
+    """The statement GET /api/tasks/?<query_string> runs, compiled for the
+    database with its parameters inlined"""
+    with create_app("testing").app_context():
+        view = parse_task_list_args(MultiDict(parse_qsl(query_string)))
+    statement = task_list_query(user_id, view)
+    return str(
+        statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    )
+
+
+def queries(dialect, users, rows):
+    """The statements the task routes issue, with representative parameters.
+    The list views are compiled from the route's own task_list_query"""
+    uid = users // 2
+    cursor = encode_cursor(datetime(2024, 11, 1), 0)
+    return {
+        "list_by_user": (list_query(dialect, uid, "limit=50"), {}),
+        "keyset_deep_page": (
+            list_query(dialect, uid, f"limit=50&cursor={cursor}"),
+            {},
+        ),
+        "open_tasks": (list_query(dialect, uid, "done=false"), {}),
+        "open_newest_first": (
+            list_query(dialect, uid, "done=false&order=desc&limit=50"),
+            {},
+        ),
+        "by_name": (list_query(dialect, uid, "sort=name&limit=50"), {}),
+        "date_range": (
+            list_query(dialect, uid, "from=2024-06-01&to=2024-06-30&sort=date"),
+            {},
+        ),
+        "lookup_by_id_and_owner": (
+            "SELECT id FROM task WHERE id = :id AND user_id = :uid",
+            {"id": rows // 2, "uid": uid},
+        ),
+        "count_for_user": (
+            "SELECT count(*) FROM task WHERE user_id = :uid",
+            {"uid": uid},
+        ),
+    }
+
+
+def explain(conn, sql, params):
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql), params).fetchall()
+    return [row[0] for row in rows]
+
+
+def time_query(conn, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def run_phase(engine, users, rows, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, (sql, params) in queries(engine.dialect, users, rows).items():
+            results[name] = {
+                "plan": explain(conn, sql, params),
+                **time_query(conn, sql, params, repeat),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(), "bench_indexes.db")
+        url = f"sqlite:///{path}"
+
+    engine = create_engine(url)
+    user, task = build_schema(engine)
+
+    print(f"seeding {args.rows} tasks across {args.users} users into {url}")
+    started = time.perf_counter()
+    seed(engine, user, task, args.users, args.rows)
+    print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    before = run_phase(engine, args.users, args.rows, args.repeat)
+
+    with engine.begin() as conn:
+        for index in Task.__table__.indexes:
+            index.create(conn)
+        conn.execute(text("ANALYZE"))
+    after = run_phase(engine, args.users, args.rows, args.repeat)
+
+    for name in before:
+        print(f"\n== {name}")
+        print(f"  before: {before[name]['median_ms']:>9.3f} ms  {before[name]['plan']}")
+        print(f"  after:  {after[name]['median_ms']:>9.3f} ms  {after[name]['plan']}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(
+                {"url": url, "rows": args.rows, "before": before, "after": after},
+                fh,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
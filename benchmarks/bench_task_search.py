@@ -0,0 +1,193 @@
+"""Latency of GET /api/tasks/search queries against the full-text index,
+compared with the ILIKE scan used when there is none.
+
+Seeds a throwaway database (SQLite file by default, or whatever
+--database-url points at, e.g. a local Postgres) with tasks whose names
+and descriptions are drawn from a fixed vocabulary, builds the search index
+from migration c3f4a5b6d7e8 and times a handful of queries for one user.
+
+    python benchmarks/bench_task_search.py --rows 1000000 --users 1000
+    python benchmarks/bench_task_search.py \\
+        --database-url postgresql+psycopg2://localhost/focusflow_bench
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, create_engine, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from focus_flow_app.models import Task, User  # noqa: E402
+from focus_flow_app.search import SQLITE_DDL, SQLITE_REBUILD  # noqa: E402
+from focus_flow_app.search import search_query  # noqa: E402
+
+WORDS = (
+    "buy call email write review plan book fix clean pay send draft read "
+    "prepare schedule update finish check order cancel renew organize "
+    "groceries dentist report invoice meeting taxes garden car kitchen "
+    "presentation budget contract flight hotel birthday gift laundry "
+    "insurance passport library project website backup server newsletter"
+).split()
+
+# Vocabulary words from common to rare, plus a prefix and a miss
+QUERIES = {
+    "one_common_word": ["buy"],
+    "two_words": ["review", "report"],
+    "two_char_prefix": ["pr"],
+    "rare_word": ["zeppelin"],
+    "no_match": ["qqqq"],
+}
+
+
+def build_schema(engine):
+    metadata = MetaData()
+    user = User.__table__.to_metadata(metadata)
+    task = Task.__table__.to_metadata(metadata)
+    # The copy loses the index's dialect condition, build_index adds it
+    for index in list(task.indexes):
+        if index.name == "ix_task_search":
+            task.indexes.discard(index)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    return user, task
+
+
+def seed(engine, user, task, users, rows, chunk=20_000):
+    start = datetime(2024, 1, 1)
+    rng = random.Random(1234)
+
+    with engine.begin() as conn:
+        conn.execute(
+            user.insert(),
+            [
+                {
+                    "id": uid,
+                    "username": f"user{uid}",
+                    "email": f"user{uid}@example.com",
+                    "password": "x",
+                }
+                for uid in range(1, users + 1)
+            ],
+        )
+
+    for offset in range(0, rows, chunk):
+        batch = []
+        for i in range(min(chunk, rows - offset)):
+            description = " ".join(rng.choices(WORDS, k=rng.randint(0, 12)))
+            if rng.random() < 0.001:
+                description += " zeppelin"
+            batch.append(
+                {
+                    "id": offset + i + 1,
+                    "user_id": rng.randint(1, users),
+                    "name": " ".join(rng.choices(WORDS, k=rng.randint(1, 4))),
+                    "description": description,
+                    "done": rng.random() < 0.3,
+                    "date": start
+                    + timedelta(seconds=rng.randint(0, 60 * 60 * 24 * 365)),
+                }
+            )
+        with engine.begin() as conn:
+            conn.execute(task.insert(), batch)
+
+
+def build_index(engine):
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            for statement in (*SQLITE_DDL, SQLITE_REBUILD):
+                conn.exec_driver_sql(statement)
+        else:
+            for index in Task.__table__.indexes:
+                if index.name == "ix_task_search":
+                    index.create(conn)
+        conn.execute(text("ANALYZE"))
+
+
+def time_query(conn, query, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = conn.execute(query).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "rows": len(rows),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def run(engine, dialect, user_id, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, terms in QUERIES.items():
+            results[name] = {
+                "first_page": time_query(
+                    conn, search_query(dialect, user_id, terms, 21, 0), repeat
+                ),
+                "tenth_page": time_query(
+                    conn, search_query(dialect, user_id, terms, 21, 180), repeat
+                ),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+        url = f"sqlite:///{path}"
+
+    engine = create_engine(url)
+    user, task = build_schema(engine)
+
+    print(f"seeding {args.rows} tasks across {args.users} users into {url}")
+    started = time.perf_counter()
+    seed(engine, user, task, args.users, args.rows)
+    print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    build_index(engine)
+    print(f"indexed in {time.perf_counter() - started:.1f}s")
+
+    user_id = args.users // 2
+    dialect = engine.dialect.name
+    # Any other dialect name gets the ILIKE fallback
+    scan = run(engine, "scan", user_id, args.repeat)
+    indexed = run(engine, dialect, user_id, args.repeat)
+
+    for name in QUERIES:
+        print(f"\n== {name}")
+        for page in ("first_page", "tenth_page"):
+            print(
+                f"  {page:<10}  scan: {scan[name][page]['median_ms']:>9.3f} ms"
+                f"  {dialect}: {indexed[name][page]['median_ms']:>9.3f} ms"
+                f"  ({indexed[name][page]['rows']} rows)"
+            )
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(
+                {"url": url, "rows": args.rows, "scan": scan, "indexed": indexed},
+                fh,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Old vs new serialization path for GET /api/tasks/.
+
+The old path loads Task entities, runs validator() on each, builds dicts
+with strftime and encodes with jsonify. The new path selects TASK_COLUMNS as
+tuples and encodes with focus_flow_app.serializers (orjson when installed).
+
+    python benchmarks/bench_task_serialization.py --tasks 10000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import jsonify  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from focus_flow_app import serializers  # noqa: E402
+from focus_flow_app.__init__app import create_app, db  # noqa: E402
+from focus_flow_app.models import Task, User  # noqa: E402
+
+
+def legacy_validator(task):
+    """validator() as it was in task_routes before the serializer rewrite"""
+    elList = [task.user_id, task.name, task.description, task.done, task.date]
+    expectedDict = {0: int, 1: str, 2: str, 3: bool, 4: datetime}
+    for idx in expectedDict.keys():
+        if idx > len(elList):
+            return False
+    for keyIdx, value in expectedDict.items():
+        if not isinstance(elList[keyIdx], value):
+            return False
+    return True
+
+
+def old_path(user_id):
+    db.session.expunge_all()
+    tasks = db.session.scalars(select(Task).where(Task.user_id == user_id)).all()
+    task_list = []
+    for task in tasks:
+        if not legacy_validator(task):
+            raise ValueError(task)
+        task_list.append(
+            {
+                "id": task.id,
+                "name": task.name,
+                "description": task.description,
+                "done": task.done,
+                "date": task.date.strftime("%Y-%m-%d %H:%M"),
+            }
+        )
+    return jsonify(task_list).get_data()
+
+
+def new_path(user_id):
+    rows = (
+        db.session.connection()
+        .execute(select(*serializers.TASK_COLUMNS).where(Task.user_id == user_id))
+        .all()
+    )
+    return serializers.dumps(serializers.task_rows_to_dicts(rows))
+
+
+def measure(func, user_id, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(user_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@example.com", password="x")
+        db.session.add(user)
+        db.session.commit()
+
+        start = datetime(2025, 1, 1)
+        db.session.execute(
+            insert(Task),
+            [
+                {
+                    "user_id": user.id,
+                    "name": f"task {i}",
+                    "description": "a reasonably sized task description " * 2,
+                    "done": i % 3 == 0,
+                    "date": start + timedelta(minutes=i),
+                }
+                for i in range(args.tasks)
+            ],
+        )
+        db.session.commit()
+
+        old_body, new_body = old_path(user.id), new_path(user.id)
+        assert len(old_body) and len(new_body)
+
+        old = measure(old_path, user.id, args.repeat)
+        new = measure(new_path, user.id, args.repeat)
+
+    encoder = "orjson" if serializers.orjson else "json"
+    print(f"{args.tasks} tasks, median of {args.repeat} runs")
+    print(f"  old (ORM + validator + strftime + jsonify): {old:8.2f} ms")
+    print(f"  new (column tuples + isoformat + {encoder}):{new:9.2f} ms")
+    print(f"  speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""Reproducible load test of every auth and task endpoint.
+
+    # seed 100 users x 1000 tasks into a temporary SQLite file, run every
+    # endpoint for 500 requests at 16 concurrent clients, write the results
+    python benchmarks/loadtest.py run --users 100 --tasks 1000 \\
+        --concurrency 16 --requests 500 --output before.json
+
+    # the same against a local Postgres
+    python benchmarks/loadtest.py run \\
+        --database-url postgresql+psycopg2://localhost/focusflow_bench \\
+        --output before.json
+
+    # exits 1 when any endpoint's p95 got more than 10% worse
+    python benchmarks/loadtest.py compare before.json after.json --threshold 0.10
+
+`run` drops and recreates the tables of the database it's given, seeds it
+with Core inserts (--seed keeps the generated data identical between runs),
+serves the app on a threaded werkzeug server and drives each endpoint in
+turn. Each client thread has its own keep-alive connection and acts as one
+of the seeded users. The rate limiter is switched off and passwords are hashed
+with --hash-method so that login numbers measure the route, not scrypt,
+unless asked to.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask_jwt_extended import (  # noqa: E402
+    create_access_token,
+    create_refresh_token,
+)
+from sqlalchemy import insert, select  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+from config import TestingConfig, config_map  # noqa: E402
+from focus_flow_app.__init__app import create_app, db  # noqa: E402
+from focus_flow_app.models import Task, User  # noqa: E402
+
+PASSWORD = "loadtest-password"
+JSON_HEADERS = {"Content-Type": "application/json"}
+# Seeded task names and descriptions are made of these, tasks.search looks
+# them up by prefix
+WORDS = (
+    "buy call email fix plan review write clean book pay groceries report "
+    "dentist garden invoice meeting laundry budget project holiday kitchen "
+    "letter car birthday"
+).split()
+
+
+class Client:
+    """One simulated user: a keep-alive connection, tokens and task ids"""
+
+    def __init__(self, port, user):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        self.user = user
+        self.auth = {"Authorization": f"Bearer {user['access_token']}"}
+        self.created: list[int] = []
+        self.counter = 0
+
+    def request(self, method, path, body=None, headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+            headers = {**JSON_HEADERS, **(headers or {})}
+        self.conn.request(method, path, body, headers or {})
+        response = self.conn.getresponse()
+        data = response.read()
+        return response.status, data
+
+    def task_id(self):
+        return self.task_ids(1)[0]
+
+    def task_ids(self, count):
+        """`count` distinct seeded ids, cycling through the user's tasks"""
+        ids = self.user["task_ids"]
+        self.counter += count
+        return [ids[(self.counter + i) % len(ids)] for i in range(count)]
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f"{prefix}-{self.user['id']}-{threading.get_ident()}-{self.counter}"
+
+
+def op_signup(c):
+    name = c.unique("signup")
+    return c.request(
+        "POST",
+        "/api/auth/signup",
+        {"email": f"{name}@example.com", "name": name, "password": PASSWORD},
+    )
+
+
+def op_login(c):
+    return c.request(
+        "POST", "/api/auth/login", {"email": c.user["email"], "password": PASSWORD}
+    )
+
+
+def op_refresh(c):
+    headers = {"Authorization": f"Bearer {c.user['refresh_token']}"}
+    return c.request("POST", "/api/auth/refresh", headers=headers)
+
+
+def op_logout(c):
+    return c.request("POST", "/api/auth/logout")
+
+
+def op_list(c):
+    return c.request("GET", "/api/tasks/", headers=c.auth)
+
+
+def op_list_page(c):
+    return c.request("GET", "/api/tasks/?limit=50", headers=c.auth)
+
+
+def op_add(c):
+    status, data = c.request(
+        "POST",
+        "/api/tasks/",
+        {"name": c.unique("task"), "description": "load test"},
+        c.auth,
+    )
+    if status == 201:
+        c.created.append(json.loads(data)["id"])
+    return status, data
+
+
+def op_update(c):
+    return c.request(
+        "PATCH",
+        f"/api/tasks/{c.task_id()}/",
+        {"name": c.unique("renamed"), "description": "updated"},
+        c.auth,
+    )
+
+
+def op_done(c):
+    return c.request("PATCH", f"/api/tasks/{c.task_id()}/done/", headers=c.auth)
+
+
+def op_delete(c):
+    # Tasks made by the add run, so the seeded data stays intact
+    task_id = c.created.pop() if c.created else c.task_id()
+    return c.request("DELETE", f"/api/tasks/{task_id}/delete/", headers=c.auth)
+
+
+def op_batch(c):
+    operations = [
+        {"op": "create", "name": c.unique("batch"), "description": "batch"}
+        for _ in range(5)
+    ]
+    operations += [{"op": "toggle", "id": task_id} for task_id in c.task_ids(5)]
+    return c.request("POST", "/api/tasks/batch", {"operations": operations}, c.auth)
+
+
+def op_changes(c):
+    return c.request("GET", "/api/tasks/changes?since=0", headers=c.auth)
+
+
+def op_search(c):
+    word = WORDS[c.counter % len(WORDS)]
+    c.counter += 1
+    # Whole words and prefixes, one or two terms
+    query = word if c.counter % 2 else f"{word[:3]} {WORDS[c.counter % len(WORDS)]}"
+    path = f"/api/tasks/search?q={query.replace(' ', '+')}"
+    return c.request("GET", path, headers=c.auth)
+
+
+def op_stream(c):
+    """Time to the stream's first event. Opens a connection of its own and
+    drops it after that event, the server notices on its next heartbeat."""
+    conn = http.client.HTTPConnection("127.0.0.1", c.conn.port, timeout=60)
+    try:
+        conn.request("GET", "/api/tasks/stream", headers=c.auth)
+        response = conn.getresponse()
+        if response.status != 200:
+            return response.status, response.read()
+        # "retry:" comes first, then a blank line, then the event
+        while not response.readline().startswith(b"event:"):
+            pass
+        return response.status, response.readline()
+    finally:
+        conn.close()
+
+
+def op_export(c):
+    return c.request("GET", "/api/tasks/export?format=ndjson", headers=c.auth)
+
+
+def op_import(c):
+    body = "".join(
+        json.dumps({"name": c.unique("import"), "description": "imported"}) + "\n"
+        for _ in range(100)
+    )
+    headers = {**c.auth, "Content-Type": "application/x-ndjson"}
+    return c.request("POST", "/api/tasks/import?format=ndjson", body, headers)
+
+
+# Run in this order, add before delete so delete has tasks of its own
+ENDPOINTS = {
+    "auth.signup": op_signup,
+    "auth.login": op_login,
+    "auth.refresh": op_refresh,
+    "auth.logout": op_logout,
+    "tasks.list": op_list,
+    "tasks.list_page": op_list_page,
+    "tasks.add": op_add,
+    "tasks.update": op_update,
+    "tasks.done": op_done,
+    "tasks.delete": op_delete,
+    "tasks.batch": op_batch,
+    "tasks.changes": op_changes,
+    "tasks.search": op_search,
+    "tasks.stream": op_stream,
+    "tasks.export": op_export,
+    "tasks.import": op_import,
+}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def make_app(args, database_url):
+    class LoadTestConfig(TestingConfig):
+        TESTING = False
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": args.concurrency, "max_overflow": 0}
+        PASSWORD_HASH_METHOD = args.hash_method
+        RATELIMIT_BACKEND = "none"
+        SQLITE_PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL"}
+        # tasks.stream leaves its streams for the server to notice, the
+        # threaded server takes any number of them
+        TASK_STREAM_HEARTBEAT = 1
+        TASK_STREAM_MAX_PER_WORKER = 0
+
+    config_map["loadtest"] = LoadTestConfig
+    return create_app("loadtest")
+
+
+def seed(app, args):
+    """Recreate the schema and insert args.users x args.tasks deterministically"""
+    rng = random.Random(args.seed)
+    start = datetime(2024, 1, 1)
+    password = generate_password_hash(PASSWORD, args.hash_method)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(
+            insert(User),
+            [
+                {
+                    "username": f"user{i}",
+                    "email": f"user{i}@example.com",
+                    "password": password,
+                }
+                for i in range(args.users)
+            ],
+        )
+        seeded = db.session.execute(select(User.id, User.email).order_by(User.id)).all()
+        user_ids = [user_id for user_id, _ in seeded]
+
+        rows = []
+        for user_id in user_ids:
+            for j in range(args.tasks):
+                rows.append(
+                    {
+                        "user_id": user_id,
+                        "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {j}",
+                        "description": " ".join(
+                            rng.choices(WORDS, k=rng.randint(0, 12))
+                        ),
+                        "done": rng.random() < 0.3,
+                        "date": start + timedelta(minutes=rng.randint(0, 500_000)),
+                    }
+                )
+                if len(rows) >= 10_000:
+                    db.session.execute(insert(Task), rows)
+                    rows = []
+        if rows:
+            db.session.execute(insert(Task), rows)
+        db.session.commit()
+
+        users = []
+        for user_id, email in seeded:
+            task_ids = db.session.scalars(
+                select(Task.id).where(Task.user_id == user_id).order_by(Task.id)
+            ).all()
+            users.append(
+                {
+                    "id": user_id,
+                    "email": email,
+                    "access_token": create_access_token(
+                        identity=str(user_id), expires_delta=timedelta(hours=6)
+                    ),
+                    "refresh_token": create_refresh_token(identity=str(user_id)),
+                    "task_ids": task_ids,
+                }
+            )
+        return users
+
+
+def drive(clients, operation, requests):
+    """Spread `requests` calls of operation over the clients' threads"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker(client):
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                status, _ = operation(client)
+            except (OSError, http.client.HTTPException) as err:
+                status = type(err).__name__
+                client.conn.close()
+            elapsed = time.perf_counter() - start
+            with lock:
+                if isinstance(status, int) and status < 400:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(status)
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in clients]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    result = {
+        "requests": requests,
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+    }
+    if errors:
+        result["error_statuses"] = sorted({str(e) for e in errors})
+    if latencies:
+        result.update(
+            mean_ms=round(sum(latencies) / len(latencies) * 1000, 3),
+            p50_ms=round(percentile(latencies, 50) * 1000, 3),
+            p95_ms=round(percentile(latencies, 95) * 1000, 3),
+            p99_ms=round(percentile(latencies, 99) * 1000, 3),
+        )
+    return result
+
+
+def run(args):
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or "sqlite:///" + os.path.join(
+            tmp, "loadtest.db"
+        )
+        app = make_app(args, database_url)
+
+        seed_start = time.perf_counter()
+        users = seed(app, args)
+        seed_seconds = time.perf_counter() - seed_start
+
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        port = server.socket.getsockname()[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        selected = args.endpoints or list(ENDPOINTS)
+        unknown = set(selected) - set(ENDPOINTS)
+        if unknown:
+            raise SystemExit(f"unknown endpoints: {sorted(unknown)}")
+
+        clients = [Client(port, users[i % len(users)]) for i in range(args.concurrency)]
+        results = {}
+        for name in selected:
+            # Warm up connections and caches without recording
+            drive(clients, ENDPOINTS[name], min(args.warmup, args.requests))
+            results[name] = drive(clients, ENDPOINTS[name], args.requests)
+            line = results[name]
+            print(
+                f"{name:18} {line.get('throughput_rps', 0):>9} req/s"
+                f"  p50 {line.get('p50_ms', '-'):>9} ms"
+                f"  p95 {line.get('p95_ms', '-'):>9} ms"
+                f"  p99 {line.get('p99_ms', '-'):>9} ms"
+                f"  errors {line['errors']}",
+                file=sys.stderr,
+            )
+
+        server.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+            "users": args.users,
+            "tasks_per_user": args.tasks,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "hash_method": args.hash_method,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 2),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "endpoints": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+    return 1 if any(r["errors"] for r in results.values()) else 0
+
+
+def compare(args):
+    with open(args.baseline) as file:
+        baseline = json.load(file)["endpoints"]
+    with open(args.current) as file:
+        current = json.load(file)["endpoints"]
+
+    metric = args.metric
+    regressions = []
+    print(f"{'endpoint':18} {'before':>10} {'after':>10} {'change':>8}")
+    for name in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[name].get(metric), current[name].get(metric)
+        if not before or after is None:
+            continue
+
+        change = (after - before) / before
+        # Lower is better for latencies, higher for throughput
+        worse = (
+            change < -args.threshold
+            if metric == "throughput_rps"
+            else (change > args.threshold)
+        )
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:18} {before:>10} {after:>10} {change:>+8.1%}{flag}")
+        if worse:
+            regressions.append(name)
+        if current[name]["errors"] and not baseline[name]["errors"]:
+            print(f"{name:18} now has {current[name]['errors']} errors  REGRESSION")
+            regressions.append(name)
+
+    if regressions:
+        print(
+            f"{len(regressions)} endpoint(s) regressed past {args.threshold:.0%} "
+            f"on {metric}: {', '.join(sorted(set(regressions)))}"
+        )
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed, drive every endpoint, report")
+    run_parser.add_argument("--database-url", help="defaults to a temporary SQLite")
+    run_parser.add_argument("--users", type=int, default=50)
+    run_parser.add_argument("--tasks", type=int, default=200, help="tasks per user")
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument("--requests", type=int, default=300, help="per endpoint")
+    run_parser.add_argument("--warmup", type=int, default=20)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--hash-method", default="pbkdf2:sha256:1000")
+    run_parser.add_argument(
+        "--endpoints", nargs="*", help=f"subset of: {' '.join(ENDPOINTS)}"
+    )
+    run_parser.add_argument("--output", default="loadtest.json")
+
+    compare_parser = commands.add_parser(
+        "compare", help="fail when current regressed against baseline"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    compare_parser.add_argument(
+        "--metric",
+        default="p95_ms",
+        choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms", "throughput_rps"],
+    )
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == "run" else compare(args))
+
+
+if __name__ == "__main__":
+    main()
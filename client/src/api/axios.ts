@@ -22,6 +22,12 @@ api.interceptors.request.use(
 
     if (config.method && unsafeMethods.includes(config.method.toLocaleLowerCase())) {
         config.headers["X-CSRF-TOKEN"] = Cookies.get("csrf_refresh_token") || "";
+
+        // Set once, so the retry after a token refresh reuses the key and
+        // the server replays the first response instead of writing twice
+        if (config.url?.startsWith("/tasks") && !config.headers["Idempotency-Key"]) {
+            config.headers["Idempotency-Key"] = crypto.randomUUID();
+        }
     }
 
     return config;
@@ -3,12 +3,66 @@ import os
 base_dir = os.path.abspath(os.path.dirname(__file__))
 
 
+def pool_options(pool_size, max_overflow, timeout, recycle, pre_ping) -> dict:
+    """Connection pool settings for one environment, each overridable with
+    the matching DB_POOL_* environment variable.
+
+    The pool is per worker process, so keep
+    gunicorn workers x (pool_size + max_overflow) under the database's
+    connection limit.
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", pool_size)),
+        "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", max_overflow)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", timeout)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", recycle)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", str(pre_ping)).lower()
+        in ("1", "true", "yes"),
+    }
+
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "")
     JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Adjusted per database by focus_flow_app.database.engine_options
+    SQLALCHEMY_ENGINE_OPTIONS = pool_options(
+        pool_size=5, max_overflow=5, timeout=10, recycle=1800, pre_ping=True
+    )
+    # Postgres only, set per connection, 0 disables
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+    # Run on every new SQLite connection
+    SQLITE_PRAGMAS: dict = {}
+
+    # Async serving mode (asgi.py): the async engine's URL, by default the
+    # database above through aiosqlite/asyncpg, and the threads serving the
+    # routes it leaves to the Flask app
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+    ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", 8))
+
+    # GET /api/health/ready reuses its SELECT 1 for this many seconds and
+    # answers 503 when it fails or takes longer than the latency limit
+    HEALTH_READY_CACHE_SECONDS = float(os.getenv("HEALTH_READY_CACHE_SECONDS", 2))
+    HEALTH_READY_MAX_LATENCY_MS = float(os.getenv("HEALTH_READY_MAX_LATENCY_MS", 500))
+
+    # Request/SQL metrics at GET /metrics. With several gunicorn workers set
+    # METRICS_DIR to a directory they share (cleared on start) so every
+    # scrape reports the totals of all of them
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+
+    # Per-request SQL profiling: SQL_PROFILE profiles every request,
+    # SQL_PROFILE_HEADER lets a request ask for it with "X-Profile-SQL: 1".
+    # Profiled requests warn past SQL_QUERY_BUDGET statements or when one
+    # statement repeats SQL_REPEAT_THRESHOLD times
+    SQL_PROFILE = os.getenv("SQL_PROFILE", "false").lower() == "true"
+    SQL_PROFILE_HEADER = True
+    SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", 10))
+    SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", 3))
+
     JWT_COOKIE_CSRF_PROTECT = True
     JWT_CSRF_IN_COOKIES = True
     JWT_CSRF_METHODS = ["POST", "PUT", "PATCH", "DELETE"]
@@ -19,6 +73,106 @@ class Config:
 
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000")
 
+    # Blueprints to register, by the names in routes/__init__routes.py.
+    # Those left out aren't imported at all
+    API_BLUEPRINTS = os.getenv("API_BLUEPRINTS", "auth,main,tasks,health,metrics")
+
+    # Keyset pagination for GET /api/tasks/?limit=&cursor=
+    TASKS_PAGE_SIZE = int(os.getenv("TASKS_PAGE_SIZE", 50))
+    TASKS_MAX_PAGE_SIZE = int(os.getenv("TASKS_MAX_PAGE_SIZE", 200))
+
+    # Upper bound on operations in one POST /api/tasks/batch
+    TASKS_BATCH_MAX_SIZE = int(os.getenv("TASKS_BATCH_MAX_SIZE", 1000))
+
+    # Rows fetched and flushed per chunk by GET /api/tasks/export
+    TASKS_EXPORT_CHUNK_SIZE = int(os.getenv("TASKS_EXPORT_CHUNK_SIZE", 1000))
+
+    # Rows inserted per executemany/commit by POST /api/tasks/import
+    TASKS_IMPORT_CHUNK_SIZE = int(os.getenv("TASKS_IMPORT_CHUNK_SIZE", 1000))
+    TASKS_IMPORT_MAX_ERRORS = int(os.getenv("TASKS_IMPORT_MAX_ERRORS", 100))
+
+    # How long (seconds) a worker trusts that a token's user still exists
+    # before checking the database again, 0 checks on every request
+    IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", 30))
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 10_000))
+
+    # Encoded GET /api/tasks/ responses: "memory" (per worker), "redis"
+    # (shared, needs REDIS_URL and the redis package) or "none"
+    TASK_CACHE_BACKEND = os.getenv("TASK_CACHE_BACKEND", "memory")
+    TASK_CACHE_TTL = float(os.getenv("TASK_CACHE_TTL", 300))
+    TASK_CACHE_MAX_USERS = int(os.getenv("TASK_CACHE_MAX_USERS", 1000))
+    # Pages and filters kept per user, the least recently used go first
+    TASK_CACHE_MAX_VARIANTS = int(os.getenv("TASK_CACHE_MAX_VARIANTS", 16))
+
+    # Fan-out behind GET /api/tasks/stream: "memory" reaches the streams open
+    # on the same worker, "redis" (pub/sub) the ones on every worker
+    TASK_EVENTS_BACKEND = os.getenv("TASK_EVENTS_BACKEND", "memory")
+    # Changes buffered per open stream. A stream that falls this far behind
+    # stops receiving them and re-reads what it missed from the database
+    TASK_EVENTS_QUEUE_SIZE = int(os.getenv("TASK_EVENTS_QUEUE_SIZE", 64))
+    # Seconds between keep-alive comments on an idle stream, and before a
+    # stream is closed for the client to reconnect (sooner if the access
+    # token expires first)
+    TASK_STREAM_HEARTBEAT = float(os.getenv("TASK_STREAM_HEARTBEAT", 15))
+    TASK_STREAM_MAX_AGE = float(os.getenv("TASK_STREAM_MAX_AGE", 300))
+    TASK_STREAM_RETRY_MS = int(os.getenv("TASK_STREAM_RETRY_MS", 3000))
+    # Open streams per worker, each holds a thread for as long as it's open
+    # so keep this below GUNICORN_THREADS. Past it a stream is refused with
+    # 503 and Retry-After seconds, the client polls /changes meanwhile
+    TASK_STREAM_MAX_PER_WORKER = int(os.getenv("TASK_STREAM_MAX_PER_WORKER", 8))
+    TASK_STREAM_RETRY_AFTER = int(os.getenv("TASK_STREAM_RETRY_AFTER", 30))
+
+    # Where responses to writes sent with an Idempotency-Key are kept:
+    # "database" (shared by every worker), "memory" (per worker) or "none"
+    IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "database")
+    # Seconds a response is replayed for, and after which a key whose first
+    # request never finished (e.g. the worker died) may be used again
+    IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", 24 * 3600))
+    IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+    IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 100_000))
+
+    # Background upkeep run by one worker at a time, see
+    # focus_flow_app.maintenance. Tasks done more than TASK_RETENTION_DAYS
+    # ago are deleted every MAINTENANCE_INTERVAL seconds (0 keeps them),
+    # MAINTENANCE_CHUNK_SIZE per transaction with a pause between chunks.
+    # ANALYZE/VACUUM runs every MAINTENANCE_UPKEEP_INTERVAL seconds, 0 never
+    MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true"
+    MAINTENANCE_POLL_INTERVAL = float(os.getenv("MAINTENANCE_POLL_INTERVAL", 60))
+    MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", 3600))
+    MAINTENANCE_UPKEEP_INTERVAL = float(
+        os.getenv("MAINTENANCE_UPKEEP_INTERVAL", 24 * 3600)
+    )
+    TASK_RETENTION_DAYS = float(os.getenv("TASK_RETENTION_DAYS", 0))
+    # Tombstones of deleted tasks are kept this long (0 forever). A client
+    # resuming delta sync from further back than that resyncs from scratch
+    TOMBSTONE_RETENTION_DAYS = float(os.getenv("TOMBSTONE_RETENTION_DAYS", 30))
+    MAINTENANCE_CHUNK_SIZE = int(os.getenv("MAINTENANCE_CHUNK_SIZE", 500))
+    MAINTENANCE_CHUNK_PAUSE = float(os.getenv("MAINTENANCE_CHUNK_PAUSE", 0.05))
+    # Leader lock for SQLite, by default a file per database in the temp dir
+    MAINTENANCE_LOCK_FILE = os.getenv("MAINTENANCE_LOCK_FILE", "")
+
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # werkzeug hash method for new and rehashed passwords, written out in full
+    # ("scrypt:n:r:p" / "pbkdf2:sha256:iterations") so stored hashes can be
+    # compared against it on login and upgraded when it changes
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    # Hashes run at once per worker and how many may wait for a thread before
+    # signup/login answer 503, 0 workers hashes inline on the request thread
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 8))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 5))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", 1))
+
+    # Token buckets in front of the auth routes, "memory" (per worker),
+    # "redis" (shared) or "none". Limits are "count/seconds", empty disables
+    RATELIMIT_BACKEND = os.getenv("RATELIMIT_BACKEND", "memory")
+    RATELIMIT_MAX_KEYS = int(os.getenv("RATELIMIT_MAX_KEYS", 100_000))
+    RATELIMIT_LOGIN_PER_IP = os.getenv("RATELIMIT_LOGIN_PER_IP", "20/60")
+    RATELIMIT_LOGIN_PER_EMAIL = os.getenv("RATELIMIT_LOGIN_PER_EMAIL", "5/60")
+    RATELIMIT_SIGNUP_PER_IP = os.getenv("RATELIMIT_SIGNUP_PER_IP", "10/3600")
+    RATELIMIT_REFRESH_PER_IP = os.getenv("RATELIMIT_REFRESH_PER_IP", "30/60")
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -26,14 +180,36 @@ class DevelopmentConfig(Config):
         "DEV_DATABASE_URL", "sqlite:///" + os.path.join(base_dir, "instance", "dev.db")
     )
 
+    SQLALCHEMY_ENGINE_OPTIONS = pool_options(
+        pool_size=2, max_overflow=3, timeout=30, recycle=-1, pre_ping=False
+    )
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30_000))
+    # WAL lets the dev server's threads read while another one writes
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "busy_timeout": 5000,
+    }
+
 
 class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "")
 
+    # Managed Postgres and proxies drop idle connections, recycle well
+    # before that and ping on checkout so a dead one is never handed out
+    SQLALCHEMY_ENGINE_OPTIONS = pool_options(
+        pool_size=5, max_overflow=10, timeout=5, recycle=900, pre_ping=True
+    )
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 5000))
+
     JWT_COOKIE_SECURE = True
     JWT_COOKIE_SAMESITE = "None"
 
+    # Statements and call sites aren't for clients to see
+    SQL_PROFILE_HEADER = False
+
 
 class TestingConfig(Config):
     TESTING = True
@@ -41,6 +217,12 @@ class TestingConfig(Config):
     SECRET_KEY = "test_secret_key"
     JWT_SECRET_KEY = "test_jwt_secret_key"
 
+    # Keep the suite fast, production strength isn't needed here
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+
+    # Tests run the jobs themselves
+    MAINTENANCE_ENABLED = False
+
 
 config_map = {
     "development": DevelopmentConfig,
@@ -1,21 +1,25 @@
 import os
-from dotenv import load_dotenv
 from flask import Flask
 from config import config_map
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 
 
 db = SQLAlchemy()
-migrate = Migrate()
 jwt = JWTManager()
 
 
-def create_app(config_name: str | None = None):
-    load_dotenv()
+# flask_cors's defaults, which the async mode's CORSMiddleware copies
+CORS_METHODS = ["GET", "HEAD", "POST", "OPTIONS", "PUT", "PATCH", "DELETE"]
+
+
+def cors_origins(config) -> list[str]:
+    raw_origins = config["CORS_ORIGINS"]
+    return [origin.strip() for origin in raw_origins.split(",") if origin.strip()]
 
+
+def create_app(config_name: str | None = None):
     cfg_key = (config_name or os.getenv("FLASK_CONFIG", "development")).lower()
     cfg_class = config_map.get(cfg_key)
     if not cfg_class:
@@ -24,20 +28,70 @@ def create_app(config_name: str | None = None):
     app = Flask(__name__, instance_relative_config=False)
     app.config.from_object(cfg_class)
 
+    from .database import engine_options, init_engine
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
     jwt.init_app(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_engine(app, db)
+
+    # The `flask db` commands are all Flask-Migrate is for, and importing
+    # it pulls in alembic and mako, so workers serving requests skip it
+    if os.getenv("FLASK_RUN_FROM_CLI") == "true":
+        from flask_migrate import Migrate
 
-    raw_origins = app.config["CORS_ORIGINS"]
-    origins = [origin.strip() for origin in raw_origins.split(",") if origin.strip()]
+        Migrate(app, db)
 
     CORS(
         app,
         supports_credentials=True,
-        origins=origins,
+        origins=cors_origins(app.config),
     )
 
-    from .routes.__init__routes import register_routes
+    from .hashing import init_password_hasher
+    from .identity import init_identity_cache
+    from .ratelimit import init_rate_limiter
+    from .routes.__init__routes import enabled_blueprints, register_routes
+
+    init_identity_cache(app)
+    init_password_hasher(app)
+    init_rate_limiter(app)
+
+    # The rest are only imported when configured, or when the blueprint that
+    # uses them is registered. One left out has no entry in app.extensions
+    config = app.config
+    tasks = "tasks" in enabled_blueprints(app)
+
+    if tasks and (config["TASK_CACHE_BACKEND"] or "none").lower() != "none":
+        from .cache import init_task_cache
+
+        init_task_cache(app)
+
+    if tasks:
+        from .events import init_task_events
+
+        init_task_events(app)
+
+    if tasks and (config["IDEMPOTENCY_BACKEND"] or "none").lower() != "none":
+        from .idempotency import init_idempotency
+
+        init_idempotency(app)
+
+    if config["METRICS_ENABLED"]:
+        from .metrics import init_metrics
+
+        init_metrics(app, db)
+
+    if config["SQL_PROFILE"] or config["SQL_PROFILE_HEADER"]:
+        from .profiling import init_profiler
+
+        init_profiler(app, db)
+
+    if config["MAINTENANCE_ENABLED"]:
+        from .maintenance import init_maintenance
+
+        init_maintenance(app)
 
     register_routes(app)
 
@@ -0,0 +1,483 @@
+"""Async serving mode, `uvicorn asgi:app` instead of gunicorn.
+
+The task CRUD routes, the ones clients call most, are served on the event
+loop with an async engine, so a worker waiting on the database can keep
+taking requests instead of holding a thread per request. They reuse the
+models, queries and validation of the Flask views and go through the same
+task cache, event broker and idempotency store.
+
+Every other route, and any request the async routes can't answer exactly
+like the Flask view (no bearer token, an invalid one), is handed to the
+Flask app created by create_app, which runs on a small thread pool.
+
+flask_cors only sees the requests that reach Flask, so CORSMiddleware
+wraps the whole app with the same origins, methods and headers. It answers
+every preflight itself and sets the headers on both kinds of response.
+
+Needs `pip install starlette uvicorn a2wsgi` and aiosqlite or asyncpg.
+"""
+
+import json
+from contextlib import asynccontextmanager
+
+try:
+    from a2wsgi import WSGIMiddleware
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+except ImportError as err:
+    raise RuntimeError(
+        "The async serving mode needs starlette, a2wsgi and an async database "
+        "driver: pip install starlette uvicorn a2wsgi aiosqlite"
+    ) from err
+
+from flask_jwt_extended import decode_token
+from sqlalchemy import delete, insert, not_, select, update
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_etags, quote_etag
+
+from .__init__app import CORS_METHODS, cors_origins, create_app
+from .cache import get_task_cache, invalidate_task_list
+from .database import apply_sqlite_pragmas, async_database_url, async_engine_options
+from .events import publish_task_change
+from .idempotency import (
+    HEADER,
+    DatabaseIdempotencyBackend,
+    StoredResponse,
+    fingerprint_of,
+    get_idempotency_store,
+    invalid_key,
+    replay,
+)
+from .models import Task, TaskTombstone, User
+from .routes.task_routes import (
+    parse_task_list_args,
+    task_list_body,
+    task_list_query,
+    validator_json,
+)
+from .serializers import dumps
+from .sync import collection_etag, tombstone_rows, version_claim
+
+
+def json_response(data, status: int = 200, headers: dict | None = None) -> Response:
+    return Response(dumps(data), status, headers, media_type="application/json")
+
+
+def cacheable_headers(etag: str) -> dict:
+    return {"ETag": quote_etag(etag, weak=True), "Cache-Control": "private, no-cache"}
+
+
+def token_user_id(request) -> int | None:
+    """The user id of a valid access token in the Authorization header.
+
+    None sends the request to the Flask view instead, which gives the same
+    answer as under gunicorn for a missing, expired or malformed token and
+    handles tokens sent in cookies.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme != "Bearer" or not token:
+        return None
+
+    try:
+        claims = decode_token(token)
+        if claims.get("type") != "access":
+            return None
+        return int(claims["sub"])
+    except Exception:
+        return None
+
+
+async def json_body(request):
+    """The parsed JSON body, or an error response like Flask's get_json()"""
+    if request.headers.get("Content-Type", "").split(";")[0] != "application/json":
+        return None, json_response({"error": "Expected a JSON body"}, 415)
+    try:
+        return json.loads(await request.body()), None
+    except ValueError:
+        return None, json_response({"error": "The JSON body couldn't be parsed"}, 400)
+
+
+def after_write(user_id: int, version: int, events: list) -> None:
+    """Drop the user's cached lists and tell their streams. Either can be a
+    Redis round trip, so the routes run it on the thread pool rather than
+    the event loop."""
+    invalidate_task_list(user_id)
+    publish_task_change(user_id, version, events)
+
+
+def async_route(handler):
+    """Run `handler(request, user_id)` inside the Flask app's context, or
+    pass the request on to the Flask app when the token isn't one it can
+    vouch for. The app context is per task, so concurrent requests each
+    get their own."""
+
+    async def endpoint(request):
+        state = request.app.state
+        with state.flask.app_context():
+            user_id = token_user_id(request)
+            if user_id is None:
+                return state.wsgi
+            return await handler(request, user_id)
+
+    endpoint.__name__ = handler.__name__
+    return endpoint
+
+
+async def idempotent(request, user_id: int, handler) -> Response:
+    """The @idempotent decorator for the async routes, sharing its store so
+    a retry is recognised whichever mode served the first request. The
+    store's backend does blocking I/O, it runs on the thread pool."""
+    key = request.headers.get(HEADER)
+    store = get_idempotency_store()
+    if key is None or store is None:
+        return await handler()
+
+    error = invalid_key(key)
+    if error:
+        return json_response({"error": error}, 400)
+
+    fingerprint = fingerprint_of(
+        request.method, request.url.path, request.url.query, await request.body()
+    )
+    backend = store.backend
+    try:
+        stored = await run_in_threadpool(
+            backend.claim, user_id, key, fingerprint, store.lock_timeout
+        )
+    except LookupError:
+        return json_response({}, 401)
+    if stored is not None:
+        replayed, headers = replay(store, stored, fingerprint)
+        return Response(
+            replayed.body,
+            replayed.status,
+            {"Content-Type": replayed.content_type, **headers},
+        )
+
+    request.state.idempotency_claim = (user_id, key, fingerprint)
+    try:
+        response = await handler()
+    except BaseException:
+        if not getattr(request.state, "idempotency_stored", False):
+            await run_in_threadpool(backend.release, user_id, key)
+        raise
+
+    if getattr(request.state, "idempotency_stored", False):
+        return response
+
+    if response.status_code >= 500:
+        await run_in_threadpool(backend.release, user_id, key)
+        return response
+
+    stored = stored_response(fingerprint, response)
+    await run_in_threadpool(backend.complete, user_id, key, stored, store.ttl)
+    return response
+
+
+def stored_response(fingerprint: str, response: Response) -> StoredResponse:
+    return StoredResponse(
+        fingerprint,
+        response.status_code,
+        response.body,
+        response.headers.get("Content-Type"),
+    )
+
+
+async def commit_write(request, session, response: Response) -> None:
+    """idempotency.commit_write for the async routes: the response to an
+    Idempotency-Key is saved in the write's own transaction"""
+    claim = getattr(request.state, "idempotency_claim", None)
+    store = get_idempotency_store()
+    if claim is None or not isinstance(store.backend, DatabaseIdempotencyBackend):
+        await session.commit()
+        return
+
+    user_id, key, fingerprint = claim
+    await session.execute(
+        store.backend.complete_statement(
+            user_id, key, stored_response(fingerprint, response), store.ttl
+        )
+    )
+    await session.commit()
+    request.state.idempotency_stored = True
+
+
+@async_route
+async def get_tasks(request, user_id):
+    """GET /api/tasks/, see task_routes.get_tasks"""
+    args = MultiDict(request.query_params.multi_items())
+    try:
+        view = parse_task_list_args(args)
+    except ValueError as err:
+        return json_response({"error": str(err)}, 400)
+
+    if_none_match = parse_etags(request.headers.get("If-None-Match"))
+    cache = get_task_cache()
+    version = None
+    async with request.app.state.sessions() as session:
+        if if_none_match or cache is not None:
+            version = await session.scalar(
+                select(User.task_version).where(User.id == user_id)
+            )
+            if version is None:
+                return json_response({}, 401)
+
+            etag = collection_etag(user_id, version, view.variant)
+            if if_none_match.contains_weak(etag):
+                return Response(status_code=304, headers=cacheable_headers(etag))
+
+            if cache is not None:
+                body = await run_in_threadpool(cache.get, user_id, etag)
+                if body is not None:
+                    return Response(
+                        body,
+                        headers=cacheable_headers(etag),
+                        media_type="application/json",
+                    )
+
+        conn = await session.connection()
+        rows = (await conn.execute(task_list_query(user_id, view))).all()
+        if rows:
+            version = rows[0][0]
+        elif version is None:
+            version = await session.scalar(
+                select(User.task_version).where(User.id == user_id)
+            )
+            if version is None:
+                return json_response({}, 401)
+
+    body = task_list_body(rows, view)
+    etag = collection_etag(user_id, version, view.variant)
+    if cache is not None:
+        await run_in_threadpool(cache.set, user_id, etag, body)
+
+    return Response(
+        body, headers=cacheable_headers(etag), media_type="application/json"
+    )
+
+
+@async_route
+async def add_task(request, user_id):
+    """POST /api/tasks/, see task_routes.add_tasks"""
+
+    async def handler():
+        data, error = await json_body(request)
+        if error is not None:
+            return error
+        if not isinstance(data, dict) or not validator_json(data):
+            return json_response(
+                {"error": "the provided data did not include all required info"}, 422
+            )
+
+        async with request.app.state.sessions() as session:
+            version = (await session.execute(version_claim(user_id))).scalar()
+            if version is None:
+                await session.rollback()
+                return json_response({"error": "No such user."}, 404)
+
+            task = (
+                (
+                    await session.execute(
+                        insert(Task)
+                        .values(
+                            name=data["name"],
+                            description=data["description"],
+                            user_id=user_id,
+                            version=version,
+                        )
+                        .returning(Task.id, Task.name, Task.description, Task.done)
+                    )
+                )
+                .one()
+                ._asdict()
+            )
+            response = json_response(task, 201)
+            await commit_write(request, session, response)
+
+        await run_in_threadpool(
+            after_write, user_id, version, [("create", {"task": task})]
+        )
+        return response
+
+    return await idempotent(request, user_id, handler)
+
+
+@async_route
+async def update_task(request, user_id):
+    """PATCH /api/tasks/<id>/, see task_routes.update_tasks"""
+    task_id = request.path_params["task_id"]
+
+    async def handler():
+        data, error = await json_body(request)
+        if error is not None:
+            return error
+        if not isinstance(data, dict):
+            data = {}
+        missing = [key for key in ("name", "description") if key not in data]
+        if missing:
+            return json_response({"error": f"missing keys: {missing}"}, 400)
+
+        async with request.app.state.sessions() as session:
+            version = (await session.execute(version_claim(user_id))).scalar()
+            if version is None:
+                await session.rollback()
+                return json_response({"error": "No such user."}, 404)
+
+            task = (
+                await session.execute(
+                    update(Task)
+                    .where(Task.id == task_id, Task.user_id == user_id)
+                    .values(
+                        name=data["name"],
+                        description=data["description"],
+                        version=version,
+                    )
+                    .returning(Task.id, Task.name, Task.description, Task.done)
+                    .execution_options(synchronize_session=False)
+                )
+            ).first()
+            if task is None:
+                await session.rollback()
+                return json_response(
+                    {"error": "Task not found or does not belong to current user"}, 404
+                )
+            task = task._asdict()
+            response = json_response(task)
+            await commit_write(request, session, response)
+
+        await run_in_threadpool(
+            after_write, user_id, version, [("update", {"task": task})]
+        )
+        return response
+
+    return await idempotent(request, user_id, handler)
+
+
+@async_route
+async def delete_task(request, user_id):
+    """DELETE /api/tasks/<id>/delete/, see task_routes.delete_task"""
+    task_id = request.path_params["task_id"]
+
+    async def handler():
+        async with request.app.state.sessions() as session:
+            version = (await session.execute(version_claim(user_id))).scalar()
+            if version is None:
+                await session.rollback()
+                return json_response({}, 401)
+
+            deleted = (
+                await session.execute(
+                    delete(Task)
+                    .where(Task.id == task_id, Task.user_id == user_id)
+                    .returning(Task.id)
+                    .execution_options(synchronize_session=False)
+                )
+            ).first()
+            if deleted is None:
+                await session.rollback()
+                return json_response({"error": "Task not found!"}, 404)
+            await session.execute(
+                insert(TaskTombstone), tombstone_rows(user_id, [task_id], version)
+            )
+            response = json_response({})
+            await commit_write(request, session, response)
+
+        await run_in_threadpool(
+            after_write, user_id, version, [("delete", {"task": {"id": task_id}})]
+        )
+        return response
+
+    return await idempotent(request, user_id, handler)
+
+
+@async_route
+async def toggle_task(request, user_id):
+    """PATCH /api/tasks/<id>/done/, see task_routes.completed_tasks"""
+    task_id = request.path_params["task_id"]
+
+    async def handler():
+        async with request.app.state.sessions() as session:
+            version = (await session.execute(version_claim(user_id))).scalar()
+            if version is None:
+                await session.rollback()
+                return json_response({"error": "No such user."}, 404)
+
+            done = (
+                await session.execute(
+                    update(Task)
+                    .where(Task.id == task_id, Task.user_id == user_id)
+                    .values(done=not_(Task.done), version=version)
+                    .returning(Task.done)
+                    .execution_options(synchronize_session=False)
+                )
+            ).scalar()
+            if done is None:
+                await session.rollback()
+                return json_response(
+                    {"error": f"The Task with the ID: {task_id} doesnt exist!"}, 404
+                )
+            response = json_response({"done": done})
+            await commit_write(request, session, response)
+
+        await run_in_threadpool(
+            after_write,
+            user_id,
+            version,
+            [("toggle", {"task": {"id": task_id, "done": done}})],
+        )
+        return response
+
+    return await idempotent(request, user_id, handler)
+
+
+def create_asgi_app(config_name: str | None = None):
+    flask_app = create_app(config_name)
+    config = flask_app.config
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Created on the worker's own event loop, after any fork
+        engine = create_async_engine(
+            async_database_url(config), **async_engine_options(config)
+        )
+        apply_sqlite_pragmas(engine.sync_engine, config.get("SQLITE_PRAGMAS") or {})
+        app.state.engine = engine
+        app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        # The async routes skip Flask's before_request, which starts it
+        maintenance = flask_app.extensions.get("maintenance")
+        if maintenance is not None:
+            maintenance.start()
+        try:
+            yield
+        finally:
+            await engine.dispose()
+
+    wsgi = WSGIMiddleware(flask_app, workers=config["ASGI_WSGI_THREADS"])
+    app = Starlette(
+        routes=[
+            Route("/api/tasks/", get_tasks, methods=["GET"]),
+            Route("/api/tasks/", add_task, methods=["POST"]),
+            Route("/api/tasks/{task_id:int}/", update_task, methods=["PATCH"]),
+            Route("/api/tasks/{task_id:int}/delete/", delete_task, methods=["DELETE"]),
+            Route("/api/tasks/{task_id:int}/done/", toggle_task, methods=["PATCH"]),
+            Mount("/", app=wsgi),
+        ],
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=cors_origins(config),
+                allow_methods=CORS_METHODS,
+                allow_headers=["*"],
+                allow_credentials=True,
+            )
+        ],
+        lifespan=lifespan,
+    )
+    app.state.flask = flask_app
+    app.state.wsgi = wsgi
+    return app
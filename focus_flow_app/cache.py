@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from .shared import redis_client
+
+
+class MemoryCacheBackend:
+    """Per-worker LRU of user id -> LRU of {variant: body}, each user
+    expiring `ttl` seconds after their first entry was stored."""
+
+    name = "memory"
+
+    def __init__(self, ttl: float, max_users: int, max_variants: int):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.max_variants = max_variants
+        self._users: OrderedDict[int, tuple[float, OrderedDict[str, bytes]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, variant: str) -> bytes | None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+
+            expires_at, variants = entry
+            if expires_at < time.monotonic():
+                del self._users[user_id]
+                return None
+
+            self._users.move_to_end(user_id)
+            body = variants.get(variant)
+            if body is not None:
+                variants.move_to_end(variant)
+            return body
+
+    def set(self, user_id: int, variant: str, body: bytes) -> None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                entry = (time.monotonic() + self.ttl, OrderedDict())
+                self._users[user_id] = entry
+
+            variants = entry[1]
+            variants[variant] = body
+            variants.move_to_end(variant)
+            while len(variants) > self.max_variants:
+                variants.popitem(last=False)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def delete(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+class RedisCacheBackend:
+    """Shared backend, one Redis hash per user so an invalidation from any
+    worker drops every cached page and filter for that user at once. A
+    sorted set next to it holds each variant's last use, the least recently
+    used ones are dropped past max_variants."""
+
+    name = "redis"
+
+    def __init__(
+        self, client, ttl: float, max_variants: int, prefix: str = "focusflow:tasks:"
+    ):
+        self.client = client
+        self.ttl = max(1, int(ttl))
+        self.max_variants = max_variants
+        self.prefix = prefix
+
+    def _keys(self, user_id: int) -> tuple[str, str]:
+        key = f"{self.prefix}{user_id}"
+        return key, f"{key}:lru"
+
+    def get(self, user_id: int, variant: str) -> bytes | None:
+        key, lru = self._keys(user_id)
+        pipe = self.client.pipeline()
+        pipe.hget(key, variant)
+        pipe.zadd(lru, {variant: time.time()}, xx=True)
+        body, _ = pipe.execute()
+        return body
+
+    def set(self, user_id: int, variant: str, body: bytes) -> None:
+        key, lru = self._keys(user_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, variant, body)
+        pipe.zadd(lru, {variant: time.time()})
+        pipe.expire(key, self.ttl, nx=True)
+        pipe.expire(lru, self.ttl, nx=True)
+        pipe.zcard(lru)
+        count = pipe.execute()[-1]
+
+        if count > self.max_variants:
+            evicted = [
+                name for name, _ in self.client.zpopmin(lru, count - self.max_variants)
+            ]
+            if evicted:
+                self.client.hdel(key, *evicted)
+
+    def delete(self, user_id: int) -> None:
+        self.client.delete(*self._keys(user_id))
+
+
+class TaskListCache:
+    """Serialized GET /api/tasks/ bodies keyed by user and ETag.
+
+    The ETag carries the user's task_version, so an entry can never be
+    served after a write even when another worker's invalidation hasn't
+    reached this one, invalidating just frees the memory sooner.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # `+=` isn't atomic, the request threads share these counters
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, etag: str) -> bytes | None:
+        body = self.backend.get(user_id, etag)
+        with self._lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return body
+
+    def set(self, user_id: int, etag: str, body: bytes) -> None:
+        self.backend.set(user_id, etag, body)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self.invalidations += 1
+        self.backend.delete(user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            invalidations = self.invalidations
+        lookups = hits + misses
+        return {
+            "backend": self.backend.name,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "invalidations": invalidations,
+        }
+
+
+def init_task_cache(app) -> None:
+    backend_name = (app.config["TASK_CACHE_BACKEND"] or "none").lower()
+    ttl = app.config["TASK_CACHE_TTL"]
+    max_variants = app.config["TASK_CACHE_MAX_VARIANTS"]
+
+    if backend_name == "none":
+        backend = None
+    elif backend_name == "memory":
+        backend = MemoryCacheBackend(
+            ttl, app.config["TASK_CACHE_MAX_USERS"], max_variants
+        )
+    elif backend_name == "redis":
+        backend = RedisCacheBackend(redis_client(app), ttl, max_variants)
+    else:
+        raise RuntimeError(f"Unknown TASK_CACHE_BACKEND: {backend_name}")
+
+    app.extensions["task_cache"] = None if backend is None else TaskListCache(backend)
+
+
+def get_task_cache() -> TaskListCache | None:
+    return current_app.extensions.get("task_cache")
+
+
+def invalidate_task_list(user_id: int) -> None:
+    """Call after committing any write to the user's tasks"""
+    cache = get_task_cache()
+    if cache is not None:
+        cache.invalidate(user_id)
@@ -0,0 +1,216 @@
+import threading
+import time
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout", "pool_recycle")
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection.
+
+    A wait only happens when every connection of the pool and its overflow
+    is checked out, so the wait times and timeouts are the signal that the
+    workers x pool_size budget is too small for the load.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+class ReadinessCheck:
+    """Timed SELECT 1, with the result reused for `ttl` seconds.
+
+    Probes from every load balancer and orchestrator hitting every worker
+    then cost at most one query per worker per interval. Concurrent probes
+    wait on the lock for the one in flight instead of each running their
+    own query.
+    """
+
+    def __init__(self, ttl: float, max_latency_ms: float):
+        self.ttl = ttl
+        self.max_latency_ms = max_latency_ms
+        self._lock = threading.Lock()
+        self._result: dict | None = None
+        self._expires_at = 0.0
+
+    def run(self, engine) -> dict:
+        with self._lock:
+            if self._result is None or self._expires_at <= time.monotonic():
+                self._result = self._check(engine)
+                self._expires_at = time.monotonic() + self.ttl
+            return self._result
+
+    def _check(self, engine) -> dict:
+        start = time.perf_counter()
+        error = None
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except exc.SQLAlchemyError as err:
+            error = type(err).__name__
+        latency_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        if error is not None:
+            status = "unavailable"
+        elif latency_ms > self.max_latency_ms:
+            status = "degraded"
+        else:
+            status = "ok"
+
+        return {
+            "status": status,
+            "database": {"latency_ms": latency_ms, "error": error},
+            "checked_at": round(time.time(), 3),
+        }
+
+
+def engine_options(config) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS adjusted to the configured database.
+
+    In-memory SQLite gets Flask-SQLAlchemy's StaticPool, which takes no
+    pool sizing. Everything else gets TimedQueuePool, and Postgres gets
+    DB_STATEMENT_TIMEOUT_MS set on every connection it opens.
+    """
+    options = dict(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        for key in POOL_OPTIONS:
+            options.pop(key, None)
+        return options
+
+    options.setdefault("poolclass", TimedQueuePool)
+
+    timeout = config.get("DB_STATEMENT_TIMEOUT_MS")
+    if url.get_backend_name() == "postgresql" and timeout:
+        connect_args = dict(options.get("connect_args") or {})
+        connect_args["options"] = (
+            f"{connect_args.get('options', '')} -c statement_timeout={int(timeout)}"
+        ).strip()
+        options["connect_args"] = connect_args
+
+    return options
+
+
+def init_engine(app, db) -> None:
+    """Set up the readiness check and apply SQLITE_PRAGMAS to every new
+    SQLite connection"""
+    app.extensions["readiness"] = ReadinessCheck(
+        ttl=app.config["HEALTH_READY_CACHE_SECONDS"],
+        max_latency_ms=app.config["HEALTH_READY_MAX_LATENCY_MS"],
+    )
+
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config.get("SQLITE_PRAGMAS") or {})
+
+
+def apply_sqlite_pragmas(engine, pragmas: dict) -> None:
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+# Async driver for each backend the sync engine may point at
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_database_url(config):
+    """ASYNC_DATABASE_URL, or SQLALCHEMY_DATABASE_URI with its async driver"""
+    if config.get("ASYNC_DATABASE_URL"):
+        return make_url(config["ASYNC_DATABASE_URL"])
+
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(
+            f"No async driver known for {backend}, set ASYNC_DATABASE_URL"
+        )
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        # The async engine would get a database of its own
+        raise RuntimeError("The async engine can't share an in-memory SQLite database")
+
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def async_engine_options(config) -> dict:
+    """engine_options() for the async engine: the same pool sizing, with the
+    pool class and statement timeout the async drivers take"""
+    options = engine_options(config)
+    options.pop("poolclass", None)
+
+    timeout = config.get("DB_STATEMENT_TIMEOUT_MS")
+    if async_database_url(config).get_backend_name() == "postgresql" and timeout:
+        # asyncpg has no libpq "options", it sets the timeout itself
+        connect_args = dict(options.get("connect_args") or {})
+        connect_args.pop("options", None)
+        connect_args["server_settings"] = {"statement_timeout": str(int(timeout))}
+        options["connect_args"] = connect_args
+
+    return options
+
+
+def pool_stats(engine) -> dict:
+    """Occupancy of the engine's pool, plus checkout waits when it's timed"""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if not isinstance(pool, QueuePool):
+        return stats
+
+    stats.update(
+        size=pool.size(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
+        max_overflow=pool._max_overflow,
+        timeout=pool.timeout(),
+    )
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            checkouts = pool.checkouts
+            stats.update(
+                checkouts=checkouts,
+                timeouts=pool.timeouts,
+                wait_avg_ms=(
+                    round(pool.wait_total / checkouts * 1000, 3) if checkouts else 0
+                ),
+                wait_max_ms=round(pool.wait_max * 1000, 3),
+            )
+
+    # Share of the connections this worker may open that are in use,
+    # max_overflow=-1 means unbounded so there's no ceiling to compare to
+    capacity = stats["size"] + stats["max_overflow"]
+    stats["saturation"] = (
+        round(stats["checked_out"] / capacity, 3)
+        if stats["max_overflow"] >= 0 and capacity
+        else None
+    )
+    return stats
@@ -0,0 +1,307 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from .serializers import dumps
+from .shared import redis_client
+
+# A change as it travels from a write route to the open streams:
+# (version, [(kind, data), ...]). An empty list means "something changed,
+# read it from the database", which is what imports send.
+Change = tuple[int, list[tuple[str, dict]]]
+
+
+class StreamsFull(Exception):
+    """Raised by subscribe() when this worker already has its maximum of
+    open streams, the stream route turns it into a 503 with Retry-After"""
+
+
+class Subscription:
+    """One open stream's buffer. When it's full the broker drops further
+    changes and sets `overflowed`, the stream then re-reads what it missed
+    from the database instead of the writer ever waiting on a slow client."""
+
+    def __init__(self, user_id: int, size: int):
+        self.user_id = user_id
+        self.queue: queue.Queue[Change] = queue.Queue(size)
+        self.overflowed = False
+
+    def get(self, timeout: float) -> Change | None:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class MemoryBroker:
+    """Fans changes out to the streams open in this process, at most
+    max_subscribers of them at once (0 for no limit)"""
+
+    name = "memory"
+
+    def __init__(self, queue_size: int, max_subscribers: int = 0):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.published = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            if self.max_subscribers and self._count >= self.max_subscribers:
+                self.rejected += 1
+                raise StreamsFull
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: int, change: Change) -> None:
+        # `+=` isn't atomic, the request threads share these counters
+        with self._lock:
+            self.published += 1
+        self.deliver(user_id, change)
+
+    def deliver(self, user_id: int, change: Change) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        dropped = 0
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(change)
+            except queue.Full:
+                subscription.overflowed = True
+                dropped += 1
+        if dropped:
+            with self._lock:
+                self.dropped += dropped
+
+    def overflow_all(self) -> None:
+        """Make every stream catch up from the database, for when changes may
+        have been lost on the way here"""
+        with self._lock:
+            subscribers = [sub for subs in self._subscribers.values() for sub in subs]
+        for subscription in subscribers:
+            subscription.overflowed = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "subscribers": self._count,
+                "max_subscribers": self.max_subscribers,
+                "published": self.published,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+            }
+
+
+class RedisBroker:
+    """Shared backend, changes go through Redis pub/sub so a stream sees the
+    writes made on every worker. Each process runs one listener thread that
+    hands what it receives to a MemoryBroker for the local fan-out.
+
+    Pub/sub doesn't store anything, so after the listener loses its
+    connection every local stream re-reads from the database.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        client,
+        queue_size: int,
+        max_subscribers: int = 0,
+        prefix: str = "focusflow:events:",
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.local = MemoryBroker(queue_size, max_subscribers)
+        self.published = 0
+        self._listener_pid: int | None = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        self._ensure_listener()
+        return self.local.subscribe(user_id)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.local.unsubscribe(subscription)
+
+    def publish(self, user_id: int, change: Change) -> None:
+        version, events = change
+        self.client.publish(f"{self.prefix}{user_id}", dumps([version, events]))
+        # `+=` isn't atomic, the request threads share this counter
+        with self._lock:
+            self.published += 1
+
+    def _ensure_listener(self) -> None:
+        # Started lazily and per pid, a thread doesn't survive a fork
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            threading.Thread(
+                target=self._listen, name="task-events-listener", daemon=True
+            ).start()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{self.prefix}*")
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._dispatch(message)
+            except Exception:
+                self.local.overflow_all()
+                time.sleep(1)
+
+    def _dispatch(self, message: dict) -> None:
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        user_id = int(channel[len(self.prefix) :])
+        version, events = json.loads(message["data"])
+        self.local.deliver(user_id, (version, [tuple(event) for event in events]))
+
+    def stats(self) -> dict:
+        stats = self.local.stats()
+        stats["backend"] = self.name
+        with self._lock:
+            stats["published"] = self.published
+        return stats
+
+
+def init_task_events(app) -> None:
+    backend_name = (app.config["TASK_EVENTS_BACKEND"] or "memory").lower()
+    queue_size = app.config["TASK_EVENTS_QUEUE_SIZE"]
+    max_streams = app.config["TASK_STREAM_MAX_PER_WORKER"]
+
+    if backend_name == "memory":
+        broker = MemoryBroker(queue_size, max_streams)
+    elif backend_name == "redis":
+        broker = RedisBroker(redis_client(app), queue_size, max_streams)
+    else:
+        raise RuntimeError(f"Unknown TASK_EVENTS_BACKEND: {backend_name}")
+
+    app.extensions["task_events"] = broker
+
+
+def get_task_events() -> MemoryBroker | RedisBroker | None:
+    """None when the tasks blueprint isn't registered"""
+    return current_app.extensions.get("task_events")
+
+
+def publish_task_change(user_id: int, version: int, events: list) -> None:
+    """Call after committing a write to the user's tasks, with the events a
+    stream should send for it (kind, data), or [] to have streams read the
+    change from the database. A broker failure is logged, not raised: the
+    write is committed, and streams still get it from the database with
+    the user's next change or on reconnecting."""
+    broker = get_task_events()
+    if broker is None:
+        return
+    try:
+        broker.publish(user_id, (version, events))
+    except Exception:
+        current_app.logger.exception("Couldn't publish task change for %s", user_id)
+
+
+def format_event(kind: str, data: dict, event_id: int | None = None) -> bytes:
+    """One text/event-stream message"""
+    head = f"event: {kind}\n"
+    if event_id is not None:
+        head = f"id: {event_id}\n" + head
+    # dumps() ends with the newline that closes the data line
+    return head.encode() + b"data: " + dumps(data) + b"\n"
+
+
+def event_stream(
+    broker,
+    subscription: Subscription,
+    since: int | None,
+    version: int,
+    catch_up,
+    heartbeat: float,
+    max_age: float,
+    retry_ms: int,
+):
+    """Body of GET /api/tasks/stream.
+
+    `catch_up(since)` returns the "sync" event's data for everything after
+    `since`: {"version", "changed", "deleted"} as /changes returns them, and
+    "reset" when it had to start over from 0. It's used to resume from
+    Last-Event-ID and whenever the stream can't tell from its buffer alone
+    what it missed.
+    Every event's id is the user's task version once it has been sent in
+    full, so a reconnect never skips half of a batch.
+    """
+    last = version
+
+    def sync(after: int):
+        nonlocal last
+        data = catch_up(after)
+        last = data["version"]
+        return format_event("sync", data, last)
+
+    try:
+        yield f"retry: {retry_ms}\n\n".encode()
+        if since is None or since == version:
+            yield format_event("ready", {"version": version}, version)
+        else:
+            # A version from ahead of this database (e.g. a restored
+            # backup) can't be resumed from, send everything instead
+            yield sync(since if since < version else 0)
+
+        deadline = time.monotonic() + max_age
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Closing makes the client reconnect with a fresh token
+                return
+
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield sync(last)
+
+            change = subscription.get(min(heartbeat, remaining))
+            if change is None:
+                yield b": ping\n\n"
+                continue
+
+            change_version, events = change
+            if change_version <= last:
+                # Already covered by a catch-up
+                continue
+            if change_version != last + 1 or not events:
+                # One got lost or arrived out of order, or there's nothing
+                # to send without reading the database
+                yield sync(last)
+                continue
+
+            for i, (kind, data) in enumerate(events):
+                event_id = change_version if i == len(events) - 1 else None
+                yield format_event(kind, {"version": change_version, **data}, event_id)
+            last = change_version
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,99 @@
+from datetime import date, datetime, time, timedelta
+
+from .models import Task
+
+TRUE_STRINGS = {"true", "1", "yes", "y"}
+FALSE_STRINGS = {"false", "0", "no", "n", ""}
+
+# Columns each ?sort= key orders (and keyset-pages) by, id breaks ties.
+# Every one is served by an index that starts with user_id, see Task
+SORT_COLUMNS = {
+    "date": (Task.date, Task.id),
+    "name": (Task.name, Task.id),
+    "id": (Task.id,),
+}
+DEFAULT_SORT = "date"
+
+
+def parse_bool(raw: str, name: str) -> bool:
+    value = raw.strip().lower()
+    if value not in TRUE_STRINGS | FALSE_STRINGS:
+        raise ValueError(f"{name} must be true or false")
+    return value in TRUE_STRINGS
+
+
+def parse_date_bound(raw: str, name: str, end: bool = False) -> datetime:
+    """A YYYY-MM-DD date or an ISO 8601 datetime. A plain date as the end
+    of a range covers that whole day, so it becomes the next midnight."""
+    try:
+        if len(raw) == 10:
+            day = date.fromisoformat(raw)
+            bound = datetime.combine(day, time.min)
+            return bound + timedelta(days=1) if end else bound
+        return datetime.fromisoformat(raw)
+    except ValueError as err:
+        raise ValueError(f"{name} must be a date or datetime") from err
+
+
+def task_filters(args) -> tuple[list, tuple]:
+    """WHERE criteria for ?done=, ?from= and ?to= on the task list, and the
+    parsed values they were built from, which tell two filters apart
+    however their query strings were spelled.
+
+    Both ends are inclusive, a plain date for to includes that whole day.
+
+    Raises:
+        ValueError: for a value that doesn't parse.
+    """
+    criteria = []
+    values = []
+
+    done = args.get("done")
+    if done is not None and done.strip():
+        value = parse_bool(done, "done")
+        criteria.append(Task.done.is_(value))
+        values.append(("done", value))
+
+    start = args.get("from")
+    if start:
+        bound = parse_date_bound(start, "from")
+        criteria.append(Task.date >= bound)
+        values.append(("from", bound))
+
+    end = args.get("to")
+    if end:
+        bound = parse_date_bound(end, "to", end=True)
+        # A plain date has already been moved on to the next midnight
+        before = len(end) == 10
+        criteria.append(Task.date < bound if before else Task.date <= bound)
+        values.append(("before" if before else "to", bound))
+
+    return criteria, tuple(values)
+
+
+def task_sort(args) -> tuple[str, bool]:
+    """(sort key, descending) from ?sort= and ?order=
+
+    Raises:
+        ValueError: for an unknown key or order.
+    """
+    key = args.get("sort") or DEFAULT_SORT
+    if key not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+
+    order = (args.get("order") or "asc").lower()
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc")
+
+    return key, order == "desc"
+
+
+def sort_values(row, key: str) -> tuple:
+    """The sort columns' values from an (id, name, description, done, date)
+    task row, what the cursor for the next page is built from"""
+    task_id, name, _, _, task_date = row
+    if key == "date":
+        return task_date, task_id
+    if key == "name":
+        return name, task_id
+    return (task_id,)
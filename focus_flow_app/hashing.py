@@ -0,0 +1,109 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is full or a hash took too long,
+    the auth routes turn it into a 503 with Retry-After"""
+
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    Hashing is deliberately expensive, so rather than letting a burst of
+    logins queue up behind each other on every worker thread, at most
+    `workers` hashes run at once with room for `queue_size` more waiting.
+    Anything past that is rejected straight away with HashingBusy.
+    hashlib releases the GIL while it works, so the other request threads
+    keep running in the meantime.
+
+    workers=0 hashes inline on the request thread with no limit.
+    """
+
+    def __init__(self, method: str, workers: int, queue_size: int, timeout: float):
+        self.method = method
+        self._full_method = None
+        self.workers = workers
+        self.timeout = timeout
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max(1, workers + queue_size))
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Built on first use, and rebuilt after a fork since the parent's
+        # threads don't come along (e.g. gunicorn with preload_app)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reject(self) -> None:
+        # `+=` isn't atomic, the request threads share the counter
+        with self._lock:
+            self.rejected += 1
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            self._reject()
+            raise HashingBusy()
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError as err:
+            self._reject()
+            raise HashingBusy() from err
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        return self._run(check_password_hash, pwhash, password)
+
+    def full_method(self) -> str:
+        """PASSWORD_HASH_METHOD with the parameters werkzeug fills in, e.g.
+        "scrypt" is written out as "scrypt:32768:8:1". Worked out by hashing
+        a dummy password the first time it's needed rather than at startup,
+        where it would add one slow hash to every worker's boot"""
+        with self._lock:
+            if self._full_method is None:
+                pwhash = generate_password_hash("", self.method)
+                self._full_method = pwhash.split("$", 1)[0]
+            return self._full_method
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """True when the hash was made with other parameters than the
+        configured PASSWORD_HASH_METHOD"""
+        return pwhash.split("$", 1)[0] != self.full_method()
+
+
+def init_password_hasher(app) -> None:
+    app.extensions["password_hasher"] = PasswordHasher(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        queue_size=app.config["PASSWORD_HASH_QUEUE_SIZE"],
+        timeout=app.config["PASSWORD_HASH_TIMEOUT"],
+    )
+
+
+def get_password_hasher() -> PasswordHasher:
+    return current_app.extensions["password_hasher"]
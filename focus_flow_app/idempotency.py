@@ -0,0 +1,419 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import NamedTuple
+
+from flask import current_app, g, jsonify, make_response, request
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from .identity import get_token_user_id
+from .models import IdempotencyKey, db
+from .serializers import dumps
+
+HEADER = "Idempotency-Key"
+KEY_MAX_LENGTH = IdempotencyKey.__table__.c.key.type.length
+
+# INSERT ... ON CONFLICT DO NOTHING for the databases the app runs on
+CLAIM_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class StoredResponse(NamedTuple):
+    """What a key remembers. status is None while the first request holding
+    the key is still running."""
+
+    fingerprint: str
+    status: int | None
+    body: bytes | None
+    content_type: str | None
+
+
+class MemoryIdempotencyBackend:
+    """Per-worker store in insertion order, so eviction only ever looks at
+    the oldest entries at the front. A retry that lands on another worker
+    isn't recognised, use the database backend with more than one."""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # (user id, key) -> (expires at, response)
+        self._entries: OrderedDict[tuple, tuple[datetime, StoredResponse]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _evict(self, now: datetime) -> None:
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if expires_at > now and len(self._entries) <= self.max_keys:
+                break
+            self._entries.popitem(last=False)
+
+    def claim(self, user_id, key, fingerprint, lock_seconds) -> StoredResponse | None:
+        now = datetime.now()
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+            self._entries.pop((user_id, key), None)
+            self._entries[(user_id, key)] = (
+                now + timedelta(seconds=lock_seconds),
+                StoredResponse(fingerprint, None, None, None),
+            )
+            self._evict(now)
+            return None
+
+    def complete(self, user_id, key, response: StoredResponse, ttl) -> None:
+        with self._lock:
+            self._entries.pop((user_id, key), None)
+            self._entries[(user_id, key)] = (
+                datetime.now() + timedelta(seconds=ttl),
+                response,
+            )
+
+    def release(self, user_id, key) -> None:
+        with self._lock:
+            self._entries.pop((user_id, key), None)
+
+    def purge(self) -> int:
+        """Drop every expired entry, not just the ones at the front"""
+        now = datetime.now()
+        with self._lock:
+            expired = [key for key, (at, _) in self._entries.items() if at <= now]
+            for key in expired:
+                del self._entries[key]
+            return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DatabaseIdempotencyBackend:
+    """Shared store in the idempotency_key table. The claim is committed
+    before the view runs, its primary key is what stops two concurrent
+    requests with the same key from both going ahead. Views that write
+    save the response in their own transaction, see commit_write."""
+
+    name = "database"
+
+    def claim(self, user_id, key, fingerprint, lock_seconds) -> StoredResponse | None:
+        """Raises LookupError if the user no longer exists"""
+        now = datetime.now()
+        values = {
+            "user_id": user_id,
+            "key": key,
+            "fingerprint": fingerprint,
+            "expires_at": now + timedelta(seconds=lock_seconds),
+        }
+        insert = CLAIM_INSERTS[db.engine.dialect.name]
+        try:
+            claimed = db.session.execute(
+                insert(IdempotencyKey)
+                .values(values)
+                .on_conflict_do_nothing()
+                .returning(IdempotencyKey.user_id)
+            ).first()
+        except IntegrityError as err:
+            # A taken key is no error any more, this is the user's foreign key
+            db.session.rollback()
+            raise LookupError(user_id) from err
+        if claimed is not None:
+            db.session.commit()
+            return None
+
+        row = db.session.execute(
+            select(
+                IdempotencyKey.fingerprint,
+                IdempotencyKey.status,
+                IdempotencyKey.body,
+                IdempotencyKey.content_type,
+                IdempotencyKey.expires_at,
+            ).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        ).first()
+        if row is None:
+            # Released in the meantime, treat it like a request in progress
+            db.session.rollback()
+            return StoredResponse(fingerprint, None, None, None)
+
+        if row.expires_at <= now:
+            # Expired, or its request died before finishing: take it over
+            # unless another retry just did. The purge job drops the rest.
+            taken = db.session.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.expires_at <= now,
+                )
+                .values(status=None, body=None, content_type=None, **values)
+            )
+            db.session.commit()
+            if taken.rowcount:
+                return None
+            return StoredResponse(fingerprint, None, None, None)
+
+        db.session.rollback()
+        return StoredResponse(*row[:4])
+
+    def complete_statement(self, user_id, key, response: StoredResponse, ttl):
+        """The UPDATE that stores the response, for the write's own
+        transaction"""
+        return (
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(
+                status=response.status,
+                body=response.body,
+                content_type=response.content_type,
+                expires_at=datetime.now() + timedelta(seconds=ttl),
+            )
+        )
+
+    def complete(self, user_id, key, response: StoredResponse, ttl) -> None:
+        db.session.execute(self.complete_statement(user_id, key, response, ttl))
+        db.session.commit()
+
+    def release(self, user_id, key) -> None:
+        db.session.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+            )
+        )
+        db.session.commit()
+
+    def purge(self) -> int:
+        result = db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now())
+        )
+        db.session.commit()
+        return result.rowcount
+
+
+class IdempotencyStore:
+    def __init__(self, backend, ttl: float, lock_timeout: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.replays = 0
+        self.conflicts = 0
+        # `+=` isn't atomic, the request threads share these counters
+        self._lock = threading.Lock()
+
+    def add_replay(self) -> None:
+        with self._lock:
+            self.replays += 1
+
+    def add_conflict(self) -> None:
+        with self._lock:
+            self.conflicts += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            replays, conflicts = self.replays, self.conflicts
+        return {
+            "backend": self.backend.name,
+            "replays": replays,
+            "conflicts": conflicts,
+        }
+
+
+def init_idempotency(app) -> None:
+    backend_name = (app.config["IDEMPOTENCY_BACKEND"] or "none").lower()
+
+    if backend_name == "none":
+        backend = None
+    elif backend_name == "memory":
+        backend = MemoryIdempotencyBackend(app.config["IDEMPOTENCY_MAX_KEYS"])
+    elif backend_name == "database":
+        backend = DatabaseIdempotencyBackend()
+    else:
+        raise RuntimeError(f"Unknown IDEMPOTENCY_BACKEND: {backend_name}")
+
+    app.extensions["idempotency"] = (
+        None
+        if backend is None
+        else IdempotencyStore(
+            backend,
+            ttl=app.config["IDEMPOTENCY_TTL"],
+            lock_timeout=app.config["IDEMPOTENCY_LOCK_TIMEOUT"],
+        )
+    )
+
+
+def get_idempotency_store() -> IdempotencyStore | None:
+    return current_app.extensions.get("idempotency")
+
+
+def fingerprint_of(method: str, path: str, query: str, body: bytes) -> str:
+    """What a key is bound to: method, path, query string and body"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (method, path, query):
+        digest.update(part.encode() + b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def request_fingerprint(hash_body: bool = True) -> str:
+    """fingerprint_of() the current request. Views that stream their body
+    only hash its length and type."""
+    if hash_body:
+        body = request.get_data(cache=True)
+    else:
+        body = f"{request.content_length}:{request.mimetype}".encode()
+    return fingerprint_of(
+        request.method, request.path, request.query_string.decode(), body
+    )
+
+
+def invalid_key(key: str) -> str | None:
+    """Error message for a key we won't store, or None if it's fine"""
+    if not key.strip() or len(key) > KEY_MAX_LENGTH:
+        return f"{HEADER} must be 1 to {KEY_MAX_LENGTH} characters"
+    return None
+
+
+def idempotent(hash_body: bool = True):
+    """Let clients retry a write safely by sending an Idempotency-Key header.
+
+    The first request with a key runs as usual and its response (unless it's
+    a 5xx) is kept for IDEMPOTENCY_TTL seconds. Repeats from the same user
+    get that response back with Idempotent-Replayed: true and never reach the
+    view. A repeat while the first is still running gets 409, the same key
+    on a different request 422, and a token whose user is gone 401.
+    Requests without the header aren't touched.
+
+    Goes below @jwt_required, keys are scoped to the token's user.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            store = get_idempotency_store()
+            if key is None or store is None:
+                return view(*args, **kwargs)
+
+            error = invalid_key(key)
+            if error:
+                return jsonify({"error": error}), 400
+
+            user_id = get_token_user_id()
+            if user_id is None:
+                return view(*args, **kwargs)
+
+            fingerprint = request_fingerprint(hash_body)
+            try:
+                stored = store.backend.claim(
+                    user_id, key, fingerprint, store.lock_timeout
+                )
+            except LookupError:
+                return jsonify({}), 401
+            if stored is not None:
+                replayed, headers = replay(store, stored, fingerprint)
+                return current_app.response_class(
+                    replayed.body,
+                    status=replayed.status,
+                    content_type=replayed.content_type,
+                    headers=headers,
+                )
+
+            g.idempotency_claim = (user_id, key, fingerprint)
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                db.session.rollback()
+                # Once the write has committed its response, a retry has
+                # to get that rather than run it again
+                if not g.pop("idempotency_stored", False):
+                    store.backend.release(user_id, key)
+                raise
+            finally:
+                g.pop("idempotency_claim", None)
+
+            if g.pop("idempotency_stored", False):
+                return response
+
+            if response.status_code >= 500 or response.is_streamed:
+                # Not worth repeating, let the retry run again
+                store.backend.release(user_id, key)
+                return response
+
+            store.backend.complete(
+                user_id, key, stored_response(fingerprint, response), store.ttl
+            )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def stored_response(fingerprint: str, response) -> StoredResponse:
+    return StoredResponse(
+        fingerprint, response.status_code, response.get_data(), response.content_type
+    )
+
+
+def commit_write(response) -> None:
+    """Commit the view's write. When the request holds an Idempotency-Key in
+    the database store, the response its retries will get is saved in the
+    same transaction, so neither commits without the other. Views that
+    commit more than once (imports) leave it to @idempotent afterwards."""
+    claim = g.get("idempotency_claim")
+    store = get_idempotency_store()
+    if claim is None or not isinstance(store.backend, DatabaseIdempotencyBackend):
+        db.session.commit()
+        return
+
+    user_id, key, fingerprint = claim
+    db.session.execute(
+        store.backend.complete_statement(
+            user_id, key, stored_response(fingerprint, response), store.ttl
+        )
+    )
+    db.session.commit()
+    g.idempotency_stored = True
+
+
+def keep_response(response) -> None:
+    """Store the response of a view that failed after committing part of its
+    write (imports), so a retry gets it back instead of writing that part
+    again. Kept even when it's a 5xx."""
+    claim = g.get("idempotency_claim")
+    if claim is None:
+        return
+
+    store = get_idempotency_store()
+    user_id, key, fingerprint = claim
+    store.backend.complete(
+        user_id, key, stored_response(fingerprint, response), store.ttl
+    )
+    g.idempotency_stored = True
+
+
+def replay(
+    store: IdempotencyStore, stored: StoredResponse, fingerprint: str
+) -> tuple[StoredResponse, dict]:
+    """The response, and its extra headers, for a request whose key was
+    already claimed"""
+    if stored.status is None:
+        store.add_conflict()
+        error = f"A request with this {HEADER} is still being processed"
+        return error_response(409, error), {"Retry-After": "1"}
+
+    if stored.fingerprint != fingerprint:
+        store.add_conflict()
+        error = f"{HEADER} was already used for a different request"
+        return error_response(422, error), {}
+
+    store.add_replay()
+    return stored, {"Idempotent-Replayed": "true"}
+
+
+def error_response(status: int, error: str) -> StoredResponse:
+    return StoredResponse("", status, dumps({"error": error}), "application/json")
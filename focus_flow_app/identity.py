@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from flask import current_app, has_app_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, select
+
+from .models import User, db
+
+
+class CachedUser(NamedTuple):
+    """The parts of a User that are safe to keep around between requests"""
+
+    id: int
+    username: str
+    email: str
+
+
+class IdentityCache:
+    """Small LRU of user id -> CachedUser entries that expire after `ttl` seconds.
+
+    A ttl of 0 turns the cache off and every lookup goes to the database.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10_000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[int, tuple[float, CachedUser]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> CachedUser | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user: CachedUser) -> None:
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def init_identity_cache(app) -> None:
+    app.extensions["identity_cache"] = IdentityCache(
+        ttl=app.config["IDENTITY_CACHE_TTL"],
+        maxsize=app.config["IDENTITY_CACHE_SIZE"],
+    )
+
+
+def load_user(user_id: int) -> CachedUser | None:
+    """Return the user with this id, from the identity cache when possible.
+
+    Only routes that really need the user (rather than just the id from the
+    token) should call this, the task routes scope their queries by id alone.
+    """
+    cache = current_app.extensions["identity_cache"]
+
+    user = cache.get(user_id)
+    if user is not None:
+        return user
+
+    row = db.session.execute(
+        select(User.id, User.username, User.email).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+
+    user = CachedUser(*row)
+    cache.set(user)
+    return user
+
+
+def get_token_user_id() -> int | None:
+    """Get the current user id from the token without touching the database.
+
+    Callers must check the user still exists some other way, the write
+    routes get that for free from focus_flow_app.sync.next_version.
+    """
+    identity = get_jwt_identity()
+
+    if not identity:
+        return None
+
+    return int(identity)
+
+
+def get_user_id() -> int | None:
+    """Get the current user id from the token.
+
+    Returns None when the token has no identity or the user no longer exists,
+    which on a warm cache costs no database round trip at all.
+    """
+    user_id = get_token_user_id()
+
+    if user_id is None or load_user(user_id) is None:
+        return None
+
+    return user_id
+
+
+@event.listens_for(User, "after_delete")
+@event.listens_for(User, "after_update")
+def _evict_cached_user(mapper, connection, target):
+    """Keep this worker's cache honest when a user changes or goes away,
+    other workers catch up once their entry expires"""
+    if not has_app_context():
+        return
+
+    cache = current_app.extensions.get("identity_cache")
+    if cache is not None:
+        cache.discard(target.id)
@@ -0,0 +1,482 @@
+"""Background upkeep of the database, run by one worker at a time.
+
+Every worker runs a scheduler thread, started with its first request
+(a thread doesn't survive gunicorn's fork, and the `flask db` commands
+never start one). Each poll the thread tries to become the leader and
+only the leader runs the jobs that are due: a lock file for SQLite, which
+lives on one host, and a session-level advisory lock on Postgres, held by
+a connection of its own outside the pool. The leader keeps the lock until
+its process exits, then another worker takes over within one poll.
+
+Jobs:
+
+- done_tasks: deletes tasks done more than TASK_RETENTION_DAYS ago, a
+  chunk at a time, each in its own short transaction. The deletes go
+  through the same versions and tombstones as the write routes, so open
+  streams and delta sync tell clients about them.
+- tombstones: deletes the tombstones of tasks deleted more than
+  TOMBSTONE_RETENTION_DAYS ago and raises each user's tombstone horizon
+  past them. Delta sync from before the horizon gets a full resync instead.
+- idempotency_keys: drops expired Idempotency-Key responses.
+- database_upkeep: refreshes the planner statistics (ANALYZE) and reclaims
+  the space of deleted rows, VACUUM on Postgres and an optimize of the
+  full-text index on SQLite.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import takewhile
+from typing import Callable, NamedTuple
+
+try:
+    import fcntl
+except ImportError:  # Windows, where the dev server runs a single process
+    fcntl = None
+
+from flask import current_app
+from sqlalchemy import create_engine, delete, func, select, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import NullPool
+
+from .cache import invalidate_task_list
+from .events import publish_task_change
+from .idempotency import get_idempotency_store
+from .metrics import MAINTENANCE_BUCKETS, app_stats, labels
+from .models import Task, TaskTombstone, User, db
+from .search import FTS_TABLE
+from .sync import next_version, record_tombstones
+
+# pg_try_advisory_lock key, the same in every worker of every deployment
+# sharing the database
+ADVISORY_LOCK_KEY = 0x466F6375
+
+# Tables that take most of the writes, for VACUUM (ANALYZE) on Postgres
+UPKEEP_TABLES = ("task", "task_tombstone", "idempotency_key")
+
+
+class Job(NamedTuple):
+    name: str
+    # Seconds between runs
+    interval: float
+    # Returns the rows it changed
+    run: Callable[[], int]
+
+
+class FileLeaderLock:
+    """flock() on a file, held by the process that gets it first"""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            return True
+
+        file = open(self.path, "a")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        self._file = file
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PostgresLeaderLock:
+    """pg_try_advisory_lock() on a connection kept open while it's held.
+    The lock goes with the connection, so a lost connection gives it up."""
+
+    name = "postgres"
+
+    def __init__(self, engine, key: int = ADVISORY_LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self._conn = None
+
+    def acquire(self) -> bool:
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))
+                self._conn.commit()
+                return True
+            except DBAPIError:
+                self.release()
+
+        conn = self.engine.connect()
+        try:
+            held = conn.scalar(select(func.pg_try_advisory_lock(self.key)))
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not held:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def release(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except DBAPIError:
+                pass
+            self._conn = None
+
+
+def purge_done_tasks(
+    retention_days: float, chunk_size: int, pause: float, now: datetime | None = None
+) -> int:
+    """Delete tasks done more than retention_days ago, chunk_size at a time.
+
+    A task's date is updated on every write, so for a done task it's when
+    it was completed or last edited. Chunks are found by walking the
+    primary key, one pass over the table without an index of their own.
+    Each chunk claims a version for every user it touches and commits
+    before the next, which keeps the time those users' writes wait on the
+    lock short. Users are locked in id order, as the write routes only
+    ever take one user's lock there is nothing to deadlock with.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    expired = (Task.done.is_(True), Task.date < cutoff)
+    total = 0
+    after = 0
+
+    while True:
+        rows = db.session.execute(
+            select(Task.id, Task.user_id)
+            .where(Task.id > after, *expired)
+            .order_by(Task.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        after = rows[-1].id
+
+        by_user = defaultdict(list)
+        for task_id, user_id in rows:
+            by_user[user_id].append(task_id)
+
+        changes = []
+        for user_id, task_ids in sorted(by_user.items()):
+            version = next_version(user_id)
+            if version is None:
+                continue
+            # Checked again, the task may have been reopened since
+            deleted = db.session.scalars(
+                delete(Task)
+                .where(Task.id.in_(task_ids), Task.user_id == user_id, *expired)
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if deleted:
+                record_tombstones(user_id, deleted, version)
+                changes.append((user_id, version, deleted))
+        db.session.commit()
+
+        for user_id, version, deleted in changes:
+            invalidate_task_list(user_id)
+            publish_task_change(
+                user_id,
+                version,
+                [("delete", {"task": {"id": task_id}}) for task_id in deleted],
+            )
+            total += len(deleted)
+
+        if len(rows) < chunk_size:
+            break
+        # Let the writers queued behind this chunk through
+        time.sleep(pause)
+
+    return total
+
+
+def compact_tombstones(
+    retention_days: float, chunk_size: int, pause: float, now: datetime | None = None
+) -> int:
+    """Delete tombstones older than retention_days, chunk_size at a time.
+
+    Tombstones are inserted in id order as tasks are deleted, so the old
+    ones are at the start of the primary key and the walk stops at the first
+    one that's too young, without an index on deleted_at. Each chunk raises
+    the horizon of the users it touches to the newest version it deletes,
+    in the same transaction as the delete, so a client can never resume
+    from a version whose deletes are gone without being told to resync.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    total = 0
+
+    while True:
+        oldest = db.session.execute(
+            select(
+                TaskTombstone.id,
+                TaskTombstone.user_id,
+                TaskTombstone.version,
+                TaskTombstone.deleted_at,
+            )
+            .order_by(TaskTombstone.id)
+            .limit(chunk_size)
+        ).all()
+        rows = list(takewhile(lambda row: row.deleted_at < cutoff, oldest))
+        if not rows:
+            break
+
+        horizons = defaultdict(int)
+        for _, user_id, version, _ in rows:
+            horizons[user_id] = max(horizons[user_id], version)
+
+        for user_id, horizon in sorted(horizons.items()):
+            db.session.execute(
+                update(User)
+                .where(User.id == user_id, User.tombstone_horizon < horizon)
+                .values(tombstone_horizon=horizon)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.execute(
+            delete(TaskTombstone)
+            .where(TaskTombstone.id.in_([row.id for row in rows]))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        total += len(rows)
+
+        if len(rows) < chunk_size:
+            break
+        # Let the writers queued behind this chunk through
+        time.sleep(pause)
+
+    return total
+
+
+def purge_idempotency_keys() -> int:
+    store = get_idempotency_store()
+    return 0 if store is None else store.backend.purge()
+
+
+def database_upkeep(upkeep_engine) -> int:
+    """ANALYZE, and VACUUM where the database needs it. Postgres runs it on
+    a connection without DB_STATEMENT_TIMEOUT_MS, VACUUM can't run inside
+    a transaction and may take longer than any request should."""
+    dialect = db.engine.dialect.name
+
+    if dialect == "postgresql":
+        with upkeep_engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.exec_driver_sql(f"VACUUM (ANALYZE) {', '.join(UPKEEP_TABLES)}")
+    elif dialect == "sqlite":
+        with db.engine.connect() as conn:
+            # Statistics from a sample of each index instead of all of it
+            conn.exec_driver_sql("PRAGMA analysis_limit=1000")
+            conn.exec_driver_sql("ANALYZE")
+            has_fts = conn.scalar(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                {"name": FTS_TABLE},
+            )
+            if has_fts:
+                # Deletes only add to the index, until it's merged back into
+                # one segment searches read what they left behind too
+                conn.exec_driver_sql(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+                )
+            conn.commit()
+
+    return 0
+
+
+class MaintenanceScheduler:
+    def __init__(self, app, jobs: list[Job], lock, poll_interval: float):
+        self.app = app
+        self.jobs = jobs
+        self.lock = lock
+        self.poll_interval = poll_interval
+        self.leader = False
+        self.stats_by_job = {
+            job.name: {
+                "runs": 0,
+                "failures": 0,
+                "rows": 0,
+                "last_run_at": None,
+                "last_duration": None,
+                "last_error": None,
+            }
+            for job in jobs
+        }
+        self._next_run = {job.name: 0.0 for job in jobs}
+        self._thread_pid: int | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        # Started lazily and per pid, a thread doesn't survive a fork
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            self._stop.clear()
+            threading.Thread(
+                target=self._loop, name="maintenance-scheduler", daemon=True
+            ).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.run_pending()
+            except Exception:
+                self.app.logger.exception("Maintenance poll failed")
+        self.lock.release()
+        self.leader = False
+
+    def run_pending(self) -> list[str]:
+        """Run the jobs that are due if this process is the leader, returns
+        their names"""
+        self.leader = self.lock.acquire()
+        if not self.leader:
+            return []
+
+        ran = []
+        for job in self.jobs:
+            if time.monotonic() >= self._next_run[job.name]:
+                self.run_job(job)
+                ran.append(job.name)
+        return ran
+
+    def run_job(self, job: Job) -> None:
+        stats = self.stats_by_job[job.name]
+        start = time.perf_counter()
+        rows, error = 0, None
+        with self.app.app_context():
+            try:
+                rows = job.run()
+            except Exception as err:
+                db.session.rollback()
+                error = f"{type(err).__name__}: {err}"
+                self.app.logger.exception("Maintenance job %s failed", job.name)
+            finally:
+                db.session.remove()
+        elapsed = time.perf_counter() - start
+        self._next_run[job.name] = time.monotonic() + job.interval
+
+        stats["runs"] += 1
+        stats["rows"] += rows
+        stats["last_run_at"] = round(time.time(), 3)
+        stats["last_duration"] = round(elapsed, 6)
+        stats["last_error"] = error
+        if error:
+            stats["failures"] += 1
+
+        registry = self.app.extensions.get("metrics")
+        if registry is not None:
+            series = labels(job=job.name)
+            registry.observe(
+                "focusflow_maintenance_job_duration_seconds",
+                series,
+                MAINTENANCE_BUCKETS,
+                elapsed,
+            )
+            registry.inc("focusflow_maintenance_rows_total", series, rows)
+            if error:
+                registry.inc("focusflow_maintenance_job_failures_total", series)
+            registry.maybe_flush(lambda: app_stats(self.app))
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.lock.name,
+            "leader": self.leader,
+            "jobs": {name: dict(stats) for name, stats in self.stats_by_job.items()},
+        }
+
+
+def default_lock_path(database_url) -> str:
+    """One lock file per database, in the temp directory every worker sees"""
+    digest = hashlib.blake2b(str(database_url).encode(), digest_size=6).hexdigest()
+    return os.path.join(tempfile.gettempdir(), f"focusflow-maintenance-{digest}.lock")
+
+
+def init_maintenance(app) -> None:
+    if not app.config["MAINTENANCE_ENABLED"]:
+        app.extensions["maintenance"] = None
+        return
+
+    with app.app_context():
+        engine = db.engine
+    # Outside the pool and without the statement timeout, for the advisory
+    # lock's long-lived connection and for VACUUM
+    upkeep_engine = (
+        create_engine(engine.url, poolclass=NullPool)
+        if engine.dialect.name == "postgresql"
+        else engine
+    )
+
+    if engine.dialect.name == "postgresql":
+        lock = PostgresLeaderLock(upkeep_engine)
+    else:
+        lock = FileLeaderLock(
+            app.config["MAINTENANCE_LOCK_FILE"] or default_lock_path(engine.url)
+        )
+
+    interval = app.config["MAINTENANCE_INTERVAL"]
+    chunking = (
+        app.config["MAINTENANCE_CHUNK_SIZE"],
+        app.config["MAINTENANCE_CHUNK_PAUSE"],
+    )
+    jobs = []
+    if app.config["TASK_RETENTION_DAYS"] > 0:
+        jobs.append(
+            Job(
+                "done_tasks",
+                interval,
+                partial(purge_done_tasks, app.config["TASK_RETENTION_DAYS"], *chunking),
+            )
+        )
+    if app.config["TOMBSTONE_RETENTION_DAYS"] > 0:
+        jobs.append(
+            Job(
+                "tombstones",
+                interval,
+                partial(
+                    compact_tombstones,
+                    app.config["TOMBSTONE_RETENTION_DAYS"],
+                    *chunking,
+                ),
+            )
+        )
+    jobs.append(Job("idempotency_keys", interval, purge_idempotency_keys))
+    if app.config["MAINTENANCE_UPKEEP_INTERVAL"] > 0:
+        jobs.append(
+            Job(
+                "database_upkeep",
+                app.config["MAINTENANCE_UPKEEP_INTERVAL"],
+                partial(database_upkeep, upkeep_engine),
+            )
+        )
+
+    scheduler = MaintenanceScheduler(
+        app, jobs, lock, app.config["MAINTENANCE_POLL_INTERVAL"]
+    )
+    app.extensions["maintenance"] = scheduler
+    app.before_request(scheduler.start)
+
+
+def get_maintenance() -> MaintenanceScheduler | None:
+    return current_app.extensions.get("maintenance")
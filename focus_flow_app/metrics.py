@@ -0,0 +1,415 @@
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from flask import current_app, request
+from sqlalchemy import event
+
+# Upper bounds of the histogram buckets, +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+MAINTENANCE_BUCKETS = (0.01, 0.1, 1.0, 10.0, 60.0, 300.0, 1800.0)
+
+METRICS = {
+    "focusflow_http_requests_total": ("counter", "Requests handled"),
+    "focusflow_http_request_duration_seconds": (
+        "histogram",
+        "Time from before_request to after_request",
+    ),
+    "focusflow_http_response_size_bytes": (
+        "histogram",
+        "Response body size, streamed responses aren't counted",
+    ),
+    "focusflow_db_queries_per_request": ("histogram", "SQL statements per request"),
+    "focusflow_db_query_seconds_total": (
+        "counter",
+        "Time spent executing SQL during requests",
+    ),
+    "focusflow_task_cache_events_total": ("counter", "Task list cache lookups"),
+    "focusflow_ratelimit_rejected_total": ("counter", "Requests refused with 429"),
+    "focusflow_password_hash_rejected_total": (
+        "counter",
+        "Signups/logins refused with 503 because the hashing pool was full",
+    ),
+    "focusflow_task_stream_subscribers": ("gauge", "Open task event streams"),
+    "focusflow_task_events_dropped_total": (
+        "counter",
+        "Changes not buffered for a stream that had fallen behind",
+    ),
+    "focusflow_task_stream_rejected_total": (
+        "counter",
+        "Streams refused with 503 because the worker had its maximum open",
+    ),
+    "focusflow_db_pool_connections": ("gauge", "Connections by pool state"),
+    "focusflow_db_pool_checkout_timeouts_total": (
+        "counter",
+        "Checkouts that gave up waiting for a connection",
+    ),
+    "focusflow_maintenance_job_duration_seconds": (
+        "histogram",
+        "Time taken by each run of a maintenance job",
+    ),
+    "focusflow_maintenance_rows_total": (
+        "counter",
+        "Rows deleted by maintenance jobs",
+    ),
+    "focusflow_maintenance_job_failures_total": (
+        "counter",
+        "Maintenance job runs that raised",
+    ),
+    "focusflow_maintenance_leader": (
+        "gauge",
+        "1 on the worker that runs the maintenance jobs",
+    ),
+}
+
+# [queries, seconds in SQL, start of the running statement, start of the
+# request] for the request being handled on this thread, None outside requests
+_request_sql: ContextVar[list | None] = ContextVar("request_sql", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def labels(**values) -> str:
+    """Render a label set, e.g. 'endpoint="tasks.get_tasks",status="200"'"""
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in values.items())
+
+
+class MetricsRegistry:
+    """This process's counters and histograms.
+
+    Series are keyed by their rendered label string so snapshots from
+    several processes merge by plain addition. Histograms are stored as
+    [bucket counts..., +Inf count, sum]. "collected" holds the values
+    read from the other subsystems by app_stats() at snapshot time.
+    """
+
+    def __init__(self, directory: str | None = None, flush_interval: float = 5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.counters: dict[str, dict[str, float]] = {}
+        self.histograms: dict[str, dict[str, list]] = {}
+        self._lock = threading.Lock()
+        self._next_flush = 0.0
+        self._series: dict[tuple, tuple[str, str]] = {}
+
+    def _inc(self, name: str, series: str, value: float) -> None:
+        values = self.counters.setdefault(name, {})
+        values[series] = values.get(series, 0) + value
+
+    def _observe(self, name: str, series: str, buckets: tuple, value: float) -> None:
+        values = self.histograms.setdefault(name, {})
+        counts = values.get(series)
+        if counts is None:
+            counts = values[series] = [0] * (len(buckets) + 1) + [0.0]
+        counts[bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+    def inc(self, name: str, series: str, value: float = 1) -> None:
+        with self._lock:
+            self._inc(name, series, value)
+
+    def observe(self, name: str, series: str, buckets: tuple, value: float) -> None:
+        with self._lock:
+            self._observe(name, series, buckets, value)
+
+    def record_request(
+        self,
+        blueprint: str,
+        endpoint: str,
+        method: str,
+        status: int,
+        elapsed: float,
+        size: int | None,
+        queries: int,
+        sql_seconds: float,
+    ) -> None:
+        """Everything about one request under a single lock acquisition.
+        The label strings are rendered once per endpoint/method/status."""
+        key = (blueprint, endpoint, method, status)
+        names = self._series.get(key)
+        if names is None:
+            series = labels(blueprint=blueprint, endpoint=endpoint)
+            names = self._series[key] = (
+                series,
+                f"{series},{labels(method=method, status=status)}",
+            )
+        series, request_series = names
+
+        with self._lock:
+            self._inc("focusflow_http_requests_total", request_series, 1)
+            self._observe(
+                "focusflow_http_request_duration_seconds",
+                series,
+                LATENCY_BUCKETS,
+                elapsed,
+            )
+            if size is not None:
+                self._observe(
+                    "focusflow_http_response_size_bytes", series, SIZE_BUCKETS, size
+                )
+            self._observe(
+                "focusflow_db_queries_per_request", series, QUERY_BUCKETS, queries
+            )
+            if sql_seconds:
+                self._inc("focusflow_db_query_seconds_total", series, sql_seconds)
+
+    def snapshot(self, extra: dict | None = None) -> dict:
+        with self._lock:
+            counters = {name: dict(values) for name, values in self.counters.items()}
+            histograms = {
+                name: {series: list(counts) for series, counts in values.items()}
+                for name, values in self.histograms.items()
+            }
+        return {
+            "counters": counters,
+            "histograms": histograms,
+            "collected": extra or {},
+        }
+
+    def _path(self) -> str:
+        return os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+
+    def flush(self, extra: dict | None = None) -> None:
+        """Write this process's snapshot for the worker that gets scraped.
+        Replaced atomically so a reader never sees a half-written file."""
+        if not self.directory:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(self.snapshot(extra), tmp)
+        os.replace(tmp_path, self._path())
+
+    def maybe_flush(self, extra_factory) -> None:
+        now = time.monotonic()
+        if self.directory and now >= self._next_flush:
+            self._next_flush = now + self.flush_interval
+            self.flush(extra_factory())
+
+    def collect(self, extra: dict | None = None) -> dict:
+        """Totals across every process that wrote to the directory, or just
+        this one without METRICS_DIR"""
+        if not self.directory:
+            return self.snapshot(extra)
+
+        self.flush(extra)
+        merged: dict = {"counters": {}, "histograms": {}, "collected": {}}
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path) as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue
+
+            # Counters of workers that have since exited still count towards
+            # the totals, their pool occupancy and the like doesn't
+            kinds = ["counters"]
+            if _pid_alive(path):
+                kinds.append("collected")
+
+            for kind in kinds:
+                for name, values in snapshot.get(kind, {}).items():
+                    target = merged[kind].setdefault(name, {})
+                    for series, value in values.items():
+                        target[series] = target.get(series, 0) + value
+
+            for name, values in snapshot.get("histograms", {}).items():
+                target = merged["histograms"].setdefault(name, {})
+                for series, counts in values.items():
+                    current = target.get(series)
+                    target[series] = (
+                        list(counts)
+                        if current is None
+                        else [a + b for a, b in zip(current, counts, strict=True)]
+                    )
+        return merged
+
+
+def _pid_alive(path: str) -> bool:
+    try:
+        pid = int(os.path.basename(path)[len("metrics-") : -len(".json")])
+        os.kill(pid, 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def render(data: dict) -> str:
+    """Prometheus text exposition format"""
+    buckets_for = {
+        "focusflow_http_request_duration_seconds": LATENCY_BUCKETS,
+        "focusflow_http_response_size_bytes": SIZE_BUCKETS,
+        "focusflow_db_queries_per_request": QUERY_BUCKETS,
+        "focusflow_maintenance_job_duration_seconds": MAINTENANCE_BUCKETS,
+    }
+    lines = []
+
+    def header(name):
+        kind, help_text = METRICS.get(name, ("untyped", ""))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for kind in ("counters", "collected"):
+        for name, values in sorted(data[kind].items()):
+            header(name)
+            for series, value in sorted(values.items()):
+                lines.append(
+                    f"{name}{{{series}}} {value}" if series else f"{name} {value}"
+                )
+
+    for name, values in sorted(data["histograms"].items()):
+        header(name)
+        bounds = [*(str(b) for b in buckets_for[name]), "+Inf"]
+        for series, counts in sorted(values.items()):
+            prefix = f"{series}," if series else ""
+            cumulative = 0
+            for bound, count in zip(bounds, counts[:-1], strict=True):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{series}}} {counts[-1]}")
+            lines.append(f"{name}_count{{{series}}} {cumulative}")
+
+    return "\n".join(lines) + "\n"
+
+
+def app_stats(app) -> dict:
+    """Point-in-time values owned by the other subsystems, stored alongside
+    the request metrics in each snapshot"""
+    from .database import pool_stats
+    from .models import db
+
+    gauges: dict[str, dict[str, float]] = {}
+
+    cache = app.extensions.get("task_cache")
+    if cache is not None:
+        gauges["focusflow_task_cache_events_total"] = {
+            labels(event="hit"): cache.hits,
+            labels(event="miss"): cache.misses,
+            labels(event="invalidation"): cache.invalidations,
+        }
+
+    limiter = app.extensions.get("rate_limiter")
+    if limiter is not None:
+        rejected = limiter.stats()["rejected"]
+        gauges["focusflow_ratelimit_rejected_total"] = {
+            labels(limit=name): count for name, count in rejected.items()
+        }
+
+    hasher = app.extensions.get("password_hasher")
+    if hasher is not None:
+        gauges["focusflow_password_hash_rejected_total"] = {"": hasher.rejected}
+
+    broker = app.extensions.get("task_events")
+    if broker is not None:
+        events = broker.stats()
+        gauges["focusflow_task_stream_subscribers"] = {"": events["subscribers"]}
+        gauges["focusflow_task_events_dropped_total"] = {"": events["dropped"]}
+        gauges["focusflow_task_stream_rejected_total"] = {"": events["rejected"]}
+
+    maintenance = app.extensions.get("maintenance")
+    if maintenance is not None:
+        gauges["focusflow_maintenance_leader"] = {"": int(maintenance.leader)}
+
+    with app.app_context():
+        pool = pool_stats(db.engine)
+    if "checked_out" in pool:
+        gauges["focusflow_db_pool_connections"] = {
+            labels(state="checked_in"): pool["checked_in"],
+            labels(state="checked_out"): pool["checked_out"],
+            labels(state="overflow"): max(0, pool["overflow"]),
+        }
+    if "timeouts" in pool:
+        gauges["focusflow_db_pool_checkout_timeouts_total"] = {"": pool["timeouts"]}
+
+    return gauges
+
+
+def _before_request():
+    _request_sql.set([0, 0.0, 0.0, time.perf_counter()])
+
+
+def _after_request(response):
+    sql = _request_sql.get()
+    if sql is None:
+        return response
+
+    elapsed = time.perf_counter() - sql[3]
+    req = request._get_current_object()
+    app = current_app._get_current_object()
+    registry = app.extensions["metrics"]
+    registry.record_request(
+        req.blueprint or "",
+        req.endpoint or "unmatched",
+        req.method,
+        response.status_code,
+        elapsed,
+        None if response.is_streamed else response.content_length or 0,
+        sql[0],
+        sql[1],
+    )
+    registry.maybe_flush(lambda: app_stats(app))
+    return response
+
+
+def _teardown_request(_):
+    _request_sql.set(None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql = _request_sql.get()
+    if sql is not None:
+        sql[2] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql = _request_sql.get()
+    if sql is not None:
+        sql[0] += 1
+        sql[1] += time.perf_counter() - sql[2]
+
+
+def init_metrics(app, db) -> None:
+    """Request and SQL instrumentation, served by GET /metrics.
+
+    Every worker keeps its own registry. With METRICS_DIR set, each one
+    writes a snapshot there at most every METRICS_FLUSH_INTERVAL seconds
+    and whichever worker is scraped adds them all up, so the totals don't
+    depend on which worker answers. Clear the directory when the server
+    starts.
+    """
+    if not app.config["METRICS_ENABLED"]:
+        app.extensions["metrics"] = None
+        return
+
+    registry = MetricsRegistry(
+        app.config["METRICS_DIR"] or None, app.config["METRICS_FLUSH_INTERVAL"]
+    )
+    app.extensions["metrics"] = registry
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
+
+    if registry.directory:
+        atexit.register(lambda: registry.flush(app_stats(app)))
+
+
+def get_metrics() -> MetricsRegistry | None:
+    return current_app.extensions.get("metrics")
@@ -1,12 +1,54 @@
 from focus_flow_app.__init__app import db
-from flask_login import UserMixin
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    column,
+    func,
+    literal_column,
+)
 from sqlalchemy.orm import relationship
 
+# Importing the dialect also registers how to_tsvector's return type
+# compiles, without it create_all can't compile the search index unless
+# something else has imported the dialect first
+from sqlalchemy.dialects import postgresql
+
+
+def search_vector(name, description, user_id):
+    """The tsvector the Postgres search index is built on. Queries have to
+    use this exact expression, constants inlined, for the index to apply.
+
+    Besides the words it holds an `@<id>` lexeme for the owner. Search
+    terms are only letters and digits, so no term or prefix matches it, and
+    a query that requires it only reads the index entries of that user's
+    tasks.
+    """
+    empty = literal_column("''")
+    words = func.to_tsvector(
+        literal_column("'simple'::regconfig"),
+        func.coalesce(name, empty)
+        .op("||")(literal_column("' '"))
+        .op("||")(func.coalesce(description, empty)),
+    )
+    # `::text` rather than CAST(), autogenerate only recognises the former
+    # when it compares the index with the database's
+    user = user_id.op("::", precedence=100)(literal_column("text"))
+    owner = func.array_to_tsvector(
+        postgresql.array([literal_column("'@'").op("||")(user)])
+    )
+    return words.op("||")(owner)
+
 
 # Model for Users
-class User(db.Model, UserMixin):
+class User(db.Model):
     __tablename__ = "user"
 
     id = Column(Integer, primary_key=True, nullable=False)
@@ -14,6 +56,14 @@ class User(db.Model, UserMixin):
     password = Column(String(450), nullable=False)
     email = Column(String(150), unique=True, nullable=False)
 
+    # Bumped on every change to this user's tasks, see focus_flow_app.sync
+    task_version = Column(BigInteger, default=0, server_default="0", nullable=False)
+    # The newest version whose tombstones have been compacted away, changes
+    # since an older version can't be answered any more
+    tombstone_horizon = Column(
+        BigInteger, default=0, server_default="0", nullable=False
+    )
+
     tasks = relationship("Task", back_populates="user", lazy="dynamic")
 
 
@@ -21,6 +71,25 @@ class User(db.Model, UserMixin):
 class Task(db.Model):
     __tablename__ = "task"
 
+    # Every task query is scoped by user_id. Listing (and keyset paging) walks
+    # (user_id, date, id) or (user_id, name, id) in order, forwards or
+    # backwards, and the done filter uses (user_id, done, date, id) so open
+    # tasks by date never need a sort. Lookups by id + owner hit the primary
+    # key and check user_id on that row.
+    __table_args__ = (
+        Index("ix_task_user_id_date_id", "user_id", "date", "id"),
+        Index("ix_task_user_id_done_date_id", "user_id", "done", "date", "id"),
+        Index("ix_task_user_id_name_id", "user_id", "name", "id"),
+        Index("ix_task_user_id_version", "user_id", "version"),
+        # Full-text search on Postgres, SQLite uses the FTS5 table set up in
+        # focus_flow_app.search instead
+        Index(
+            "ix_task_search",
+            search_vector(column("name"), column("description"), column("user_id")),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
     id = Column(Integer, primary_key=True, nullable=False)
     user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
 
@@ -30,4 +99,44 @@ class Task(db.Model):
 
     date = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
 
+    # User.task_version at the time this task was last written
+    version = Column(BigInteger, default=0, server_default="0", nullable=False)
+
     user = relationship("User", back_populates="tasks")
+
+    @classmethod
+    def search_vector(cls):
+        return search_vector(cls.name, cls.description, cls.user_id)
+
+
+# Left behind by deleted tasks so delta sync can tell clients about them.
+class TaskTombstone(db.Model):
+    __tablename__ = "task_tombstone"
+
+    __table_args__ = (Index("ix_task_tombstone_user_id_version", "user_id", "version"),)
+
+    id = Column(Integer, primary_key=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    task_id = Column(Integer, nullable=False)
+    version = Column(BigInteger, nullable=False)
+    deleted_at = Column(
+        DateTime, default=datetime.now, server_default=func.now(), nullable=False
+    )
+
+
+# Responses to writes sent with an Idempotency-Key, see focus_flow_app.idempotency.
+# status is NULL while the first request with the key is still running.
+class IdempotencyKey(db.Model):
+    __tablename__ = "idempotency_key"
+
+    __table_args__ = (Index("ix_idempotency_key_expires_at", "expires_at"),)
+
+    user_id = Column(
+        Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True
+    )
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(32), nullable=False)
+    status = Column(Integer, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    expires_at = Column(DateTime, nullable=False)
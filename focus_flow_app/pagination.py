@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+
+
+# Types of the values in a cursor for each sort key, the id always last
+CURSOR_TYPES = {
+    "date": (datetime, int),
+    "name": (str, int),
+    "id": (int,),
+}
+
+
+def encode_cursor(*values) -> str:
+    """Turn the sort values of the last task on a page, e.g. its (date, id),
+    into an opaque token the client hands back to get the next page."""
+    raw = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str = "date") -> tuple:
+    """Reverse of encode_cursor for a list sorted by `sort`, raises ValueError
+    for anything we didn't issue"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        types = CURSOR_TYPES[sort]
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor doesn't match the sort")
+
+        decoded = []
+        for value, kind in zip(values, types):
+            if kind is datetime:
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, kind) or isinstance(value, bool):
+                raise ValueError(f"cursor value must be {kind.__name__}")
+            decoded.append(value)
+        return tuple(decoded)
+    except (TypeError, ValueError) as err:
+        raise ValueError(f"invalid cursor: {cursor!r}") from err
+
+
+def page_size(raw: str | None, default: int, maximum: int) -> int:
+    """Parse the ?limit= query arg, falling back to the configured default
+    and clamping to the configured maximum."""
+    if raw is None or raw == "":
+        return default
+
+    size = int(raw)
+    if size < 1:
+        raise ValueError("limit must be a positive integer")
+
+    return min(size, maximum)
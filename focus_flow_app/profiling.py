@@ -0,0 +1,193 @@
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import current_app, request
+from sqlalchemy import event
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+HEADER = "X-Profile-SQL"
+
+_profile: ContextVar["SQLProfile | None"] = ContextVar("sql_profile", default=None)
+
+
+def call_site() -> str:
+    """The innermost frame in focus_flow_app code outside this module,
+    e.g. "routes/task_routes.py:120 in get_tasks" """
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PACKAGE_DIR) and filename != __file__:
+            path = os.path.relpath(filename, PACKAGE_DIR)
+            return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class SQLProfile:
+    """Every statement one request ran, with its duration and call site"""
+
+    def __init__(self, endpoint: str | None, full: bool = False):
+        self.endpoint = endpoint
+        self.full = full
+        self.statements: list[tuple[str, float, str]] = []
+        self._started_at = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_ms(self) -> float:
+        return round(sum(seconds for _, seconds, _ in self.statements) * 1000, 3)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int, str]]:
+        """Statements run `threshold` or more times, the usual sign of a
+        query in a loop or a lazy-loaded relationship (N+1)"""
+        counts = Counter(statement for statement, _, _ in self.statements)
+        sites = {statement: site for statement, _, site in self.statements}
+        return [
+            (statement, count, sites[statement])
+            for statement, count in counts.most_common()
+            if count >= threshold
+        ]
+
+    def summary(self, repeat_threshold: int) -> dict:
+        return {
+            "endpoint": self.endpoint,
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "statements": [
+                {"sql": statement, "ms": round(seconds * 1000, 3), "site": site}
+                for statement, seconds, site in self.statements
+            ],
+            "repeated": [
+                {"sql": statement, "count": count, "site": site}
+                for statement, count, site in self.repeated(repeat_threshold)
+            ],
+        }
+
+
+class SQLProfiler:
+    """Opt-in per-request SQL profiling.
+
+    Runs for every request with SQL_PROFILE set, or for requests sending
+    the X-Profile-SQL header where SQL_PROFILE_HEADER allows it (everywhere
+    but production). Profiled responses get X-SQL-Queries, X-SQL-Time-Ms
+    and Server-Timing headers, "X-Profile-SQL: full" also logs every
+    statement with its timing and call site. The listeners do nothing for
+    requests that aren't profiled, and aren't installed at all when neither
+    is enabled.
+    """
+
+    def __init__(self, always: bool, header: bool, budget: int, repeat: int):
+        self.always = always
+        self.header = header
+        self.budget = budget
+        self.repeat_threshold = repeat
+        self.subscribers: list = []
+
+    def wants(self) -> bool:
+        return self.always or bool(self.header and request.headers.get(HEADER))
+
+    def subscribe(self, callback) -> None:
+        """callback(profile) is called with the profile of each request"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        self.subscribers.remove(callback)
+
+    def finish(self, profile: SQLProfile, response) -> None:
+        response.headers["X-SQL-Queries"] = str(profile.count)
+        response.headers["X-SQL-Time-Ms"] = str(profile.total_ms)
+        response.headers.add(
+            "Server-Timing",
+            f'sql;dur={profile.total_ms};desc="{profile.count} queries"',
+        )
+
+        logger = current_app.logger
+        if self.budget and profile.count > self.budget:
+            response.headers["X-SQL-Budget-Exceeded"] = str(self.budget)
+            logger.warning(
+                "%s ran %d SQL statements, over the budget of %d",
+                profile.endpoint,
+                profile.count,
+                self.budget,
+            )
+
+        for statement, count, site in profile.repeated(self.repeat_threshold):
+            logger.warning(
+                "%s ran the same statement %d times from %s, possible N+1: %s",
+                profile.endpoint,
+                count,
+                site,
+                " ".join(statement.split())[:200],
+            )
+
+        if profile.full:
+            logger.info(
+                "SQL profile: %s", json.dumps(profile.summary(self.repeat_threshold))
+            )
+
+        for callback in list(self.subscribers):
+            callback(profile)
+
+
+def _before_request():
+    profiler = current_app.extensions["sql_profiler"]
+    if profiler.wants():
+        full = request.headers.get(HEADER, "").lower() == "full"
+        _profile.set(SQLProfile(request.endpoint, full))
+    else:
+        _profile.set(None)
+
+
+def _after_request(response):
+    profile = _profile.get()
+    if profile is not None:
+        current_app.extensions["sql_profiler"].finish(profile, response)
+    return response
+
+
+def _teardown_request(_):
+    _profile.set(None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile.get()
+    if profile is not None:
+        profile._started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile.get()
+    if profile is not None:
+        elapsed = time.perf_counter() - profile._started_at
+        profile.statements.append((statement, elapsed, call_site()))
+
+
+def init_profiler(app, db) -> None:
+    profiler = SQLProfiler(
+        always=app.config["SQL_PROFILE"],
+        header=app.config["SQL_PROFILE_HEADER"],
+        budget=app.config["SQL_QUERY_BUDGET"],
+        repeat=app.config["SQL_REPEAT_THRESHOLD"],
+    )
+    app.extensions["sql_profiler"] = profiler
+    if not (profiler.always or profiler.header):
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def get_profiler() -> SQLProfiler | None:
+    return current_app.extensions.get("sql_profiler")
@@ -0,0 +1,201 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+from .shared import redis_client
+
+
+def parse_limit(value: str) -> tuple[int, float]:
+    """Parse "count/seconds" into (burst, tokens per second), e.g. "5/60"
+    allows a burst of 5 and then one more every 12 seconds"""
+    count, _, seconds = value.partition("/")
+    burst, period = int(count), float(seconds or 1)
+    if burst <= 0 or period <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return burst, burst / period
+
+
+def refill(
+    state: tuple[float, float] | None, burst: int, rate: float, now: float
+) -> tuple[bool, tuple[float, float], float]:
+    """One token bucket step.
+
+    state is (tokens, updated_at) or None for a full bucket. Returns
+    whether a token was taken, the new state and how many seconds until the
+    next token when it wasn't.
+    """
+    if state is None:
+        tokens = float(burst)
+    else:
+        tokens, updated_at = state
+        # Clamped, clocks of different hosts sharing Redis can disagree
+        elapsed = max(0.0, now - updated_at)
+        tokens = min(float(burst), tokens + elapsed * rate)
+
+    if tokens >= 1:
+        return True, (tokens - 1, now), 0.0
+    return False, (tokens, now), (1 - tokens) / rate
+
+
+class MemoryRateLimitBackend:
+    """Per-worker buckets, a (tokens, updated_at) pair per key in an LRU
+    capped at `max_keys`. An evicted key has been idle the longest and just
+    starts again from a full bucket."""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, burst: int, rate: float) -> tuple[bool, float]:
+        with self._lock:
+            allowed, state, retry_after = refill(
+                self._buckets.get(key), burst, rate, time.monotonic()
+            )
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class RedisRateLimitBackend:
+    """Buckets shared by every worker, one small string key per bucket that
+    expires once it would have refilled anyway, so Redis does the eviction.
+
+    The read and write aren't atomic: requests racing on the same key from
+    different workers can each take the same token. That lets through at
+    most one extra request per concurrent worker, fine for slowing down
+    credential stuffing.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "focusflow:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key: str, burst: int, rate: float) -> tuple[bool, float]:
+        key = self.prefix + key
+        raw = self.client.get(key)
+        state = None
+        if raw is not None:
+            tokens, _, updated_at = raw.decode().partition(":")
+            state = (float(tokens), float(updated_at))
+
+        # Wall clock rather than monotonic, the buckets outlive any one process
+        allowed, (tokens, now), retry_after = refill(state, burst, rate, time.time())
+        ttl_ms = max(1, int((burst - tokens) / rate * 1000))
+        self.client.set(key, f"{tokens:.6f}:{now:.6f}", px=ttl_ms)
+        return allowed, retry_after
+
+
+class RateLimiter:
+    """Named limits (RATELIMIT_<NAME>_PER_IP / _PER_EMAIL in config.py)
+    checked against a backend, counting what gets rejected"""
+
+    def __init__(self, backend, limits: dict[str, tuple[int, float]]):
+        self.backend = backend
+        self.limits = limits
+        self.allowed = 0
+        self.rejected: dict[str, int] = {}
+        # `+=` isn't atomic, the request threads share these counters
+        self._lock = threading.Lock()
+
+    def check(self, keys: list[tuple[str, str]]) -> float | None:
+        """Take a token for every (limit name, key) pair, returns the
+        Retry-After in seconds of the first one that's exhausted or None"""
+        for name, key in keys:
+            limit = self.limits.get(name)
+            if limit is None:
+                continue
+
+            allowed, retry_after = self.backend.take(f"{name}:{key}", *limit)
+            if not allowed:
+                with self._lock:
+                    self.rejected[name] = self.rejected.get(name, 0) + 1
+                return retry_after
+
+        with self._lock:
+            self.allowed += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            allowed, rejected = self.allowed, dict(self.rejected)
+        return {
+            "backend": self.backend.name,
+            "allowed": allowed,
+            "rejected": rejected,
+            "rejected_total": sum(rejected.values()),
+        }
+
+
+def init_rate_limiter(app) -> None:
+    backend_name = (app.config["RATELIMIT_BACKEND"] or "none").lower()
+
+    if backend_name == "none":
+        app.extensions["rate_limiter"] = None
+        return
+    elif backend_name == "memory":
+        backend = MemoryRateLimitBackend(app.config["RATELIMIT_MAX_KEYS"])
+    elif backend_name == "redis":
+        backend = RedisRateLimitBackend(redis_client(app))
+    else:
+        raise RuntimeError(f"Unknown RATELIMIT_BACKEND: {backend_name}")
+
+    prefix = "RATELIMIT_"
+    limits = {
+        key[len(prefix) :].lower(): parse_limit(value)
+        for key, value in app.config.items()
+        if key.startswith(prefix) and key.endswith(("_PER_IP", "_PER_EMAIL")) and value
+    }
+    app.extensions["rate_limiter"] = RateLimiter(backend, limits)
+
+
+def get_rate_limiter() -> RateLimiter | None:
+    return current_app.extensions.get("rate_limiter")
+
+
+def rate_limit(scope: str, by_email: bool = False):
+    """Throttle a view per client IP, and per submitted email when by_email
+    is set, before the view runs. Goes above @jwt_required so rejected
+    requests don't even get their token decoded.
+
+    Uses request.remote_addr, so behind a reverse proxy the app needs
+    werkzeug's ProxyFix or every client shares the proxy's bucket.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = get_rate_limiter()
+            if limiter is not None:
+                keys = [(f"{scope}_per_ip", request.remote_addr or "unknown")]
+                if by_email:
+                    data = request.get_json(silent=True)
+                    email = data.get("email") if isinstance(data, dict) else None
+                    if isinstance(email, str) and email.strip():
+                        keys.append((f"{scope}_per_email", email.strip().lower()))
+
+                retry_after = limiter.check(keys)
+                if retry_after is not None:
+                    response = jsonify(
+                        {"error": "Too many attempts, please try again later."}
+                    )
+                    response.headers["Retry-After"] = str(
+                        max(1, math.ceil(retry_after))
+                    )
+                    return response, 429
+
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,11 +1,29 @@
-from .auth_routes import auth_bp
-from .main_routes import main_bp
-from .task_routes import tasks_bp
-from .health_routes import health_db
+from importlib import import_module
+
+# name -> (module, blueprint, url prefix). Modules are imported on
+# registration, so a blueprint left out of API_BLUEPRINTS costs nothing
+BLUEPRINTS = {
+    "auth": (".auth_routes", "auth_bp", "/api/auth"),
+    "main": (".main_routes", "main_bp", "/api/main"),
+    "tasks": (".task_routes", "tasks_bp", "/api/tasks"),
+    "health": (".health_routes", "health_db", "/api/health"),
+    "metrics": (".metrics_routes", "metrics_bp", None),
+}
+
+
+def enabled_blueprints(app) -> list[str]:
+    return [
+        name.strip().lower()
+        for name in app.config["API_BLUEPRINTS"].split(",")
+        if name.strip()
+    ]
 
 
 def register_routes(app):
-    app.register_blueprint(auth_bp, url_prefix="/api/auth")
-    app.register_blueprint(main_bp, url_prefix="/api/main")
-    app.register_blueprint(tasks_bp, url_prefix="/api/tasks")
-    app.register_blueprint(health_db, url_prefix="/api/health")
+    for name in enabled_blueprints(app):
+        if name not in BLUEPRINTS:
+            raise RuntimeError(f"Unknown blueprint in API_BLUEPRINTS: {name}")
+
+        module, attr, url_prefix = BLUEPRINTS[name]
+        blueprint = getattr(import_module(module, __package__), attr)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
@@ -1,10 +1,10 @@
 from flask import (
     Blueprint,
+    current_app,
     request,
     jsonify,
     make_response,
 )
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -14,13 +14,28 @@ from flask_jwt_extended import (
     set_refresh_cookies,
 )
 from sqlalchemy import select
+from ..hashing import HashingBusy, get_password_hasher
 from ..models import User, db
+from ..ratelimit import rate_limit
 
 
 auth_bp = Blueprint("auth", __name__)
 
 
+@auth_bp.errorhandler(HashingBusy)
+def hashing_busy(_):
+    """Every hashing thread is taken, ask the client to come back shortly
+    instead of holding the request open"""
+    db.session.rollback()
+    response = jsonify({"error": "Too many sign-ins right now, please try again."})
+    response.headers["Retry-After"] = str(
+        current_app.config["PASSWORD_HASH_RETRY_AFTER"]
+    )
+    return response, 503
+
+
 @auth_bp.route("/signup", methods=["POST"])  # type: ignore
+@rate_limit("signup")
 def create_New_User_Account():
     """Our signup route it requires an email, username and password"""
     data = request.get_json()
@@ -60,9 +75,9 @@ def create_New_User_Account():
     else:
         new_user = User(
             username=data.get("name").strip(),  # type: ignore
-            password=generate_password_hash(  # type: ignore
+            password=get_password_hasher().hash(
                 data.get("password").strip()  # type: ignore
-            ),  # type: ignore
+            ),
             email=data.get("email").strip(),  # type: ignore
         )
 
@@ -73,6 +88,7 @@ def create_New_User_Account():
 
 
 @auth_bp.route("/login", methods=["POST", "GET"])
+@rate_limit("login", by_email=True)
 def login_page():
     """Our login route needs the email and password of the user"""
 
@@ -81,11 +97,21 @@ def login_page():
         select(User).where(User.email == data.get("email"))  # type: ignore
     ).scalar_one_or_none()
     if user is not None:
-        if not check_password_hash(
-            user.password, data.get("password").strip()  # type: ignore
-        ):  # type: ignore
+        hasher = get_password_hasher()
+        password = data.get("password").strip()  # type: ignore
+        if not hasher.verify(user.password, password):
             return jsonify({"status": "wrong_password"})
         else:
+            if hasher.needs_rehash(user.password):
+                # Stored with older hash parameters, upgrade it now that we
+                # have the plain password. Not worth failing the login over
+                # if the pool is busy, it'll be picked up next time
+                try:
+                    user.password = hasher.hash(password)
+                    db.session.commit()
+                except HashingBusy:
+                    pass
+
             access_token = create_access_token(identity=str(user.id))
             refresh_token = create_refresh_token(identity=str(user.id))
 
@@ -107,6 +133,7 @@ def logout():
 
 
 @auth_bp.route("/refresh", methods=["POST"])
+@rate_limit("refresh")
 @jwt_required(refresh=True)
 def token_refresh():
     """This is our JWT access token refresh route"""
@@ -1,8 +1,73 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify
+
+from ..database import pool_stats
+from ..models import db
 
 health_db = Blueprint("health", __name__)
 
 
+def subsystem_stats(name: str):
+    """stats() of an optional subsystem from app.extensions. Read from there
+    rather than through its module's get_* so this blueprint doesn't import
+    subsystems the app left out"""
+    subsystem = current_app.extensions.get(name)
+    if subsystem is None:
+        return jsonify({"backend": "none"}), 200
+
+    return jsonify(subsystem.stats()), 200
+
+
 @health_db.route("/", methods=["GET"])
+@health_db.route("/live", methods=["GET"])
 def health_check():
+    """Liveness, the process is up and serving requests. Touches nothing
+    else so a database outage doesn't get every worker restarted"""
     return jsonify({"status": "ok"}), 200
+
+
+@health_db.route("/ready", methods=["GET"])
+def readiness_check():
+    """Readiness, whether this worker can reach the database. 503 takes it
+    out of the load balancer until the check passes again"""
+    result = dict(current_app.extensions["readiness"].run(db.engine))
+    result["pool"] = pool_stats(db.engine)
+
+    response = jsonify(result)
+    response.headers["Cache-Control"] = "no-store"
+    return response, 200 if result["status"] == "ok" else 503
+
+
+@health_db.route("/cache", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of this worker's task list cache"""
+    return subsystem_stats("task_cache")
+
+
+@health_db.route("/ratelimit", methods=["GET"])
+def rate_limit_stats():
+    """Allowed/rejected counters of this worker's auth rate limiter"""
+    return subsystem_stats("rate_limiter")
+
+
+@health_db.route("/events", methods=["GET"])
+def task_event_stats():
+    """Open task streams and published/dropped changes of this worker"""
+    return subsystem_stats("task_events")
+
+
+@health_db.route("/idempotency", methods=["GET"])
+def idempotency_stats():
+    """Replayed and conflicting Idempotency-Key requests of this worker"""
+    return subsystem_stats("idempotency")
+
+
+@health_db.route("/maintenance", methods=["GET"])
+def maintenance_stats():
+    """Whether this worker runs the maintenance jobs, and how they went"""
+    return subsystem_stats("maintenance")
+
+
+@health_db.route("/pool", methods=["GET"])
+def pool_status():
+    """Connection pool occupancy and checkout waits of this worker"""
+    return jsonify(pool_stats(db.engine)), 200
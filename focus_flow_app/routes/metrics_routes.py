@@ -0,0 +1,20 @@
+from flask import Blueprint, current_app, make_response
+
+from ..metrics import app_stats, get_metrics, render
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint, totals across all workers when
+    METRICS_DIR is set"""
+    registry = get_metrics()
+    if registry is None:
+        return make_response("metrics are disabled\n", 404)
+
+    app = current_app._get_current_object()
+    response = make_response(render(registry.collect(app_stats(app))))
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
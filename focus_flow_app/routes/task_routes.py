@@ -1,65 +1,223 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime
-from sqlalchemy import select
+import csv
+import io
+import json
+import time
+from typing import NamedTuple
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    make_response,
+    request,
+    stream_with_context,
+)
+from sqlalchemy import delete, insert, not_, select, tuple_, update
 from ..models import db, Task, User
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from ..cache import get_task_cache, invalidate_task_list
+from ..events import (
+    StreamsFull,
+    event_stream,
+    get_task_events,
+    publish_task_change,
+)
+from ..idempotency import commit_write, idempotent, keep_response
+from ..identity import get_token_user_id, get_user_id
+from ..filters import (
+    FALSE_STRINGS,
+    SORT_COLUMNS,
+    TRUE_STRINGS,
+    sort_values,
+    task_filters,
+    task_sort,
+)
+from ..search import search_query, search_terms
+from ..sync import (
+    changes_since,
+    collection_etag,
+    next_version,
+    record_tombstones,
+)
+from ..pagination import decode_cursor, encode_cursor, page_size
+from ..serializers import (
+    TASK_COLUMNS,
+    TASK_KEYS,
+    dumps,
+    format_date,
+    task_rows_to_dicts,
+)
+from flask_jwt_extended import get_jwt, jwt_required
 
 
 tasks_bp = Blueprint("tasks", __name__)
 
 
-def get_user():
-    """Get current user id from the token and return the corrosponding User model"""
-    user_id = get_jwt_identity()
-
-    if not user_id:
-        return False
-
-    current_user = db.session.get(User, int(user_id))
-
-    return current_user
-
-
 @tasks_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_tasks():
     """
-    Retrieve all tasks from the database,
+    Retrieve the user's tasks from the database,
     serialize them into JSON, and return.
+
+    Passing ?limit= and/or ?cursor= switches to keyset pagination and wraps
+    the list as {"tasks": [...], "next_cursor": ...}. Without either arg the
+    full list is returned like it always has been.
+
+    Filters: ?done=true|false, ?from= and ?to= (dates or datetimes, both
+    inclusive). ?sort=date|name|id with ?order=asc|desc orders the list,
+    by date ascending when paginating without one. Cursors are only valid
+    for the sort and order they were issued with.
     """
 
-    current_user = get_user()
-    if not current_user:
+    user_id = get_token_user_id()
+    if user_id is None:
         return jsonify({}), 401
 
-    tasks = current_user.tasks.all()
+    try:
+        view = parse_task_list_args(request.args)
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
 
-    task_list = []
-    for task in tasks:
-        if validator(task):
+    # Every write bumps the user's task_version, so if the client already
+    # has the list for the current version there's nothing to query,
+    # serialize or send. Failing that the response cache may have the
+    # encoded body for this version.
+    cache = get_task_cache()
+    version = None
+    if request.if_none_match or cache is not None:
+        version = db.session.scalar(select(User.task_version).where(User.id == user_id))
+        if version is None:
+            return jsonify({}), 401
 
-            # Serialize each task into a dictionary.
-            task_list.append(
-                {
-                    "id": task.id,
-                    "name": task.name,
-                    "description": task.description,
-                    "done": task.done,
-                    "date": task.date.strftime("%Y-%m-%d %H:%M"),
-                }
-            )
-        else:
-            return (
-                jsonify(
-                    {
-                        "Error": f"The following task: {task} \
-                        could not be added \
-                        to the front-end"
-                    }
-                ),
-                500,
-            )
-    return jsonify(task_list), 200
+        etag = collection_etag(user_id, version, view.variant)
+        if request.if_none_match.contains_weak(etag):
+            return cacheable(make_response("", 304), etag)
+
+        if cache is not None:
+            body = cache.get(user_id, etag)
+            if body is not None:
+                return cacheable(json_response(body), etag), 200
+
+    # Core rows straight off the connection, skipping the ORM's result
+    # processing which is pure overhead for plain column tuples
+    rows = db.session.connection().execute(task_list_query(user_id, view)).all()
+    if rows:
+        version = rows[0][0]
+    elif version is None:
+        # No task on the page to carry the version, read it to tell an
+        # empty list from a user that's gone
+        version = db.session.scalar(select(User.task_version).where(User.id == user_id))
+        if version is None:
+            return jsonify({}), 401
+
+    body = task_list_body(rows, view)
+    etag = collection_etag(user_id, version, view.variant)
+    if cache is not None:
+        cache.set(user_id, etag, body)
+
+    return cacheable(json_response(body), etag), 200
+
+
+class TaskListView(NamedTuple):
+    """The part of the task list a GET /api/tasks/ query string asks for"""
+
+    filters: list
+    sort: str
+    descending: bool
+    paginated: bool
+    ordered: bool
+    limit: int | None
+    after: tuple | None
+    # Everything above that shapes the response, for its ETag and cache key.
+    # Made from the parsed values, so args the view ignores don't count
+    variant: str
+
+
+def parse_task_list_args(args) -> TaskListView:
+    """Read the list's query args, raises ValueError for bad ones"""
+    paginated = "limit" in args or "cursor" in args
+    limit, after = None, None
+    filters, filter_values = task_filters(args)
+    sort, descending = task_sort(args)
+    if paginated:
+        limit = page_size(
+            args.get("limit"),
+            current_app.config["TASKS_PAGE_SIZE"],
+            current_app.config["TASKS_MAX_PAGE_SIZE"],
+        )
+        cursor = args.get("cursor")
+        after = decode_cursor(cursor, sort) if cursor else None
+
+    ordered = paginated or "sort" in args or "order" in args
+    return TaskListView(
+        filters=filters,
+        sort=sort,
+        descending=descending,
+        paginated=paginated,
+        ordered=ordered,
+        limit=limit,
+        after=after,
+        variant=repr(
+            (filter_values, sort, descending, paginated, ordered, limit, after)
+        ),
+    )
+
+
+def task_list_query(user_id: int, view: TaskListView):
+    """The page of tasks a view asks for, each row led by the user's
+    task_version so a normal GET is one statement.
+
+    The version is a scalar subquery rather than a join with the user's
+    row: an outer join keeps the user when no task matches, but Postgres
+    can't read a joined table's rows in index order, so it would sort
+    every matching task before the LIMIT. On its own the task select walks
+    one of the (user_id, ...) indexes and stops after the page.
+    """
+    criteria = [Task.user_id == user_id, *view.filters]
+    sort_columns = SORT_COLUMNS[view.sort]
+    if view.after is not None:
+        # Seek straight past the last row the client saw instead of OFFSET,
+        # so deep pages cost the same as the first one
+        keyset = tuple_(*sort_columns)
+        criteria.append(keyset < view.after if view.descending else keyset > view.after)
+
+    version = select(User.task_version).where(User.id == user_id).scalar_subquery()
+    query = select(version.label("task_version"), *TASK_COLUMNS).where(*criteria)
+    if view.ordered:
+        # Same direction on every column so the index can be read forwards
+        # or backwards without a sort step
+        query = query.order_by(
+            *(column.desc() if view.descending else column for column in sort_columns)
+        )
+    if view.paginated:
+        # Fetch one extra row to find out whether there is another page
+        query = query.limit(view.limit + 1)
+    return query
+
+
+def task_list_body(rows, view: TaskListView) -> bytes:
+    """The encoded list from the rows of task_list_query"""
+    tasks = [row[1:] for row in rows]
+
+    next_cursor = None
+    if view.paginated and len(tasks) > view.limit:
+        tasks = tasks[: view.limit]
+        next_cursor = encode_cursor(*sort_values(tasks[-1], view.sort))
+
+    task_list = task_rows_to_dicts(tasks)
+    if view.paginated:
+        return dumps({"tasks": task_list, "next_cursor": next_cursor})
+    return dumps(task_list)
+
+
+def json_response(body: bytes):
+    return current_app.response_class(body, mimetype="application/json")
+
+
+def cacheable(response, etag: str):
+    """Tag a task list response so clients revalidate it with If-None-Match"""
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 
 def validator_json(data: dict) -> bool:
@@ -79,86 +237,90 @@ def validator_json(data: dict) -> bool:
     return True
 
 
-def validator(task: Task) -> bool:
-    """This function validates our task data ensuring no data
-      is missing before sending a task to the front-end
+NAME_MAX_LENGTH = Task.__table__.c.name.type.length
+DESCRIPTION_MAX_LENGTH = Task.__table__.c.description.type.length
 
-    Args:
-        iShort (Bool) : this is for when we only need the name,
-        descripiton and id of a task.
 
-    """
+def length_error(data: dict) -> str | None:
+    """The column lengths of a task that passed validator_json, for writes
+    where one oversized value would otherwise fail the whole statement"""
+    if len(data["name"]) > NAME_MAX_LENGTH:
+        return "name is too long"
+    if len(data["description"]) > DESCRIPTION_MAX_LENGTH:
+        return "description is too long"
+    return None
 
-    elList = [task.user_id, task.name, task.description, task.done, task.date]
 
-    expectedDict = {0: int, 1: str, 2: str, 3: bool, 4: datetime}
+def claim_version() -> tuple[int, int] | tuple[None, None]:
+    """Start a write for the token's user by claiming the next change version.
 
-    # This part checks that the regular validation logic of the function is expecting
-    # the right amount of items to check against...
-    for idx in expectedDict.keys():
-        if idx > len(elList):
-            return False
-        else:
-            continue
+    Returns (user_id, version), or (None, None) when the user no longer
+    exists so the caller can answer with its usual 401/404.
+    """
+    user_id = get_token_user_id()
+    if user_id is None:
+        return None, None
 
-    # This part checks against the expectedDict to ensure
-    # we are getting the expected datatypes...
-    for keyIdx, value in expectedDict.items():
-        if not isinstance(elList[keyIdx], value):
-            print(elList[keyIdx], "\n", value)
-            return False
+    version = next_version(user_id)
+    if version is None:
+        return None, None
 
-    return True
+    return user_id, version
 
 
 @tasks_bp.route("/", methods=["POST"])  # type: ignore
 @jwt_required()
+@idempotent()
 def add_tasks():
     """
     Add a new task in the database.
     Expects JSON data with task details.
     """
 
-    current_user = get_user()
-    if not current_user:
-        return jsonify({"error": "No such user."}), 404
-
     data = request.get_json()
-    if validator_json(data):
-        new_task = Task(
-            name=data["name"],  # type: ignore
-            description=data["description"],  # type: ignore
-            user_id=current_user.id,  # type: ignore
-        )
-        db.session.add(new_task)
-        db.session.commit()
-
-        new_task_data = {
-            "id": new_task.id,
-            "name": new_task.name,
-            "description": new_task.description,
-            "done": new_task.done,
-        }
-
-        return jsonify(new_task_data), 201
-    else:
+    if not validator_json(data):
         return (
             jsonify({"error": "the provided data did not include all required info"}),
             422,
         )
 
+    user_id, version = claim_version()
+    if user_id is None:
+        return jsonify({"error": "No such user."}), 404
+
+    new_task = Task(
+        name=data["name"],  # type: ignore
+        description=data["description"],  # type: ignore
+        user_id=user_id,  # type: ignore
+        version=version,  # type: ignore
+    )
+    db.session.add(new_task)
+    db.session.flush()
+
+    # Read everything back before the commit expires it,
+    # otherwise the response costs another SELECT
+    new_task_data = {
+        "id": new_task.id,
+        "name": new_task.name,
+        "description": new_task.description,
+        "done": new_task.done,
+    }
+    response = make_response(jsonify(new_task_data), 201)
+    commit_write(response)
+    invalidate_task_list(user_id)
+    publish_task_change(user_id, version, [("create", {"task": new_task_data})])
+
+    return response
+
 
 @tasks_bp.route("/<int:taskId>/", methods=["PATCH"])
 @jwt_required()
+@idempotent()
 def update_tasks(taskId):
     """
     Update task's name and description using PATCH.
     """
 
-    current_user = get_user()
-    if not current_user:
-        return jsonify({"error": "No such user."}), 404
-
     # We use this list to check for the expected
     # keys we are meant to recieve from the front-end
     exp_keys = ["name", "description"]
@@ -168,66 +330,734 @@ def update_tasks(taskId):
     if missing:
         return jsonify({"error": f"missing keys: {missing}"}), 400
 
-    # Grabbing the task if it exists
-    task = current_user.tasks.filter(Task.id == taskId).first()
-    if not task:
+    user_id, version = claim_version()
+    if user_id is None:
+        return jsonify({"error": "No such user."}), 404
+
+    # Making the changes to the task, the owner check is part of the
+    # WHERE clause so a missing or foreign task simply matches no row
+    edited_task = db.session.execute(
+        update(Task)
+        .where(Task.id == taskId, Task.user_id == user_id)
+        .values(name=data["name"], description=data["description"], version=version)
+        .returning(Task.id, Task.name, Task.description, Task.done)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if edited_task is None:
+        # Hand the version back, nothing changed
+        db.session.rollback()
         return (
             jsonify({"error": "Task not found or does not belong to current user"}),
             404,
         )
+    edited_task = edited_task._asdict()
+    response = make_response(jsonify(edited_task), 200)
+    commit_write(response)
+    invalidate_task_list(user_id)
+    publish_task_change(user_id, version, [("update", {"task": edited_task})])
 
-    # Making the changes to the task
-    task.name = data["name"]
-    task.description = data["description"]
-    db.session.commit()
-
-    edited_task = {
-        "id": task.id,
-        "name": task.name,
-        "description": task.description,
-        "done": task.done,
-    }
-
-    return jsonify(edited_task), 200
+    return response
 
 
 @tasks_bp.route("/<int:taskId>/delete/", methods=["DELETE"])
 @jwt_required()
+@idempotent()
 def delete_task(taskId):
     """
     Delete the task with the specified ID.
     Returns an error if the task is not found.
     """
-    current_user = get_user()
-    if not current_user:
+    user_id, version = claim_version()
+    if user_id is None:
         return jsonify({}), 401
 
-    task = current_user.tasks.filter(Task.id == taskId).first()
-    if task is None:
+    deleted = db.session.execute(
+        delete(Task)
+        .where(Task.id == taskId, Task.user_id == user_id)
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if deleted is None:
+        db.session.rollback()
         return jsonify({"error": "Task not found!"}), 404
-    db.session.delete(task)
-    db.session.commit()
-    return jsonify({}), 200
+    record_tombstones(user_id, [taskId], version)
+    response = make_response(jsonify({}), 200)
+    commit_write(response)
+    invalidate_task_list(user_id)
+    publish_task_change(user_id, version, [("delete", {"task": {"id": taskId}})])
+    return response
 
 
 @tasks_bp.route("/<int:taskId>/done/", methods=["PATCH"])
 @jwt_required()
+@idempotent()
 def completed_tasks(taskId):
     """
     Mark the specified task as done or not done.
     """
-    current_user = get_user()
-    if not current_user:
+    user_id, version = claim_version()
+    if user_id is None:
         return jsonify({"error": "No such user."}), 404
 
-    task = db.session.scalars(
-        select(Task).where(Task.id == taskId, Task.user_id == current_user.id)
-    ).first()
-    if not task:
+    # Flip the flag in SQL so concurrent clicks can't both read the
+    # same old value and write the same new one
+    done = db.session.execute(
+        update(Task)
+        .where(Task.id == taskId, Task.user_id == user_id)
+        .values(done=not_(Task.done), version=version)
+        .returning(Task.done)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if done is None:
+        db.session.rollback()
         return jsonify({"error": f"The Task with the ID: {taskId} doesnt exist!"}), 404
+    # Return a response with the updated task state.
+    response = make_response(jsonify({"done": done}), 200)
+    commit_write(response)
+    invalidate_task_list(user_id)
+    publish_task_change(
+        user_id, version, [("toggle", {"task": {"id": taskId, "done": done}})]
+    )
+
+    return response
+
+
+BATCH_OPS = ("create", "update", "toggle", "delete")
+
+
+def validate_batch_op(op, seen_ids: set) -> str | None:
+    """Check one batch operation, returning an error message or None if it's fine"""
+    if not isinstance(op, dict) or op.get("op") not in BATCH_OPS:
+        return f"op must be one of {list(BATCH_OPS)}"
+
+    if op["op"] in ("create", "update"):
+        if not validator_json(op):
+            return "the provided data did not include all required info"
+        error = length_error(op)
+        if error:
+            return error
+
+    if op["op"] == "create":
+        return None
+
+    task_id = op.get("id")
+    if not isinstance(task_id, int) or isinstance(task_id, bool):
+        return "id must be an integer"
+
+    # Every task may only be touched once per batch,
+    # which keeps the result independent of execution order
+    if task_id in seen_ids:
+        return f"task {task_id} appears more than once in this batch"
+    seen_ids.add(task_id)
+
+    return None
+
+
+@tasks_bp.route("/batch", methods=["POST"])
+@jwt_required()
+@idempotent()
+def batch_tasks():
+    """
+    Apply many task operations in one request and one transaction.
+
+    Expects {"operations": [...]} where each operation is one of
+        {"op": "create", "name": ..., "description": ...}
+        {"op": "update", "id": ..., "name": ..., "description": ...}
+        {"op": "toggle", "id": ...}
+        {"op": "delete", "id": ...}
+
+    Returns {"results": [...]} in the same order as the operations, each with
+    its own status so one bad item doesn't sink the rest of the batch.
+    """
+
+    data = request.get_json(silent=True)
+    operations = data.get("operations") if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 422
+
+    max_size = current_app.config["TASKS_BATCH_MAX_SIZE"]
+    if len(operations) > max_size:
+        return (
+            jsonify({"error": f"a batch can hold at most {max_size} operations"}),
+            422,
+        )
+
+    results: list = [None] * len(operations)
+    valid = {op: [] for op in BATCH_OPS}
+    seen_ids: set = set()
+    for idx, op in enumerate(operations):
+        error = validate_batch_op(op, seen_ids)
+        if error:
+            kind = op.get("op") if isinstance(op, dict) else None
+            results[idx] = {"op": kind, "status": 422, "error": error}
+        else:
+            valid[op["op"]].append((idx, op))
+    if not any(valid.values()):
+        # Nothing to write, so no version to claim or user row to lock
+        return jsonify({"results": results}), 200
+
+    user_id, version = claim_version()
+    if user_id is None:
+        return jsonify({"error": "No such user."}), 404
+
+    # One query tells us which of the referenced tasks belong to this user
+    # (and their done state, which the update results report back)
+    existing_ids = [op["id"] for kind in BATCH_OPS[1:] for _, op in valid[kind]]
+    owned = {}
+    if existing_ids:
+        owned = dict(
+            db.session.execute(
+                select(Task.id, Task.done).where(
+                    Task.user_id == user_id, Task.id.in_(existing_ids)
+                )
+            ).all()
+        )
+    for kind in BATCH_OPS[1:]:
+        for idx, op in valid[kind]:
+            if op["id"] not in owned:
+                results[idx] = {
+                    "op": kind,
+                    "status": 404,
+                    "error": f"Task {op['id']} not found",
+                }
+        valid[kind] = [(idx, op) for idx, op in valid[kind] if op["id"] in owned]
+    if not any(valid.values()):
+        # Hand the version back, nothing changed
+        db.session.rollback()
+        return jsonify({"results": results}), 200
+
+    if valid["create"]:
+        created = db.session.execute(
+            insert(Task)
+            .returning(
+                Task.id,
+                Task.name,
+                Task.description,
+                Task.done,
+                sort_by_parameter_order=True,
+            )
+            .execution_options(synchronize_session=False),
+            [
+                {
+                    "user_id": user_id,
+                    "name": op["name"],
+                    "description": op["description"],
+                    "version": version,
+                }
+                for _, op in valid["create"]
+            ],
+        ).all()
+        for (idx, _), row in zip(valid["create"], created, strict=True):
+            results[idx] = {"op": "create", "status": 201, "task": row._asdict()}
+
+    if valid["update"]:
+        # Bulk UPDATE by primary key, ownership was checked above
+        db.session.execute(
+            update(Task).execution_options(synchronize_session=False),
+            [
+                {
+                    "id": op["id"],
+                    "name": op["name"],
+                    "description": op["description"],
+                    "version": version,
+                }
+                for _, op in valid["update"]
+            ],
+        )
+        for idx, op in valid["update"]:
+            task = {
+                "id": op["id"],
+                "name": op["name"],
+                "description": op["description"],
+                "done": owned[op["id"]],
+            }
+            results[idx] = {"op": "update", "status": 200, "task": task}
+
+    if valid["toggle"]:
+        toggled = dict(
+            db.session.execute(
+                update(Task)
+                .where(
+                    Task.user_id == user_id,
+                    Task.id.in_([op["id"] for _, op in valid["toggle"]]),
+                )
+                .values(done=not_(Task.done), version=version)
+                .returning(Task.id, Task.done)
+                .execution_options(synchronize_session=False)
+            ).all()
+        )
+        for idx, op in valid["toggle"]:
+            task = {"id": op["id"], "done": toggled[op["id"]]}
+            results[idx] = {"op": "toggle", "status": 200, "task": task}
+
+    if valid["delete"]:
+        db.session.execute(
+            delete(Task)
+            .where(
+                Task.user_id == user_id,
+                Task.id.in_([op["id"] for _, op in valid["delete"]]),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        record_tombstones(user_id, [op["id"] for _, op in valid["delete"]], version)
+        for idx, op in valid["delete"]:
+            results[idx] = {"op": "delete", "status": 200, "task": {"id": op["id"]}}
+
+    response = make_response(jsonify({"results": results}), 200)
+    commit_write(response)
+    invalidate_task_list(user_id)
+    # One event per operation that went through, in request order
+    publish_task_change(
+        user_id,
+        version,
+        [
+            (result["op"], {"task": result["task"]})
+            for result in results
+            if result["status"] < 300
+        ],
+    )
+
+    return response
+
+
+@tasks_bp.route("/changes", methods=["GET"])
+@jwt_required()
+def task_changes():
+    """
+    Delta sync: everything that happened to the user's tasks after ?since=.
+
+    Returns {"version": ..., "changed": [...], "deleted": [...]}. Clients
+    apply "deleted" then "changed" and send the returned version as the next
+    ?since=. Leaving since out (or 0) returns every task.
+
+    Answers 409 with the current version when since can't be resumed from,
+    either ahead of the server or older than the deletes it still keeps
+    (TOMBSTONE_RETENTION_DAYS). The client then syncs again from 0.
+    """
+
+    user_id = get_token_user_id()
+    if user_id is None:
+        return jsonify({}), 401
+
+    try:
+        since = int(request.args.get("since", 0))
+        if since < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "since must be a non-negative integer"}), 400
+
+    # Doubles as the check that the user still exists
+    version = db.session.scalar(select(User.task_version).where(User.id == user_id))
+    if version is None:
+        return jsonify({}), 401
+
+    if since > version:
+        # The client's version came from somewhere else (e.g. a restored
+        # database), the only safe thing is a full resync from 0
+        return (
+            jsonify({"error": "since is ahead of the server", "version": version}),
+            409,
+        )
+
+    if since == version:
+        return jsonify({"version": version, "changed": [], "deleted": []}), 200
+
+    changes = changes_since(user_id, since)
+    if changes is None:
+        return (
+            jsonify({"error": "since is too old to resume from", "version": version}),
+            409,
+        )
+    changed, deleted = changes
+    body = dumps({"version": version, "changed": changed, "deleted": deleted})
+    return json_response(body), 200
+
+
+@tasks_bp.route("/stream", methods=["GET"])
+@jwt_required()
+def stream_tasks():
+    """
+    Server-Sent Events stream of changes to the user's tasks.
+
+    Sends a "create", "update", "toggle" or "delete" event for every write,
+    with the same task fields the write's own response has, plus the
+    change's "version". A batch sends one event per operation. A "sync"
+    event carries {"version", "changed", "deleted"} like /changes, the
+    client applies it the same way. Imports and reconnects are sent as one.
+
+    The access token goes in the Authorization header like everywhere else,
+    which a browser's EventSource can't send, so clients read the stream
+    with fetch() and an SSE parser. Event ids are task versions: a client
+    that reconnects sends the last one it saw as Last-Event-ID (or
+    ?last_event_id=) and resumes without missing anything. When
+    it can't (the id is unknown or older than the deletes the server keeps)
+    the stream starts with a "sync" that has "reset": true and every task in
+    "changed", which the client replaces its list with. The
+    server closes the stream after TASK_STREAM_MAX_AGE seconds or when the
+    access token expires, whichever is first, and the client reconnects.
+    A worker with TASK_STREAM_MAX_PER_WORKER streams open answers 503 with
+    Retry-After, the client polls /changes until then.
+    """
+
+    user_id = get_token_user_id()
+    if user_id is None:
+        return jsonify({}), 401
+
+    since = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        since = None if since is None else int(since)
+        if since is not None and since < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be a non-negative integer"}), 400
+
+    # Subscribe before reading the version, so a write landing in between
+    # shows up in the buffer rather than nowhere
+    broker = get_task_events()
+    try:
+        subscription = broker.subscribe(user_id)
+    except StreamsFull:
+        response = jsonify(
+            {"error": "Too many open streams, poll /api/tasks/changes instead."}
+        )
+        response.headers["Retry-After"] = str(
+            current_app.config["TASK_STREAM_RETRY_AFTER"]
+        )
+        return response, 503
+    version = db.session.scalar(select(User.task_version).where(User.id == user_id))
+    if version is None:
+        broker.unsubscribe(subscription)
+        return jsonify({}), 401
+    # Don't hold a pooled connection for the life of the stream
+    db.session.close()
+
+    def catch_up(after: int):
+        try:
+            current = db.session.scalar(
+                select(User.task_version).where(User.id == user_id)
+            )
+            changes = changes_since(user_id, after)
+            if changes is None:
+                # Deletes after `after` have been compacted, send everything
+                after = 0
+                changes = changes_since(user_id, 0)
+            changed, deleted = changes
+            data = {"version": current or after, "changed": changed, "deleted": deleted}
+            if after == 0:
+                data["reset"] = True
+            return data
+        finally:
+            db.session.close()
+
+    config = current_app.config
+    max_age = config["TASK_STREAM_MAX_AGE"]
+    expires_at = get_jwt().get("exp")
+    if expires_at is not None:
+        max_age = min(max_age, expires_at - time.time())
+    body = event_stream(
+        broker,
+        subscription,
+        since,
+        version,
+        catch_up,
+        heartbeat=config["TASK_STREAM_HEARTBEAT"],
+        max_age=max_age,
+        retry_ms=config["TASK_STREAM_RETRY_MS"],
+    )
+    response = current_app.response_class(
+        stream_with_context(body), mimetype="text/event-stream"
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@tasks_bp.route("/search", methods=["GET"])
+@jwt_required()
+def search_tasks():
+    """
+    Full-text search of the user's task names and descriptions.
+
+    ?q= is split into words, every word has to match the start of a word in
+    the task. Tasks with all the words in the name come first, then the
+    rest, newest first within each. Paged with ?limit= and ?offset=, returns
+    {"tasks": [...], "next_offset": ...} with next_offset null on the last
+    page.
+    """
+
+    user_id = get_token_user_id()
+    if user_id is None:
+        return jsonify({}), 401
+
+    q = request.args.get("q", "")
+    if not q.strip():
+        return jsonify({"error": "q is required"}), 400
 
-    task.done = not task.done
+    try:
+        limit = page_size(
+            request.args.get("limit"),
+            current_app.config["TASKS_PAGE_SIZE"],
+            current_app.config["TASKS_MAX_PAGE_SIZE"],
+        )
+        offset = int(request.args.get("offset") or 0)
+        if offset < 0:
+            raise ValueError("offset must be a non-negative integer")
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+    terms = search_terms(q)
+    if not terms:
+        return json_response(dumps({"tasks": [], "next_offset": None})), 200
+
+    # One extra row tells whether there is another page
+    query = search_query(db.engine.dialect.name, user_id, terms, limit + 1, offset)
+    rows = db.session.connection().execute(query).all()
+
+    next_offset = offset + limit if len(rows) > limit else None
+    body = dumps(
+        {"tasks": task_rows_to_dicts(rows[:limit]), "next_offset": next_offset}
+    )
+    return json_response(body), 200
+
+
+def ndjson_chunk(rows) -> bytes:
+    return b"".join(dumps(task) for task in task_rows_to_dicts(rows))
+
+
+def csv_chunk(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(TASK_KEYS)
+    writer.writerows(
+        (task_id, name, description, done, format_date(date))
+        for task_id, name, description, done, date in rows
+    )
+    return buffer.getvalue().encode()
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_chunk),
+    "csv": ("text/csv", csv_chunk),
+}
+
+
+@tasks_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_tasks():
+    """
+    Stream all of the user's tasks as NDJSON (default) or CSV.
+
+    Rows are fetched TASKS_EXPORT_CHUNK_SIZE at a time (a server-side cursor
+    on Postgres) and each chunk is encoded and flushed before the next one
+    is read, so memory stays flat however many tasks the user has.
+    """
+
+    user_id = get_user_id()
+    if user_id is None:
+        return jsonify({}), 401
+
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in EXPORT_FORMATS:
+        return (
+            jsonify({"error": f"format must be one of {sorted(EXPORT_FORMATS)}"}),
+            400,
+        )
+    mimetype, encode_chunk = EXPORT_FORMATS[export_format]
+
+    query = (
+        select(*TASK_COLUMNS)
+        .where(Task.user_id == user_id)
+        .order_by(Task.date, Task.id)
+        .execution_options(yield_per=current_app.config["TASKS_EXPORT_CHUNK_SIZE"])
+    )
+
+    def generate():
+        result = db.session.connection().execute(query)
+        if export_format == "csv":
+            # Send the header straight away for a fast first byte
+            yield csv_chunk([], header=True)
+
+        for rows in result.partitions():
+            yield encode_chunk(rows)
+
+    response = current_app.response_class(
+        stream_with_context(generate()), mimetype=mimetype
+    )
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=tasks.{export_format}"
+    )
+    # Stop proxies like nginx from buffering the whole export
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+def parse_import_row(row) -> dict:
+    """Validate one imported task with the same rules as add_tasks, plus the
+    column lengths (one oversized value would otherwise fail the whole chunk)
+    and an optional done flag.
+
+    Raises:
+        ValueError: with the reason the row was rejected.
+    """
+    if isinstance(row, ValueError):
+        raise ValueError(f"invalid JSON: {row}")
+    if not isinstance(row, dict) or not validator_json(row):
+        raise ValueError("the provided data did not include all required info")
+
+    if not row["name"].strip():
+        raise ValueError("name can't be empty")
+    error = length_error(row)
+    if error:
+        raise ValueError(error)
+
+    done = row.get("done", False)
+    if isinstance(done, str) and done.strip().lower() in TRUE_STRINGS | FALSE_STRINGS:
+        done = done.strip().lower() in TRUE_STRINGS
+    if not isinstance(done, bool):
+        raise ValueError("done must be a boolean")
+
+    return {"name": row["name"], "description": row["description"], "done": done}
+
+
+def read_import_rows(stream, import_format: str):
+    """Yield (line number, parsed row or ValueError) from the request body
+    without ever holding more than one line of it"""
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+
+    if import_format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as err:
+            yield line_number, err
+
+
+@tasks_bp.route("/import", methods=["POST"])
+@jwt_required()
+# The body is streamed, hashing it would mean buffering it first
+@idempotent(hash_body=False)
+def import_tasks():
+    """
+    Import tasks from an NDJSON (default) or CSV request body.
+
+    The body is parsed as it streams in and valid rows are inserted
+    TASKS_IMPORT_CHUNK_SIZE at a time, one executemany and one commit per
+    chunk. Returns how many rows were accepted and rejected, with the reasons
+    for the first TASKS_IMPORT_MAX_ERRORS rejections.
+
+    If it fails after a chunk was committed, the 500 says how many rows went
+    in and the line to resume from, and is what a retry with the same
+    Idempotency-Key gets back rather than a second copy of those rows.
+    """
+
+    user_id = get_user_id()
+    if user_id is None:
+        return jsonify({"error": "No such user."}), 404
+
+    import_format = request.args.get("format")
+    if import_format is None:
+        import_format = "csv" if request.mimetype == "text/csv" else "ndjson"
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {list(IMPORT_FORMATS)}"}), 400
+
+    chunk_size = current_app.config["TASKS_IMPORT_CHUNK_SIZE"]
+    max_errors = current_app.config["TASKS_IMPORT_MAX_ERRORS"]
+    accepted, rejected, errors = 0, 0, []
+    chunk: list = []
+    # First line of the rows not committed yet
+    chunk_line = line_number = 0
+
+    try:
+        for line_number, row in read_import_rows(request.stream, import_format):
+            try:
+                parsed = parse_import_row(row)
+            except ValueError as err:
+                rejected += 1
+                if len(errors) < max_errors:
+                    errors.append({"line": line_number, "error": str(err)})
+                continue
+
+            if not chunk:
+                chunk_line = line_number
+            chunk.append(parsed)
+
+            if len(chunk) >= chunk_size:
+                accepted += insert_import_chunk(user_id, chunk)
+                chunk = []
+
+        if chunk:
+            accepted += insert_import_chunk(user_id, chunk)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return (
+            jsonify(
+                {
+                    "error": "the body must be UTF-8",
+                    "accepted": accepted,
+                    "rejected": rejected,
+                    "errors": errors,
+                }
+            ),
+            400,
+        )
+    except LookupError:
+        db.session.rollback()
+        return jsonify({"error": "No such user."}), 404
+    except Exception:
+        if not accepted:
+            raise
+        db.session.rollback()
+        current_app.logger.exception("Import failed after %s rows", accepted)
+        response = make_response(
+            jsonify(
+                {
+                    "error": "the import stopped partway",
+                    "accepted": accepted,
+                    "rejected": rejected,
+                    "errors": errors,
+                    "failed_line": chunk_line if chunk else line_number + 1,
+                }
+            ),
+            500,
+        )
+        keep_response(response)
+        return response
+    finally:
+        if accepted:
+            invalidate_task_list(user_id)
+
+    return jsonify({"accepted": accepted, "rejected": rejected, "errors": errors}), 200
+
+
+def insert_import_chunk(user_id: int, rows: list) -> int:
+    """Insert one chunk of imported tasks with a single executemany and commit.
+
+    Raises:
+        LookupError: if the user no longer exists.
+    """
+    version = next_version(user_id)
+    if version is None:
+        raise LookupError(user_id)
+
+    for row in rows:
+        row["user_id"] = user_id
+        row["version"] = version
+    # Core insert on the session's connection, the ORM bulk path adds
+    # nothing here but per-row overhead
+    db.session.connection().execute(insert(Task.__table__), rows)
     db.session.commit()
+    # Too many rows to send as events, streams read them back instead
+    publish_task_change(user_id, version, [])
 
-    # Return a response with the updated task state.
-    return jsonify({"done": task.done}), 200
+    return len(rows)
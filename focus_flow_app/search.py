@@ -0,0 +1,197 @@
+"""Full-text search over task names and descriptions.
+
+SQLite: an FTS5 table with task as its external content, so the text isn't
+stored twice, kept in sync by triggers. user_id is indexed as a column of
+its own and every query is scoped with it, so other users' tasks never
+come back.
+
+Postgres: a GIN index over a tsvector expression of the same two columns
+plus a lexeme for the owner (models.search_vector), declared on Task so
+create_all and autogenerate know about it. Queries require the owner's
+lexeme, so the index only hands back the user's own tasks.
+
+The FTS5 table is created by migration c3f4a5b6d7e8 and the GIN index by
+a1b2c3d4e5f6, for create_all by the DDL events below and the index on
+Task. A SQLite migration that rebuilds the task table through
+batch_alter_table drops the triggers, call create_sqlite_search(op) again
+afterwards.
+"""
+
+import re
+
+from sqlalchemy import (
+    DDL,
+    and_,
+    case,
+    cast,
+    column,
+    event,
+    func,
+    literal,
+    literal_column,
+    select,
+    table,
+    union_all,
+)
+from sqlalchemy.dialects import postgresql
+
+from .models import Task
+from .serializers import TASK_COLUMNS
+
+FTS_TABLE = "task_fts"
+
+# Just enough of the FTS5 table to join on, it isn't part of the metadata
+fts = table(FTS_TABLE, column("rowid"))
+
+# Search configuration for Postgres. "simple" doesn't stem or drop stop
+# words, so the results match what FTS5's unicode61 tokenizer finds
+PG_CONFIG = "simple"
+
+SQLITE_DDL = (
+    # prefix='2 3' keeps extra indexes of 2 and 3 character prefixes, so
+    # short search-as-you-type queries don't scan every term. detail='column'
+    # leaves out word positions, which only phrase queries need, for a
+    # smaller index that is quicker to read
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, user_id,
+        content='task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3',
+        detail='column'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, user_id)
+        VALUES (new.id, new.name, new.description, new.user_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, user_id)
+        VALUES ('delete', old.id, old.name, old.description, old.user_id);
+    END""",
+    # Only when the text changes, toggling done doesn't touch the index
+    f"""CREATE TRIGGER IF NOT EXISTS task_fts_au
+    AFTER UPDATE OF name, description ON task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, user_id)
+        VALUES ('delete', old.id, old.name, old.description, old.user_id);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, user_id)
+        VALUES (new.id, new.name, new.description, new.user_id);
+    END""",
+)
+
+SQLITE_DROP = (
+    "DROP TRIGGER IF EXISTS task_fts_au",
+    "DROP TRIGGER IF EXISTS task_fts_ad",
+    "DROP TRIGGER IF EXISTS task_fts_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+
+# Rebuild from the content table, for databases that already have tasks
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+for statement in SQLITE_DDL:
+    event.listen(
+        Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+for statement in SQLITE_DROP:
+    event.listen(
+        Task.__table__, "before_drop", DDL(statement).execute_if(dialect="sqlite")
+    )
+
+
+def create_sqlite_search(op) -> None:
+    for statement in SQLITE_DDL:
+        op.execute(statement)
+    op.execute(SQLITE_REBUILD)
+
+
+def is_search_table(name: str) -> bool:
+    """The FTS5 table and its shadow tables, which aren't in the metadata"""
+    return name == FTS_TABLE or name.startswith(f"{FTS_TABLE}_")
+
+
+# Runs of letters and digits, which is also what both tokenizers index
+WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def search_terms(query: str, max_terms: int = 8) -> list[str]:
+    """Words of the user's query, anything else (quotes, operators, column
+    filters) is dropped so the input can't change the query syntax"""
+    return WORD.findall(query.lower())[:max_terms]
+
+
+def search_query(dialect: str, user_id: int, terms: list[str], limit: int, offset: int):
+    """Tasks with every term in the name first, then the ones where the
+    terms are spread over the name and description, newest first within
+    each. Terms match as prefixes and are all required. Returns a select of
+    TASK_COLUMNS.
+
+    Ranking by tier and id rather than bm25 or ts_rank keeps the cost
+    down: the relevance functions score every match, which for a common
+    word is most of the user's tasks. On SQLite the index hands the tiers
+    back in order and only the rows on the page are read. Postgres still
+    sorts every match of the user to find the page, a GIN index can't
+    return rows in order.
+    """
+    if dialect == "sqlite":
+        return _sqlite_query(user_id, terms, limit, offset)
+    if dialect == "postgresql":
+        return _postgres_query(user_id, terms, limit, offset)
+
+    # Anything else gets a plain scan of the user's tasks, correct but slow
+    text = Task.name + " " + func.coalesce(Task.description, "")
+    in_name = and_(*(Task.name.ilike(f"%{term}%") for term in terms))
+    tier = case((in_name, 0), else_=1)
+    return (
+        select(*TASK_COLUMNS)
+        .where(Task.user_id == user_id, *(text.ilike(f"%{term}%") for term in terms))
+        .order_by(tier, Task.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def _sqlite_query(user_id, terms, limit, offset):
+    phrase = "(" + " AND ".join(f'"{term}"*' for term in terms) + ")"
+    owner = f'user_id: "{user_id}"'
+    match = literal_column(FTS_TABLE).op("MATCH")
+
+    # FTS5 hands rowids back in descending order without sorting, so
+    # SQLite merges the two tiers and stops once it has the page
+    in_name = select(literal_column("0").label("tier"), fts.c.rowid.label("id")).where(
+        match(f"{owner} AND name: {phrase}")
+    )
+    elsewhere = select(literal_column("1"), fts.c.rowid).where(
+        match(f"({owner} AND {{name description}}: {phrase}) NOT name: {phrase}")
+    )
+    hits = (
+        union_all(in_name, elsewhere)
+        .order_by(literal_column("tier"), literal_column("id").desc())
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    return (
+        select(*TASK_COLUMNS)
+        .select_from(hits)
+        .join(Task, Task.id == hits.c.id)
+        .where(Task.user_id == user_id)
+        .order_by(hits.c.tier, hits.c.id.desc())
+    )
+
+
+def _postgres_query(user_id, terms, limit, offset):
+    config = literal_column(f"'{PG_CONFIG}'::regconfig")
+    tsquery = func.to_tsquery(config, " & ".join(f"{term}:*" for term in terms))
+    # Cast rather than to_tsquery, which would drop the @ from the lexeme.
+    # GIN intersects the owner's short list of entries with the words', so a
+    # rare word or a miss doesn't depend on how many other users have it
+    owner = cast(literal(f"'@{int(user_id)}'"), postgresql.TSQUERY)
+    in_name = func.to_tsvector(config, Task.name).op("@@")(tsquery)
+    return (
+        select(*TASK_COLUMNS)
+        .where(
+            Task.user_id == user_id,
+            Task.search_vector().op("@@")(tsquery.op("&&")(owner)),
+        )
+        .order_by(case((in_name, 0), else_=1), Task.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import func
+
+from .models import Task
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+TASK_KEYS = ("id", "name", "description", "done", "date")
+
+# The columns a task is serialized from, selected as plain tuples instead of
+# ORM entities. Everything but description is NOT NULL in the schema and
+# description is coalesced here, so every row is already the shape the
+# front-end expects and doesn't need validating one by one. Execute them
+# with db.session.connection().execute() to skip ORM result processing.
+TASK_COLUMNS = (
+    Task.id,
+    Task.name,
+    func.coalesce(Task.description, "").label("description"),
+    Task.done,
+    Task.date,
+)
+
+
+def format_date(date: datetime) -> str:
+    """Same output as date.strftime("%Y-%m-%d %H:%M"), several times faster"""
+    return date.isoformat(" ", "minutes")
+
+
+def task_rows_to_dicts(rows) -> list[dict]:
+    """Turn (id, name, description, done, date) tuples into response dicts"""
+    return [
+        {
+            "id": task_id,
+            "name": name,
+            "description": description,
+            "done": done,
+            "date": format_date(date),
+        }
+        for task_id, name, description, done, date in rows
+    ]
+
+
+def dumps(data) -> bytes:
+    """Encode a response body, with orjson when it's installed.
+
+    Matches jsonify's output closely enough for the client: compact
+    separators, a trailing newline, non-ASCII left unescaped.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+
+    return (json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
@@ -0,0 +1,20 @@
+def redis_client(app):
+    """Return the Redis client shared by the cross-worker backends.
+
+    Built once per app from REDIS_URL. redis is an optional dependency, only
+    needed when one of the *_BACKEND settings is "redis".
+    """
+    client = app.extensions.get("redis")
+    if client is not None:
+        return client
+
+    try:
+        import redis
+    except ImportError as err:
+        raise RuntimeError(
+            "A redis backend is configured but the redis package isn't installed"
+        ) from err
+
+    client = redis.Redis.from_url(app.config["REDIS_URL"])
+    app.extensions["redis"] = client
+    return client
@@ -0,0 +1,92 @@
+import hashlib
+
+from sqlalchemy import insert, select, update
+
+from .models import Task, TaskTombstone, User, db
+from .serializers import TASK_COLUMNS, task_rows_to_dicts
+
+
+def version_claim(user_id: int):
+    """The statement behind next_version, for callers with their own session"""
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(task_version=User.task_version + 1)
+        .returning(User.task_version)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def next_version(user_id: int) -> int | None:
+    """Claim the next change version for this user's tasks.
+
+    This has to be the first write of the transaction. The row lock it takes
+    on the user serializes that user's writers, so versions become visible
+    in the same order they were handed out and a client polling with
+    ?since= can never skip past a change that commits late.
+
+    Returns None if the user doesn't exist, which the write routes use as
+    their ownership check instead of a separate lookup.
+    """
+    return db.session.execute(version_claim(user_id)).scalar_one_or_none()
+
+
+def tombstone_rows(user_id: int, task_ids, version: int) -> list[dict]:
+    return [
+        {"user_id": user_id, "task_id": task_id, "version": version}
+        for task_id in task_ids
+    ]
+
+
+def record_tombstones(user_id: int, task_ids, version: int) -> None:
+    """Remember deleted tasks so /changes can report them"""
+    rows = tombstone_rows(user_id, task_ids, version)
+    if rows:
+        db.session.execute(insert(TaskTombstone), rows)
+
+
+def changes_since(user_id: int, since: int) -> tuple[list[dict], list[int]] | None:
+    """Tasks written and ids deleted after version `since`, oldest first.
+
+    A client syncing from 0 has no tasks to delete, so the tombstones (which
+    the maintenance job leaves one of for every task it purges) aren't read.
+    Returns None when `since` is older than the user's tombstone horizon:
+    some of the deletes after it have been compacted away and the client has
+    to sync again from 0.
+    """
+    changed = (
+        db.session.connection()
+        .execute(
+            select(*TASK_COLUMNS)
+            .where(Task.user_id == user_id, Task.version > since)
+            .order_by(Task.version, Task.id)
+        )
+        .all()
+    )
+    if since == 0:
+        return task_rows_to_dicts(changed), []
+
+    deleted = db.session.scalars(
+        select(TaskTombstone.task_id).where(
+            TaskTombstone.user_id == user_id, TaskTombstone.version > since
+        )
+    ).all()
+    # Read after the tombstones: compaction raises the horizon in the same
+    # transaction that deletes them, so if any were missed this sees it
+    horizon = db.session.scalar(
+        select(User.tombstone_horizon).where(User.id == user_id)
+    )
+    if horizon is not None and since < horizon:
+        return None
+    return task_rows_to_dicts(changed), list(deleted)
+
+
+def collection_etag(user_id: int, version: int, variant: str) -> str:
+    """Validator for a view of the user's task list.
+
+    The version changes on every write so it stands in for count/max(date)
+    without reading any task rows, the view's variant (TaskListView) is
+    folded in because each page or filter is a different representation.
+    """
+    digest = hashlib.blake2b(variant.encode(), digest_size=8).hexdigest()
+    return f"{user_id}-{version}-{digest}"
@@ -0,0 +1,55 @@
+"""Gunicorn settings for `gunicorn -c gunicorn.conf.py run:app` (the Procfile).
+
+The app is imported once in the master and the workers are forked from it,
+so a new worker starts serving straight away instead of importing Flask,
+SQLAlchemy and the app again, and the workers share those pages with the
+master until they write to them. Each setting can be overridden from the
+environment, GUNICORN_PRELOAD=false loads the app in every worker instead.
+"""
+
+import gc
+import glob
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+
+# Every open GET /api/tasks/stream holds a thread until it closes, up to
+# TASK_STREAM_MAX_PER_WORKER of them, the rest serve everything else
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def on_starting(server):
+    # Snapshots left by the workers of a previous run would be added to
+    # this run's totals, see METRICS_DIR in config.py
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, "metrics-*.json")):
+            os.remove(path)
+
+
+def when_ready(server):
+    # Everything allocated while loading the app lives as long as the
+    # process. Moving it out of the collector's reach keeps a worker's
+    # collections from writing to, and so copying, the pages it shares
+    # with the master
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+
+    from focus_flow_app.__init__app import db
+
+    # A connection opened in the master would be shared by every worker.
+    # close=False leaves it to the master instead of closing it under them
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
@@ -44,6 +44,15 @@ target_db = current_app.extensions["migrate"].db
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # The SQLite full-text tables are managed by focus_flow_app.search
+    from focus_flow_app.search import is_search_table
+
+    if type_ == "table" and reflected and compare_to is None:
+        return not is_search_table(name)
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, "metadatas"):
         return target_db.metadatas[None]
@@ -63,7 +72,12 @@ def run_migrations_offline():
 
     """
     url = config.get_main_option("sqlalchemy.url")
-    context.configure(url=url, target_metadata=get_metadata(), literal_binds=True)
+    context.configure(
+        url=url,
+        target_metadata=get_metadata(),
+        literal_binds=True,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -90,10 +104,21 @@ def run_migrations_online():
     conf_args = current_app.extensions["migrate"].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # The app's SQLITE_PRAGMAS may turn foreign keys on, which breaks
+        # batch_alter_table's copy-and-drop of tables other tables point at.
+        # The pragma is ignored inside a transaction, so set it and commit
+        # before the migrations begin theirs
+        sqlite = connection.dialect.name == "sqlite"
+        if sqlite:
+            foreign_keys = connection.exec_driver_sql("PRAGMA foreign_keys").scalar()
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+
         context.configure(
             connection=connection, target_metadata=get_metadata(), **conf_args
         )
@@ -101,6 +126,11 @@ def run_migrations_online():
         with context.begin_transaction():
             context.run_migrations()
 
+        if sqlite:
+            # Back to the app's setting before the connection is reused
+            connection.exec_driver_sql(f"PRAGMA foreign_keys={foreign_keys}")
+            connection.commit()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,30 @@
+"""task user indexes
+
+Revision ID: 7c2d9a41f0b3
+Revises: e4401e08d8c1
+Create Date: 2026-10-18 10:12:44.318207
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "7c2d9a41f0b3"
+down_revision = "e4401e08d8c1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("task", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_task_user_id_date_id", ["user_id", "date", "id"], unique=False
+        )
+        batch_op.create_index("ix_task_user_id_done", ["user_id", "done"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("task", schema=None) as batch_op:
+        batch_op.drop_index("ix_task_user_id_done")
+        batch_op.drop_index("ix_task_user_id_date_id")
@@ -0,0 +1,52 @@
+"""task search index scoped to the owner
+
+Revision ID: a1b2c3d4e5f6
+Revises: f5a6b7c8d9e0
+Create Date: 2026-10-18 23:05:17.204611
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a1b2c3d4e5f6"
+down_revision = "f5a6b7c8d9e0"
+branch_labels = None
+depends_on = None
+
+
+# Same expression as focus_flow_app.models.search_vector, copied so this
+# revision keeps doing what it did when it was written
+PG_SEARCH_VECTOR = (
+    "(to_tsvector('simple'::regconfig, "
+    "(coalesce(name, '') || ' ') || coalesce(description, '')) "
+    "|| array_to_tsvector(ARRAY['@' || user_id::text]))"
+)
+
+PG_OLD_SEARCH_VECTOR = (
+    "to_tsvector('simple'::regconfig, "
+    "(coalesce(name, '') || ' ') || coalesce(description, ''))"
+)
+
+
+def recreate_search_index(expression):
+    op.drop_index("ix_task_search", table_name="task")
+    op.create_index(
+        "ix_task_search",
+        "task",
+        [sa.text(expression)],
+        postgresql_using="gin",
+    )
+
+
+def upgrade():
+    # SQLite searches through the FTS5 table, which already has user_id
+    if op.get_bind().dialect.name == "postgresql":
+        recreate_search_index(PG_SEARCH_VECTOR)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        recreate_search_index(PG_OLD_SEARCH_VECTOR)
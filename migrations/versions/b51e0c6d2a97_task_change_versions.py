@@ -0,0 +1,62 @@
+"""task change versions and tombstones
+
+Revision ID: b51e0c6d2a97
+Revises: 7c2d9a41f0b3
+Create Date: 2026-10-18 11:02:17.904512
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b51e0c6d2a97"
+down_revision = "7c2d9a41f0b3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "task_tombstone",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("task_tombstone", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_task_tombstone_user_id_version", ["user_id", "version"], unique=False
+        )
+
+    with op.batch_alter_table("task", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("version", sa.BigInteger(), server_default="0", nullable=False)
+        )
+        batch_op.create_index(
+            "ix_task_user_id_version", ["user_id", "version"], unique=False
+        )
+
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "task_version", sa.BigInteger(), server_default="0", nullable=False
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.drop_column("task_version")
+
+    with op.batch_alter_table("task", schema=None) as batch_op:
+        batch_op.drop_index("ix_task_user_id_version")
+        batch_op.drop_column("version")
+
+    with op.batch_alter_table("task_tombstone", schema=None) as batch_op:
+        batch_op.drop_index("ix_task_tombstone_user_id_version")
+
+    op.drop_table("task_tombstone")
@@ -0,0 +1,81 @@
+"""task full-text search
+
+Revision ID: c3f4a5b6d7e8
+Revises: b51e0c6d2a97
+Create Date: 2026-10-18 17:40:12.504113
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c3f4a5b6d7e8"
+down_revision = "b51e0c6d2a97"
+branch_labels = None
+depends_on = None
+
+
+# Same statements as focus_flow_app.search, copied so this revision keeps
+# doing what it did when it was written
+SQLITE_UPGRADE = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(
+        name, description, user_id,
+        content='task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3',
+        detail='column'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, name, description, user_id)
+        VALUES (new.id, new.name, new.description, new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, name, description, user_id)
+        VALUES ('delete', old.id, old.name, old.description, old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_au
+    AFTER UPDATE OF name, description ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, name, description, user_id)
+        VALUES ('delete', old.id, old.name, old.description, old.user_id);
+        INSERT INTO task_fts(rowid, name, description, user_id)
+        VALUES (new.id, new.name, new.description, new.user_id);
+    END""",
+    # Index the tasks that are already there
+    "INSERT INTO task_fts(task_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS task_fts_au",
+    "DROP TRIGGER IF EXISTS task_fts_ad",
+    "DROP TRIGGER IF EXISTS task_fts_ai",
+    "DROP TABLE IF EXISTS task_fts",
+)
+
+PG_SEARCH_VECTOR = (
+    "to_tsvector('simple'::regconfig, "
+    "(coalesce(name, '') || ' ') || coalesce(description, ''))"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        op.create_index(
+            "ix_task_search",
+            "task",
+            [sa.text(PG_SEARCH_VECTOR)],
+            postgresql_using="gin",
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        op.drop_index("ix_task_search", table_name="task")
@@ -0,0 +1,36 @@
+"""task list filter indexes
+
+Revision ID: d8e1f2a3b4c5
+Revises: c3f4a5b6d7e8
+Create Date: 2026-10-18 18:31:07.911254
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "d8e1f2a3b4c5"
+down_revision = "c3f4a5b6d7e8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("task", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_task_user_id_done_date_id",
+            ["user_id", "done", "date", "id"],
+            unique=False,
+        )
+        batch_op.create_index(
+            "ix_task_user_id_name_id", ["user_id", "name", "id"], unique=False
+        )
+        batch_op.drop_index("ix_task_user_id_done")
+
+
+def downgrade():
+    with op.batch_alter_table("task", schema=None) as batch_op:
+        batch_op.create_index("ix_task_user_id_done", ["user_id", "done"], unique=False)
+        batch_op.drop_index("ix_task_user_id_name_id")
+        batch_op.drop_index("ix_task_user_id_done_date_id")
@@ -0,0 +1,44 @@
+"""tombstone compaction
+
+Revision ID: f5a6b7c8d9e0
+Revises: e2f3a4b5c6d7
+Create Date: 2026-10-18 21:12:40.518203
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f5a6b7c8d9e0"
+down_revision = "e2f3a4b5c6d7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("task_tombstone", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "deleted_at",
+                sa.DateTime(),
+                server_default=sa.text("CURRENT_TIMESTAMP"),
+                nullable=False,
+            )
+        )
+
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "tombstone_horizon", sa.BigInteger(), server_default="0", nullable=False
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.drop_column("tombstone_horizon")
+
+    with op.batch_alter_table("task_tombstone", schema=None) as batch_op:
+        batch_op.drop_column("deleted_at")
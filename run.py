@@ -1,10 +1,12 @@
-from focus_flow_app.__init__app import create_app
-from dotenv import load_dotenv
 import os
 
-# Loading the .env.example file to populate our app
+from dotenv import load_dotenv
+
+# Loading the .env file before importing the app, config.py reads the
+# environment when it's imported
 load_dotenv()
 
+from focus_flow_app.__init__app import create_app  # noqa: E402
 
 cfg = os.getenv("FLASK_CONFIG", "development").lower()
 app = create_app(cfg)
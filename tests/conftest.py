@@ -1,4 +1,9 @@
+import fnmatch
+import queue
+import time
+
 import pytest
+from sqlalchemy import event
 from focus_flow_app.__init__app import create_app, db
 from focus_flow_app.models import User
 from werkzeug.security import generate_password_hash
@@ -49,3 +54,164 @@ def user(dbf):
 def auth_headers(user):
     token = create_access_token(identity=str(user.id))
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def query_counter(dbf):
+    # Collects every SQL statement sent to the database while active
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def sql_profile(app):
+    # SQLProfile of every request made while active, in order
+    profiler = app.extensions["sql_profiler"]
+    profiles = []
+    profiler.always = True
+    profiler.subscribe(profiles.append)
+    yield profiles
+    profiler.unsubscribe(profiles.append)
+    profiler.always = app.config["SQL_PROFILE"]
+
+
+class FakeRedis:
+    """In-process stand-in for the subset of redis-py the shared backends use"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.pubsubs = []
+
+    def _live(self, key):
+        if key in self.expires and self.expires[key] <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    def get(self, key):
+        return self._live(key)
+
+    def set(self, key, value, ex=None, px=None):
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        self.expires.pop(key, None)
+        if ex or px:
+            self.expires[key] = time.monotonic() + (ex or px / 1000)
+        return True
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += self.data.pop(key, None) is not None
+            self.expires.pop(key, None)
+        return removed
+
+    def hget(self, key, field):
+        return (self._live(key) or {}).get(field)
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+        return 1
+
+    def hdel(self, key, *fields):
+        values = self._live(key) or {}
+        return sum(values.pop(field, None) is not None for field in fields)
+
+    def zadd(self, key, mapping, xx=False):
+        scores = self._live(key)
+        if scores is None:
+            if xx:
+                return 0
+            scores = self.data[key] = {}
+        added = 0
+        for member, score in mapping.items():
+            if xx and member not in scores:
+                continue
+            added += member not in scores
+            scores[member] = score
+        return added
+
+    def zcard(self, key):
+        return len(self._live(key) or {})
+
+    def zpopmin(self, key, count=1):
+        scores = self._live(key) or {}
+        popped = sorted(scores.items(), key=lambda item: item[1])[:count]
+        for member, _ in popped:
+            del scores[member]
+        return popped
+
+    def expire(self, key, seconds, nx=False):
+        if self._live(key) is None or (nx and key in self.expires):
+            return False
+        self.expires[key] = time.monotonic() + seconds
+        return True
+
+    def keys(self, pattern="*"):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, pattern)]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def publish(self, channel, message):
+        receivers = [pubsub for pubsub in self.pubsubs if pubsub.matches(channel)]
+        for pubsub in receivers:
+            pubsub.messages.put(
+                {"type": "pmessage", "channel": channel.encode(), "data": message}
+            )
+        return len(receivers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        pubsub = FakePubSub()
+        self.pubsubs.append(pubsub)
+        return pubsub
+
+
+class FakePubSub:
+    def __init__(self):
+        self.patterns = []
+        self.messages = queue.Queue()
+
+    def psubscribe(self, *patterns):
+        self.patterns.extend(patterns)
+
+    def matches(self, channel):
+        return any(fnmatch.fnmatch(channel, pattern) for pattern in self.patterns)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        results = [
+            getattr(self.client, name)(*args, **kwargs)
+            for name, args, kwargs in self.calls
+        ]
+        self.calls = []
+        return results
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from config import TestingConfig, config_map
+from focus_flow_app.__init__app import create_app
+
+
+def app_with(monkeypatch, **settings):
+    config = type("AppTestingConfig", (TestingConfig,), settings)
+    monkeypatch.setitem(config_map, "app_testing", config)
+    return create_app("app_testing")
+
+
+def test_blueprints_can_be_left_out(monkeypatch):
+    app = app_with(monkeypatch, API_BLUEPRINTS="tasks, health")
+    client = app.test_client()
+
+    assert set(app.blueprints) == {"tasks", "health"}
+    assert client.get("/api/health/live").status_code == 200
+    assert client.post("/api/auth/login").status_code == 404
+    assert client.get("/metrics").status_code == 404
+
+
+def test_left_out_subsystems_are_not_imported():
+    # A fresh interpreter, this one has imported everything already
+    script = (
+        "import sys\n"
+        "from focus_flow_app.__init__app import create_app\n"
+        "create_app('testing')\n"
+        "print(' '.join(sorted(sys.modules)))\n"
+    )
+    env = {
+        **os.environ,
+        "API_BLUEPRINTS": "auth,health",
+        "METRICS_ENABLED": "false",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+    modules = set(result.stdout.split())
+    assert "focus_flow_app.routes.health_routes" in modules
+    for name in ("cache", "events", "idempotency", "metrics", "maintenance"):
+        assert f"focus_flow_app.{name}" not in modules
+    assert "focus_flow_app.search" not in modules
+
+
+def test_unknown_blueprint(monkeypatch):
+    with pytest.raises(RuntimeError, match="admin"):
+        app_with(monkeypatch, API_BLUEPRINTS="tasks,admin")
+
+
+def test_migrate_commands_only_under_flask_cli(monkeypatch):
+    monkeypatch.delenv("FLASK_RUN_FROM_CLI", raising=False)
+    assert "migrate" not in create_app("testing").extensions
+
+    monkeypatch.setenv("FLASK_RUN_FROM_CLI", "true")
+    app = create_app("testing")
+    assert "migrate" in app.extensions
+    assert "db" in app.cli.commands
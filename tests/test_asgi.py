@@ -0,0 +1,175 @@
+import threading
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("a2wsgi")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("httpx")
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+from config import TestingConfig, config_map  # noqa: E402
+from focus_flow_app.__init__app import db  # noqa: E402
+from focus_flow_app.asgi import create_asgi_app  # noqa: E402
+from focus_flow_app.models import Task, User  # noqa: E402
+
+
+@pytest.fixture
+def asgi(monkeypatch, tmp_path):
+    class AsgiConfig(TestingConfig):
+        # Both engines have to open the same database
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        SQLITE_PRAGMAS = {"journal_mode": "WAL", "busy_timeout": 5000}
+
+    monkeypatch.setitem(config_map, "asgi_testing", AsgiConfig)
+    app = create_asgi_app("asgi_testing")
+    flask_app = app.state.flask
+    with flask_app.app_context():
+        db.create_all()
+        user = User(username="asyncuser", email="async@example.com", password="x")
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+
+    with TestClient(app) as client:
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client, flask_app
+
+    with flask_app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_task_crud_round_trip(asgi):
+    client, flask_app = asgi
+
+    created = client.post("/api/tasks/", json={"name": "a", "description": "b"})
+    assert created.status_code == 201
+    # Served by the async route, not handed to the Flask view
+    assert client.app.state.engine.pool.checkedin() == 1
+    task = created.json()
+    assert task == {"id": task["id"], "name": "a", "description": "b", "done": False}
+
+    listed = client.get("/api/tasks/?limit=10")
+    assert listed.status_code == 200
+    assert [t["name"] for t in listed.json()["tasks"]] == ["a"]
+    assert listed.headers["Cache-Control"] == "private, no-cache"
+
+    etag = listed.headers["ETag"]
+    again = client.get("/api/tasks/?limit=10", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    updated = client.patch(
+        f"/api/tasks/{task['id']}/", json={"name": "c", "description": "d"}
+    )
+    assert updated.json()["name"] == "c"
+    assert client.patch(f"/api/tasks/{task['id']}/done/").json() == {"done": True}
+
+    # /changes isn't an async route, the Flask app answers it
+    changes = client.get("/api/tasks/changes?since=0").json()
+    assert changes["version"] == 3
+    assert changes["changed"][0]["done"] is True
+
+    assert client.delete(f"/api/tasks/{task['id']}/delete/").status_code == 200
+    assert client.get("/api/tasks/changes?since=3").json()["deleted"] == [task["id"]]
+    with flask_app.app_context():
+        assert db.session.query(Task).count() == 0
+
+
+def test_errors_match_the_flask_views(asgi):
+    client, _ = asgi
+
+    missing = client.post("/api/tasks/", json={"name": "a"})
+    assert missing.status_code == 422
+    assert missing.json() == {
+        "error": "the provided data did not include all required info"
+    }
+    assert client.patch("/api/tasks/999/", json={}).status_code == 400
+    assert client.patch("/api/tasks/999/done/").status_code == 404
+    assert client.delete("/api/tasks/999/delete/").json() == {
+        "error": "Task not found!"
+    }
+    assert client.get("/api/tasks/?done=maybe").status_code == 400
+
+
+def test_requests_without_a_bearer_token_go_to_flask(asgi):
+    client, _ = asgi
+    del client.headers["Authorization"]
+
+    response = client.get("/api/tasks/")
+
+    assert response.status_code == 401
+    assert "msg" in response.json()
+    assert client.get("/api/health/live").status_code == 200
+
+
+def test_idempotency_keys_are_shared_with_the_flask_views(asgi):
+    client, flask_app = asgi
+    headers = {"Idempotency-Key": "k1", "Content-Type": "application/json"}
+    body = b'{"name": "a", "description": "b"}'
+
+    # First served by a sync worker, the retry by the async route
+    first = flask_app.test_client().post(
+        "/api/tasks/", data=body, headers={**client.headers, **headers}
+    )
+    second = client.post("/api/tasks/", content=body, headers=headers)
+
+    assert second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.get_json()
+    other = client.post("/api/tasks/", content=body[:-1] + b" }", headers=headers)
+    assert other.status_code == 422
+    with flask_app.app_context():
+        assert db.session.query(Task).count() == 1
+
+
+def test_cache_and_broker_calls_stay_off_the_event_loop(asgi, monkeypatch):
+    client, flask_app = asgi
+    threads = []
+
+    def record(*args, **kwargs):
+        threads.append(threading.get_ident())
+
+    cache = flask_app.extensions["task_cache"]
+    monkeypatch.setattr(cache.backend, "get", lambda *args: record())
+    monkeypatch.setattr(cache.backend, "set", record)
+    monkeypatch.setattr(cache.backend, "delete", record)
+    monkeypatch.setattr(flask_app.extensions["task_events"], "publish", record)
+
+    client.get("/api/tasks/")
+    client.post("/api/tasks/", json={"name": "a", "description": "b"})
+
+    # With a Redis backend each of these is a network round trip
+    assert len(threads) == 4
+    loop_thread = client.portal.call(threading.get_ident)
+    assert loop_thread not in threads
+
+
+def test_async_routes_send_cors_headers(asgi):
+    client, _ = asgi
+    origin = {"Origin": "http://localhost:3000"}
+
+    listed = client.get("/api/tasks/", headers=origin)
+    assert listed.headers["Access-Control-Allow-Origin"] == "http://localhost:3000"
+    assert listed.headers["Access-Control-Allow-Credentials"] == "true"
+    # Same headers as the routes Flask still serves
+    changes = client.get("/api/tasks/changes?since=0", headers=origin)
+    assert changes.headers["Access-Control-Allow-Origin"] == "http://localhost:3000"
+
+    preflight = client.options(
+        "/api/tasks/1/done/",
+        headers={
+            **origin,
+            "Access-Control-Request-Method": "PATCH",
+            "Access-Control-Request-Headers": "Authorization, Idempotency-Key",
+        },
+    )
+    assert preflight.status_code == 200
+    assert preflight.headers["Access-Control-Allow-Origin"] == origin["Origin"]
+    assert "PATCH" in preflight.headers["Access-Control-Allow-Methods"]
+    assert "Idempotency-Key" in preflight.headers["Access-Control-Allow-Headers"]
+
+    other = client.get("/api/tasks/", headers={"Origin": "http://evil.example"})
+    assert "Access-Control-Allow-Origin" not in other.headers
@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from focus_flow_app.hashing import HashingBusy, PasswordHasher
+from focus_flow_app.models import User, db
+
+
+def test_signup_hashes_with_configured_method(client, dbf):
+    response = client.post(
+        "/api/auth/signup",
+        json={"email": "new@example.com", "name": "newuser", "password": "hunter22"},
+    )
+    assert response.status_code == 200
+
+    user = db.session.execute(
+        db.select(User).where(User.email == "new@example.com")
+    ).scalar_one()
+    assert user.password.startswith("pbkdf2:sha256:1000$")
+    assert check_password_hash(user.password, "hunter22")
+
+
+def test_login_rehashes_outdated_password(client, user):
+    # The fixture user was hashed with werkzeug's default scrypt parameters
+    assert user.password.startswith("scrypt:")
+
+    response = client.post(
+        "/api/auth/login", json={"email": user.email, "password": "password123"}
+    )
+    assert response.status_code == 200
+    assert "access_token" in response.get_json()
+
+    db.session.refresh(user)
+    assert user.password.startswith("pbkdf2:sha256:1000$")
+    assert check_password_hash(user.password, "password123")
+
+
+def test_wrong_password_does_not_rehash(client, user):
+    old_hash = user.password
+
+    response = client.post(
+        "/api/auth/login", json={"email": user.email, "password": "nope"}
+    )
+    assert response.get_json() == {"status": "wrong_password"}
+
+    db.session.refresh(user)
+    assert user.password == old_hash
+
+
+def test_saturated_pool_returns_503(app, client, user):
+    hasher = PasswordHasher("pbkdf2:sha256:1000", workers=1, queue_size=0, timeout=5)
+    app.extensions["password_hasher"] = hasher
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    blocker = threading.Thread(target=hasher._run, args=(hold,))
+    blocker.start()
+    started.wait(5)
+    try:
+        response = client.post(
+            "/api/auth/login", json={"email": user.email, "password": "password123"}
+        )
+    finally:
+        release.set()
+        blocker.join()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert hasher.rejected == 1
+
+    # The slot is handed back once the blocking hash finishes
+    response = client.post(
+        "/api/auth/login", json={"email": user.email, "password": "password123"}
+    )
+    assert response.status_code == 200
+
+
+def test_hasher_timeout_raises_busy():
+    hasher = PasswordHasher("pbkdf2:sha256:1000", workers=1, queue_size=0, timeout=0.01)
+    release = threading.Event()
+
+    try:
+        with pytest.raises(HashingBusy):
+            hasher._run(release.wait, 5)
+    finally:
+        release.set()
+
+    assert hasher.rejected == 1
+
+
+def test_inline_hasher_needs_no_pool():
+    hasher = PasswordHasher("pbkdf2:sha256:1000", workers=0, queue_size=0, timeout=1)
+    pwhash = hasher.hash("secret")
+
+    assert hasher.verify(pwhash, "secret")
+    assert not hasher.needs_rehash(pwhash)
+    assert hasher.needs_rehash(pwhash.replace("1000", "2000", 1))
+
+
+def test_short_method_names_do_not_rehash_every_login():
+    # werkzeug writes the defaults out in the hash, "pbkdf2:sha256" becomes
+    # "pbkdf2:sha256:<iterations>"
+    hasher = PasswordHasher("pbkdf2:sha256", workers=0, queue_size=0, timeout=1)
+    pwhash = hasher.hash("secret")
+
+    assert pwhash.startswith("pbkdf2:sha256:")
+    assert not hasher.needs_rehash(pwhash)
+    assert hasher.needs_rehash(generate_password_hash("secret", "pbkdf2:sha256:1000"))
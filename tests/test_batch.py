@@ -0,0 +1,158 @@
+from focus_flow_app.models import Task, User
+from focus_flow_app.__init__app import db
+from werkzeug.security import generate_password_hash
+
+
+def make_tasks(user, count, done=False):
+    tasks = [
+        Task(user_id=user.id, name=f"batch{i}", description="test", done=done)
+        for i in range(count)
+    ]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return [task.id for task in tasks]
+
+
+def test_batch_requires_auth(client, dbf):
+    assert client.post("/api/tasks/batch", json={"operations": []}).status_code == 401
+
+
+def test_batch_mixed_operations(client, auth_headers, dbf, user):
+    update_id, toggle_id, delete_id = make_tasks(user, 3)
+
+    response = client.post(
+        "/api/tasks/batch",
+        headers=auth_headers,
+        json={
+            "operations": [
+                {"op": "create", "name": "new", "description": "made in batch"},
+                {"op": "update", "id": update_id, "name": "up", "description": "d"},
+                {"op": "toggle", "id": toggle_id},
+                {"op": "delete", "id": delete_id},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [201, 200, 200, 200]
+    assert results[0]["task"]["name"] == "new"
+    assert results[1]["task"] == {
+        "id": update_id,
+        "name": "up",
+        "description": "d",
+        "done": False,
+    }
+    assert results[2]["task"] == {"id": toggle_id, "done": True}
+
+    db.session.expire_all()
+    assert db.session.get(Task, results[0]["task"]["id"]).user_id == user.id
+    assert db.session.get(Task, update_id).name == "up"
+    assert db.session.get(Task, toggle_id).done is True
+    assert db.session.get(Task, delete_id) is None
+
+
+def test_batch_reports_per_item_errors(client, auth_headers, dbf, user):
+    (own_id,) = make_tasks(user, 1)
+    other = User(
+        username="batchOther",
+        email="batchOther@example.com",
+        password=generate_password_hash("pass"),
+    )
+    db.session.add(other)
+    db.session.commit()
+    (foreign_id,) = make_tasks(other, 1)
+
+    response = client.post(
+        "/api/tasks/batch",
+        headers=auth_headers,
+        json={
+            "operations": [
+                {"op": "create", "name": "missing description"},
+                {"op": "delete", "id": foreign_id},
+                {"op": "explode", "id": own_id},
+                {"op": "toggle", "id": own_id},
+                {"op": "delete", "id": own_id},
+            ]
+        },
+    )
+
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [422, 404, 422, 200, 422]
+
+    db.session.expire_all()
+    assert db.session.get(Task, foreign_id) is not None
+    assert db.session.get(Task, own_id).done is True
+
+
+def test_batch_is_constant_round_trips(client, auth_headers, dbf, user, query_counter):
+    ids = make_tasks(user, 200, done=True)
+    client.get("/api/tasks/", headers=auth_headers)
+
+    query_counter.clear()
+    response = client.post(
+        "/api/tasks/batch",
+        headers=auth_headers,
+        json={"operations": [{"op": "delete", "id": task_id} for task_id in ids]},
+    )
+
+    assert response.status_code == 200
+    # version bump, ownership lookup, one DELETE and one tombstone
+    # INSERT, regardless of batch size
+    assert len(query_counter) == 4
+    assert db.session.scalars(db.select(Task)).all() == []
+
+
+def test_batch_rejects_bad_payloads(app, client, auth_headers, dbf, user):
+    app.config["TASKS_BATCH_MAX_SIZE"] = 2
+
+    assert (
+        client.post("/api/tasks/batch", headers=auth_headers, json={}).status_code
+        == 422
+    )
+    too_many = [{"op": "create", "name": "n", "description": "d"}] * 3
+    assert (
+        client.post(
+            "/api/tasks/batch", headers=auth_headers, json={"operations": too_many}
+        ).status_code
+        == 422
+    )
+
+
+def test_batch_checks_column_lengths_per_item(client, auth_headers, dbf, user):
+    response = client.post(
+        "/api/tasks/batch",
+        headers=auth_headers,
+        json={
+            "operations": [
+                {"op": "create", "name": "x" * 201, "description": ""},
+                {"op": "create", "name": "fits", "description": "d" * 350},
+                {"op": "create", "name": "n", "description": "d" * 351},
+            ]
+        },
+    )
+
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [422, 201, 422]
+    assert results[0]["error"] == "name is too long"
+    assert results[2]["error"] == "description is too long"
+    assert [task.name for task in db.session.scalars(db.select(Task))] == ["fits"]
+
+
+def test_batch_with_nothing_valid_claims_no_version(
+    client, auth_headers, dbf, user, query_counter
+):
+    query_counter.clear()
+    response = client.post(
+        "/api/tasks/batch",
+        headers=auth_headers,
+        json={"operations": [{"op": "toggle", "id": "1"}, {"op": "explode"}]},
+    )
+
+    assert [result["status"] for result in response.get_json()["results"]] == [
+        422,
+        422,
+    ]
+    assert not any("UPDATE user" in statement for statement in query_counter)
+    db.session.refresh(user)
+    assert user.task_version == 0
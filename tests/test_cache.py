@@ -0,0 +1,148 @@
+import pytest
+from focus_flow_app.cache import MemoryCacheBackend, RedisCacheBackend, TaskListCache
+
+
+def create(client, headers, name="cached"):
+    return client.post(
+        "/api/tasks/", headers=headers, json={"name": name, "description": "cache"}
+    )
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, fake_redis):
+    if request.param == "memory":
+        return MemoryCacheBackend(ttl=60, max_users=2, max_variants=2)
+    return RedisCacheBackend(fake_redis, ttl=60, max_variants=2)
+
+
+def test_backend_round_trip_and_delete(backend):
+    backend.set(1, "v1", b"[1]")
+    backend.set(1, "v2", b"[2]")
+
+    assert backend.get(1, "v1") == b"[1]"
+    assert backend.get(1, "v2") == b"[2]"
+    assert backend.get(2, "v1") is None
+
+    backend.delete(1)
+    assert backend.get(1, "v1") is None
+
+
+def test_backend_drops_least_recently_used_variant(backend, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("focus_flow_app.cache.time.time", lambda: now[0])
+
+    for variant in ("a", "b"):
+        now[0] += 1
+        backend.set(1, variant, variant.encode())
+    now[0] += 1
+    backend.get(1, "a")
+    now[0] += 1
+    backend.set(1, "c", b"c")
+
+    assert backend.get(1, "b") is None
+    assert backend.get(1, "a") == b"a"
+    assert backend.get(1, "c") == b"c"
+
+
+def test_memory_backend_evicts_lru_and_expired(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("focus_flow_app.cache.time.monotonic", lambda: now[0])
+    backend = MemoryCacheBackend(ttl=10, max_users=2, max_variants=4)
+
+    backend.set(1, "a", b"1")
+    backend.set(2, "a", b"2")
+    backend.get(1, "a")
+    backend.set(3, "a", b"3")
+    assert backend.get(2, "a") is None
+    assert backend.get(1, "a") == b"1"
+
+    now[0] = 11
+    assert backend.get(1, "a") is None
+
+
+def test_cache_counts_hits_and_misses():
+    cache = TaskListCache(MemoryCacheBackend(ttl=60, max_users=10, max_variants=4))
+
+    cache.get(1, "etag")
+    cache.set(1, "etag", b"[]")
+    cache.get(1, "etag")
+    cache.invalidate(1)
+
+    assert cache.stats() == {
+        "backend": "memory",
+        "hits": 1,
+        "misses": 1,
+        "hit_ratio": 0.5,
+        "invalidations": 1,
+    }
+
+
+def test_cached_list_skips_task_query(client, auth_headers, user, query_counter):
+    create(client, auth_headers)
+    first = client.get("/api/tasks/", headers=auth_headers)
+
+    query_counter.clear()
+    second = client.get("/api/tasks/", headers=auth_headers)
+
+    assert second.data == first.data
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert len(query_counter) == 1
+    assert "FROM task" not in query_counter[0]
+
+    stats = client.get("/api/health/cache").get_json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_ignored_args_share_a_cache_entry(client, auth_headers, user):
+    create(client, auth_headers)
+    first = client.get("/api/tasks/?limit=5&_=1", headers=auth_headers)
+    # A cache-buster, or the same filter spelled another way
+    second = client.get("/api/tasks/?_=2&limit=05", headers=auth_headers)
+
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert client.get("/api/health/cache").get_json()["hits"] == 1
+    other = client.get("/api/tasks/?limit=6", headers=auth_headers)
+    assert other.headers["ETag"] != first.headers["ETag"]
+
+
+def test_writes_invalidate_cached_list(client, auth_headers, user):
+    task_id = create(client, auth_headers).get_json()["id"]
+    client.get("/api/tasks/", headers=auth_headers)
+
+    client.patch(
+        f"/api/tasks/{task_id}/",
+        headers=auth_headers,
+        json={"name": "renamed", "description": "cache"},
+    )
+
+    data = client.get("/api/tasks/", headers=auth_headers).get_json()
+    assert data[0]["name"] == "renamed"
+    assert client.get("/api/health/cache").get_json()["invalidations"] == 2
+
+
+def test_shared_backend_serves_other_workers(
+    app, client, auth_headers, user, fake_redis
+):
+    app.extensions["task_cache"] = TaskListCache(RedisCacheBackend(fake_redis, 60, 16))
+    create(client, auth_headers)
+    first = client.get("/api/tasks/", headers=auth_headers)
+
+    # A second worker with its own counters but the same Redis
+    app.extensions["task_cache"] = TaskListCache(RedisCacheBackend(fake_redis, 60, 16))
+    second = client.get("/api/tasks/", headers=auth_headers)
+
+    assert second.data == first.data
+    assert app.extensions["task_cache"].hits == 1
+
+
+def test_disabled_cache_is_one_statement(
+    app, client, auth_headers, user, query_counter
+):
+    app.extensions["task_cache"] = None
+    create(client, auth_headers)
+
+    query_counter.clear()
+    assert client.get("/api/tasks/", headers=auth_headers).status_code == 200
+    assert len(query_counter) == 1
+    assert client.get("/api/health/cache").get_json() == {"backend": "none"}
@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from config import TestingConfig, config_map
+from focus_flow_app.__init__app import create_app, db
+from focus_flow_app.database import (
+    TimedQueuePool,
+    async_database_url,
+    async_engine_options,
+    engine_options,
+    pool_stats,
+)
+
+
+def options_for(uri, **config):
+    return engine_options(
+        {
+            "SQLALCHEMY_DATABASE_URI": uri,
+            "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": 5, "pool_timeout": 10},
+            **config,
+        }
+    )
+
+
+def test_memory_sqlite_gets_no_pool_sizing():
+    assert options_for("sqlite:///:memory:") == {}
+
+
+def test_file_database_gets_timed_pool():
+    options = options_for("sqlite:///app.db", DB_STATEMENT_TIMEOUT_MS=5000)
+
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 5
+    assert "connect_args" not in options
+
+
+def test_postgres_gets_statement_timeout():
+    options = options_for(
+        "postgresql+psycopg2://localhost/focusflow", DB_STATEMENT_TIMEOUT_MS=5000
+    )
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    options = options_for("postgresql://localhost/focusflow", DB_STATEMENT_TIMEOUT_MS=0)
+    assert "connect_args" not in options
+
+
+def test_async_engine_settings():
+    config = {
+        "SQLALCHEMY_DATABASE_URI": "postgresql+psycopg2://localhost/focusflow",
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": 5},
+        "DB_STATEMENT_TIMEOUT_MS": 5000,
+    }
+    assert str(async_database_url(config)) == "postgresql+asyncpg://localhost/focusflow"
+
+    options = async_engine_options(config)
+    assert options == {
+        "pool_size": 5,
+        "connect_args": {"server_settings": {"statement_timeout": "5000"}},
+    }
+
+    config["ASYNC_DATABASE_URL"] = "postgresql+psycopg://localhost/focusflow"
+    assert async_database_url(config).drivername == "postgresql+psycopg"
+
+    with pytest.raises(RuntimeError, match="in-memory"):
+        async_database_url({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+
+
+def test_timed_pool_records_waits_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+
+    with engine.connect():
+        stats = pool_stats(engine)
+        assert stats["checked_out"] == 1
+        assert stats["saturation"] == 1.0
+
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = pool_stats(engine)
+    assert stats["pool"] == "TimedQueuePool"
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 50
+    assert stats["checked_out"] == 0
+    engine.dispose()
+
+
+def test_sqlite_pragmas_applied_on_connect(monkeypatch, tmp_path):
+    class PragmaConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        SQLITE_PRAGMAS = {"journal_mode": "WAL", "foreign_keys": "ON"}
+
+    monkeypatch.setitem(config_map, "pragma_testing", PragmaConfig)
+    app = create_app("pragma_testing")
+
+    with app.app_context():
+        assert isinstance(db.engine.pool, TimedQueuePool)
+        with db.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        db.engine.dispose()
+
+
+def test_pool_endpoint(client):
+    response = client.get("/api/health/pool")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"pool": "StaticPool"}
@@ -0,0 +1,54 @@
+def create(client, headers, name="etag"):
+    return client.post(
+        "/api/tasks/", headers=headers, json={"name": name, "description": "etag"}
+    )
+
+
+def test_task_list_has_etag(client, auth_headers, user):
+    response = client.get("/api/tasks/", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('W/"')
+    assert "no-cache" in response.headers["Cache-Control"]
+
+
+def test_unchanged_list_is_304_in_one_query(client, auth_headers, user, query_counter):
+    create(client, auth_headers)
+    etag = client.get("/api/tasks/", headers=auth_headers).headers["ETag"]
+
+    query_counter.clear()
+    response = client.get(
+        "/api/tasks/", headers={**auth_headers, "If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert len(query_counter) == 1
+
+
+def test_write_changes_etag(client, auth_headers, user):
+    task_id = create(client, auth_headers).get_json()["id"]
+    etag = client.get("/api/tasks/", headers=auth_headers).headers["ETag"]
+
+    client.patch(f"/api/tasks/{task_id}/done/", headers=auth_headers)
+
+    response = client.get(
+        "/api/tasks/", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()[0]["done"] is True
+
+
+def test_etag_differs_per_page(client, auth_headers, user):
+    create(client, auth_headers)
+
+    full = client.get("/api/tasks/", headers=auth_headers).headers["ETag"]
+    paged = client.get("/api/tasks/?limit=5", headers=auth_headers).headers["ETag"]
+
+    assert full != paged
+    response = client.get(
+        "/api/tasks/?limit=5", headers={**auth_headers, "If-None-Match": full}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,242 @@
+import json
+import time
+
+import pytest
+
+from focus_flow_app.events import MemoryBroker, RedisBroker
+from focus_flow_app.models import User
+
+
+@pytest.fixture
+def stream(app, client, auth_headers):
+    """Open GET /api/tasks/stream, returning a function that reads the next
+    event off it as (id, event, data)"""
+    app.config["TASK_STREAM_HEARTBEAT"] = 0.05
+    opened = []
+
+    def open_stream(headers=None):
+        response = client.get(
+            "/api/tasks/stream", headers={**auth_headers, **(headers or {})}
+        )
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        opened.append(response)
+        chunks = response.response
+
+        def next_event(skip_pings=True):
+            while True:
+                message = next(chunks).decode()
+                if skip_pings and (
+                    message.startswith(": ping") or message.startswith("retry:")
+                ):
+                    continue
+                fields = dict(
+                    line.split(": ", 1) for line in message.strip().splitlines()
+                )
+                return fields.get("id"), fields["event"], json.loads(fields["data"])
+
+        next_event.chunks = chunks
+        return next_event
+
+    yield open_stream
+    for response in opened:
+        response.close()
+
+
+def test_writes_are_pushed_as_events(client, auth_headers, user, stream):
+    next_event = stream()
+    assert next_event() == ("0", "ready", {"version": 0})
+
+    task = client.post(
+        "/api/tasks/", json={"name": "a", "description": "b"}, headers=auth_headers
+    ).get_json()
+    client.patch(
+        f"/api/tasks/{task['id']}/",
+        json={"name": "a2", "description": "b"},
+        headers=auth_headers,
+    )
+    client.patch(f"/api/tasks/{task['id']}/done/", headers=auth_headers)
+    client.delete(f"/api/tasks/{task['id']}/delete/", headers=auth_headers)
+
+    assert next_event() == ("1", "create", {"version": 1, "task": task})
+    assert next_event() == (
+        "2",
+        "update",
+        {"version": 2, "task": {**task, "name": "a2"}},
+    )
+    assert next_event() == (
+        "3",
+        "toggle",
+        {"version": 3, "task": {"id": task["id"], "done": True}},
+    )
+    assert next_event() == ("4", "delete", {"version": 4, "task": {"id": task["id"]}})
+
+
+def test_batch_events_share_one_id(client, auth_headers, user, stream):
+    next_event = stream()
+    next_event()
+
+    client.post(
+        "/api/tasks/batch",
+        json={
+            "operations": [
+                {"op": "create", "name": "x", "description": ""},
+                {"op": "toggle", "id": 999},
+                {"op": "create", "name": "y", "description": ""},
+            ]
+        },
+        headers=auth_headers,
+    )
+
+    first, second = next_event(), next_event()
+    # Only the last event of the version carries the id, so a reconnect in
+    # the middle of the batch replays all of it
+    assert (first[0], first[1], first[2]["task"]["name"]) == (None, "create", "x")
+    assert (second[0], second[1], second[2]["task"]["name"]) == ("1", "create", "y")
+
+
+def test_heartbeat_when_idle(user, stream):
+    next_event = stream()
+    next_event()
+    assert next(next_event.chunks) == b": ping\n\n"
+
+
+def test_resume_from_last_event_id(client, auth_headers, user, stream):
+    for name in ("a", "b", "c"):
+        client.post(
+            "/api/tasks/", json={"name": name, "description": ""}, headers=auth_headers
+        )
+    first = client.get("/api/tasks/", headers=auth_headers).get_json()[0]
+    client.delete(f"/api/tasks/{first['id']}/delete/", headers=auth_headers)
+
+    event_id, kind, data = stream({"Last-Event-ID": "1"})()
+
+    assert (event_id, kind) == ("4", "sync")
+    assert [task["name"] for task in data["changed"]] == ["b", "c"]
+    assert data["deleted"] == [first["id"]]
+
+
+def test_unknown_last_event_id_resyncs_everything(client, auth_headers, user, stream):
+    client.post(
+        "/api/tasks/", json={"name": "a", "description": ""}, headers=auth_headers
+    )
+
+    _, kind, data = stream({"Last-Event-ID": "50"})()
+
+    assert kind == "sync"
+    assert data["reset"] is True
+    assert [task["name"] for task in data["changed"]] == ["a"]
+
+
+def test_last_event_id_behind_the_tombstone_horizon_resets(
+    client, auth_headers, user, stream, dbf
+):
+    for name in ("a", "b"):
+        client.post(
+            "/api/tasks/", json={"name": name, "description": ""}, headers=auth_headers
+        )
+    dbf.session.get(User, user.id).tombstone_horizon = 2
+    dbf.session.commit()
+
+    _, kind, data = stream({"Last-Event-ID": "1"})()
+
+    assert kind == "sync"
+    assert data["reset"] is True
+    assert [task["name"] for task in data["changed"]] == ["a", "b"]
+
+
+def test_invalid_last_event_id(client, auth_headers, user):
+    response = client.get(
+        "/api/tasks/stream", headers={**auth_headers, "Last-Event-ID": "abc"}
+    )
+    assert response.status_code == 400
+
+
+def test_slow_stream_catches_up_from_the_database(
+    app, client, auth_headers, user, stream
+):
+    app.extensions["task_events"].queue_size = 2
+    next_event = stream()
+    next_event()
+
+    for name in ("a", "b", "c", "d"):
+        client.post(
+            "/api/tasks/", json={"name": name, "description": ""}, headers=auth_headers
+        )
+
+    # Two fit in the buffer and two were dropped, one catch-up from the
+    # database covers all four and the buffered ones are skipped
+    event_id, kind, data = next_event()
+    assert (event_id, kind) == ("4", "sync")
+    assert [task["name"] for task in data["changed"]] == ["a", "b", "c", "d"]
+    assert next(next_event.chunks) == b": ping\n\n"
+    assert app.extensions["task_events"].dropped == 2
+
+
+def test_imports_are_sent_as_a_sync(client, auth_headers, user, stream):
+    next_event = stream()
+    next_event()
+
+    client.post(
+        "/api/tasks/import",
+        data='{"name": "a", "description": ""}\n{"name": "b", "description": ""}\n',
+        headers=auth_headers,
+    )
+
+    event_id, kind, data = next_event()
+    assert (event_id, kind) == ("1", "sync")
+    assert [task["name"] for task in data["changed"]] == ["a", "b"]
+
+
+def test_stream_unsubscribes_when_closed(app, client, auth_headers, user):
+    broker = app.extensions["task_events"]
+    response = client.get("/api/tasks/stream", headers=auth_headers)
+    next(response.response)
+    assert broker.stats()["subscribers"] == 1
+
+    response.close()
+    assert broker.stats()["subscribers"] == 0
+
+
+def test_streams_past_the_worker_cap_get_503(app, client, auth_headers, user):
+    broker = app.extensions["task_events"]
+    broker.max_subscribers = 1
+    first = client.get("/api/tasks/stream", headers=auth_headers)
+    next(first.response)
+
+    refused = client.get("/api/tasks/stream", headers=auth_headers)
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"] == "30"
+    assert broker.stats()["rejected"] == 1
+    # Polling still works meanwhile
+    assert client.get("/api/tasks/changes", headers=auth_headers).status_code == 200
+
+    first.close()
+    second = client.get("/api/tasks/stream", headers=auth_headers)
+    assert second.status_code == 200
+    second.close()
+    assert broker.stats()["subscribers"] == 0
+
+
+def test_memory_broker_only_reaches_the_users_streams():
+    broker = MemoryBroker(queue_size=4)
+    mine, theirs = broker.subscribe(1), broker.subscribe(2)
+
+    broker.publish(1, (1, [("delete", {"task": {"id": 5}})]))
+
+    assert mine.get(0) == (1, [("delete", {"task": {"id": 5}})])
+    assert theirs.get(0) is None
+
+
+def test_redis_broker_fans_out_through_pubsub(fake_redis):
+    # Two workers sharing one Redis
+    writer, reader = RedisBroker(fake_redis, 4), RedisBroker(fake_redis, 4)
+    subscription = reader.subscribe(7)
+    deadline = time.monotonic() + 2
+    while not fake_redis.pubsubs and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    writer.publish(7, (3, [("toggle", {"task": {"id": 1, "done": True}})]))
+
+    assert subscription.get(2) == (3, [("toggle", {"task": {"id": 1, "done": True}})])
+    assert reader.stats()["subscribers"] == 1
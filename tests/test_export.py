@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+
+from sqlalchemy import insert
+
+from focus_flow_app.__init__app import db
+from focus_flow_app.models import Task
+
+
+def seed(user, count):
+    db.session.execute(
+        insert(Task),
+        [
+            {"user_id": user.id, "name": f"export{i}", "description": 'd, "q"'}
+            for i in range(count)
+        ],
+    )
+    db.session.commit()
+
+
+def test_export_requires_auth(client, dbf):
+    assert client.get("/api/tasks/export").status_code == 401
+
+
+def test_export_ndjson(client, auth_headers, user):
+    seed(user, 5)
+
+    response = client.get("/api/tasks/export", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert "tasks.ndjson" in response.headers["Content-Disposition"]
+    lines = response.data.decode().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == [
+        f"export{i}" for i in range(5)
+    ]
+
+
+def test_export_csv(client, auth_headers, user):
+    seed(user, 3)
+
+    response = client.get("/api/tasks/export?format=csv", headers=auth_headers)
+
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert len(rows) == 3
+    assert rows[0]["description"] == 'd, "q"'
+    assert rows[0]["done"] == "False"
+
+
+def test_export_streams_in_chunks(app, client, auth_headers, user):
+    app.config["TASKS_EXPORT_CHUNK_SIZE"] = 2
+    seed(user, 5)
+
+    response = client.get("/api/tasks/export", headers=auth_headers)
+
+    chunks = [chunk for chunk in response.response if chunk]
+    assert len(chunks) == 3
+    assert b"".join(chunks).count(b"\n") == 5
+
+
+def test_export_unknown_format(client, auth_headers, user):
+    response = client.get("/api/tasks/export?format=xml", headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from focus_flow_app.__init__app import db
+from focus_flow_app.models import Task
+
+
+def seed(user):
+    start = datetime(2025, 3, 1, 9, 0)
+    tasks = [
+        Task(
+            user_id=user.id,
+            name=name,
+            description="",
+            done=i % 2 == 1,
+            date=start + timedelta(days=i),
+        )
+        for i, name in enumerate(["delta", "alpha", "echo", "charlie", "bravo"])
+    ]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return tasks
+
+
+def names(client, headers, query):
+    response = client.get(f"/api/tasks/?{query}", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    return [task["name"] for task in (data["tasks"] if "tasks" in data else data)]
+
+
+def test_done_filter(client, auth_headers, user):
+    seed(user)
+
+    assert names(client, auth_headers, "done=false&sort=date") == [
+        "delta",
+        "echo",
+        "bravo",
+    ]
+    assert names(client, auth_headers, "done=true&sort=date") == ["alpha", "charlie"]
+    assert len(names(client, auth_headers, "done=")) == 5
+
+
+def test_date_range_is_inclusive(client, auth_headers, user):
+    seed(user)
+
+    assert names(client, auth_headers, "from=2025-03-02&to=2025-03-04&sort=date") == [
+        "alpha",
+        "echo",
+        "charlie",
+    ]
+    assert names(
+        client, auth_headers, "from=2025-03-02T09:00&to=2025-03-03T09:00&sort=date"
+    ) == ["alpha", "echo"]
+
+
+def test_sort_keys_and_order(client, auth_headers, user):
+    tasks = seed(user)
+
+    assert names(client, auth_headers, "sort=name") == [
+        "alpha",
+        "bravo",
+        "charlie",
+        "delta",
+        "echo",
+    ]
+    assert names(client, auth_headers, "sort=date&order=desc") == [
+        "bravo",
+        "charlie",
+        "echo",
+        "alpha",
+        "delta",
+    ]
+    response = client.get("/api/tasks/?sort=id&order=desc", headers=auth_headers)
+    assert [task["id"] for task in response.get_json()] == [
+        task.id for task in reversed(tasks)
+    ]
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("sort=name&order=desc", ["echo", "delta", "charlie", "bravo", "alpha"]),
+        ("sort=date&order=desc&done=false", ["bravo", "echo", "delta"]),
+        ("sort=id", ["delta", "alpha", "echo", "charlie", "bravo"]),
+    ],
+)
+def test_cursor_pages_follow_the_sort(client, auth_headers, user, query, expected):
+    seed(user)
+
+    seen = []
+    cursor = None
+    while True:
+        url = f"/api/tasks/?{query}&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(url, headers=auth_headers).get_json()
+        seen.extend(task["name"] for task in data["tasks"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+def test_invalid_filter_args(client, auth_headers, user):
+    for query in (
+        "done=maybe",
+        "from=yesterday",
+        "to=2025-13-01",
+        "sort=priority",
+        "order=sideways",
+    ):
+        response = client.get(f"/api/tasks/?{query}", headers=auth_headers)
+        assert response.status_code == 400, query
+
+    # A cursor issued for one sort key can't be used with another
+    seed(user)
+    data = client.get("/api/tasks/?limit=1&sort=name", headers=auth_headers).get_json()
+    response = client.get(
+        f"/api/tasks/?sort=date&cursor={data['next_cursor']}", headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "done=false&sort=date&limit=20",
+        "done=true&sort=date&order=desc&limit=20",
+        "sort=name&order=desc&limit=20",
+        "from=2025-03-02&to=2025-03-04&sort=date&limit=20",
+    ],
+)
+def test_filtered_lists_are_served_by_an_index(client, auth_headers, user, query):
+    seed(user)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "AS task_version" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        client.get(f"/api/tasks/?{query}", headers=auth_headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    statement, parameters = statements[-1]
+    plan = db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + statement, parameters
+    )
+    details = [row[-1] for row in plan]
+
+    assert any("USING INDEX ix_task_user_id_" in detail for detail in details)
+    assert not any("TEMP B-TREE" in detail for detail in details), details
@@ -1,6 +1,50 @@
+from sqlalchemy.exc import OperationalError
+
+
 def test_health_check_returns_ok_status(client):
     response = client.get("/api/health/")
 
     assert response.status_code == 200
     assert response.is_json
     assert response.get_json() == {"status": "ok"}
+
+
+def test_liveness_touches_nothing(client, query_counter):
+    response = client.get("/api/health/live")
+
+    assert response.get_json() == {"status": "ok"}
+    assert query_counter == []
+
+
+def test_readiness_runs_one_cached_query(client, query_counter):
+    first = client.get("/api/health/ready")
+    second = client.get("/api/health/ready")
+
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-store"
+    body = first.get_json()
+    assert body["status"] == "ok"
+    assert body["database"]["error"] is None
+    assert body["pool"] == {"pool": "StaticPool"}
+    assert second.get_json()["checked_at"] == body["checked_at"]
+    assert query_counter == ["SELECT 1"]
+
+
+def test_readiness_503_when_database_unreachable(client, dbf, monkeypatch):
+    def refuse():
+        raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(dbf.engine, "connect", refuse)
+    response = client.get("/api/health/ready")
+
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "unavailable"
+    assert response.get_json()["database"]["error"] == "OperationalError"
+
+
+def test_readiness_503_when_database_slow(app, client, dbf):
+    app.extensions["readiness"].max_latency_ms = -1
+    response = client.get("/api/health/ready")
+
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "degraded"
@@ -0,0 +1,236 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token, jwt_required
+from sqlalchemy import event, text
+from werkzeug.security import generate_password_hash
+
+from focus_flow_app.__init__app import db
+from focus_flow_app.idempotency import MemoryIdempotencyBackend, idempotent
+from focus_flow_app.models import IdempotencyKey, Task, User
+from focus_flow_app.routes import task_routes
+
+
+@pytest.fixture(params=["database", "memory"])
+def store(request, app, dbf):
+    store = app.extensions["idempotency"]
+    if request.param == "memory":
+        store.backend = MemoryIdempotencyBackend(max_keys=100)
+    return store
+
+
+def create(client, headers, key, name="a"):
+    return client.post(
+        "/api/tasks/",
+        json={"name": name, "description": "b"},
+        headers={**headers, "Idempotency-Key": key},
+    )
+
+
+def test_retried_create_is_replayed(client, auth_headers, store, query_counter):
+    first = create(client, auth_headers, "k1")
+    query_counter.clear()
+    second = create(client, auth_headers, "k1")
+    statements = list(query_counter)
+
+    assert first.status_code == second.status_code == 201
+    assert second.get_json() == first.get_json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert db.session.query(Task).count() == 1
+    # The replay never went near the task tables
+    assert not any(
+        re.search(r"\btask\b", statement) for statement in statements
+    ), statements
+    assert store.replays == 1
+
+
+def test_every_write_route_is_covered(client, auth_headers, store):
+    task_id = create(client, auth_headers, "create").get_json()["id"]
+
+    def twice(method, url, **kwargs):
+        headers = {**auth_headers, "Idempotency-Key": f"{method} {url}"}
+        first = client.open(url, method=method, headers=headers, **kwargs)
+        second = client.open(url, method=method, headers=headers, **kwargs)
+        assert second.headers.get("Idempotent-Replayed") == "true"
+        assert second.get_json() == first.get_json()
+        return second.get_json()
+
+    # Toggled once, not back again by the retry
+    assert twice("PATCH", f"/api/tasks/{task_id}/done/") == {"done": True}
+    twice("PATCH", f"/api/tasks/{task_id}/", json={"name": "x", "description": ""})
+    twice(
+        "POST",
+        "/api/tasks/batch",
+        json={"operations": [{"op": "create", "name": "y", "description": ""}]},
+    )
+    twice("POST", "/api/tasks/import", data='{"name": "z", "description": ""}\n')
+    twice("DELETE", f"/api/tasks/{task_id}/delete/")
+
+    assert sorted(task.name for task in db.session.query(Task)) == ["y", "z"]
+
+
+def test_key_reused_for_a_different_request(client, auth_headers, store):
+    create(client, auth_headers, "k1", name="a")
+    response = create(client, auth_headers, "k1", name="changed")
+
+    assert response.status_code == 422
+    assert db.session.query(Task).count() == 1
+
+
+def test_keys_are_scoped_per_user(client, auth_headers, user, store):
+    other = User(
+        username="otheruser",
+        email="other@example.com",
+        password=generate_password_hash("pass"),
+    )
+    db.session.add(other)
+    db.session.commit()
+    other_headers = {
+        "Authorization": f"Bearer {create_access_token(identity=str(other.id))}"
+    }
+
+    create(client, auth_headers, "shared")
+    response = create(client, other_headers, "shared")
+
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert db.session.query(Task).count() == 2
+
+
+def test_key_in_use_gets_409(client, auth_headers, user, store):
+    store.backend.claim(user.id, "busy", "fingerprint", 60)
+
+    response = create(client, auth_headers, "busy")
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert db.session.query(Task).count() == 0
+
+
+def test_failed_requests_release_the_key(app, client, auth_headers, store):
+    calls = []
+
+    @jwt_required()
+    @idempotent()
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return {"calls": len(calls)}, 201
+
+    app.add_url_rule("/flaky", "flaky", flaky, methods=["POST"])
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    headers = {**auth_headers, "Idempotency-Key": "retry-me"}
+
+    assert client.post("/flaky", headers=headers).status_code == 500
+    assert client.post("/flaky", headers=headers).get_json() == {"calls": 2}
+    assert client.post("/flaky", headers=headers).get_json() == {"calls": 2}
+
+
+def test_expired_keys_can_be_used_again(client, auth_headers, user):
+    create(client, auth_headers, "old")
+    db.session.query(IdempotencyKey).update(
+        {"expires_at": datetime.now() - timedelta(seconds=1)}
+    )
+    db.session.commit()
+
+    response = create(client, auth_headers, "old")
+
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert db.session.query(Task).count() == 2
+    assert db.session.query(IdempotencyKey).count() == 1
+
+
+def test_response_commits_with_the_write(client, auth_headers, user):
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(db.engine, "commit", on_commit)
+    try:
+        create(client, auth_headers, "k1")
+    finally:
+        event.remove(db.engine, "commit", on_commit)
+
+    # The claim, then the task and its stored response together
+    assert len(commits) == 2
+    assert db.session.get(IdempotencyKey, (user.id, "k1")).status == 201
+
+
+def test_deleted_user_gets_401_not_a_stuck_key(client, auth_headers, user):
+    db.session.execute(text("PRAGMA foreign_keys=ON"))
+    db.session.delete(user)
+    db.session.commit()
+
+    for _ in range(2):
+        assert create(client, auth_headers, "k1").status_code == 401
+    assert db.session.query(IdempotencyKey).count() == 0
+
+
+def test_invalid_keys_and_no_key(client, auth_headers, store):
+    assert create(client, auth_headers, "").status_code == 400
+    assert create(client, auth_headers, "x" * 256).status_code == 400
+
+    for _ in range(2):
+        client.post(
+            "/api/tasks/", json={"name": "a", "description": ""}, headers=auth_headers
+        )
+    assert db.session.query(Task).count() == 2
+
+
+def test_memory_backend_evicts_oldest_and_expired():
+    backend = MemoryIdempotencyBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        backend.claim(1, key, "f", 60)
+
+    assert len(backend) == 2
+    # "a" was evicted, so it can be claimed afresh
+    assert backend.claim(1, "a", "f", 60) is None
+
+    backend.claim(1, "gone", "f", -1)
+    assert backend.purge() == 1
+    assert backend.claim(1, "gone", "f", 60) is None
+
+
+def test_idempotency_stats(client, auth_headers):
+    create(client, auth_headers, "k1")
+    create(client, auth_headers, "k1")
+
+    res = client.get("/api/health/idempotency")
+
+    assert res.status_code == 200
+    assert res.get_json()["replays"] == 1
+
+
+def test_import_failing_partway_keeps_its_key(
+    app, client, auth_headers, store, monkeypatch
+):
+    app.config["TASKS_IMPORT_CHUNK_SIZE"] = 2
+    insert_chunk = task_routes.insert_import_chunk
+    calls = []
+
+    def fail_second_chunk(user_id, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("database went away")
+        return insert_chunk(user_id, rows)
+
+    monkeypatch.setattr(task_routes, "insert_import_chunk", fail_second_chunk)
+    body = "".join(f'{{"name": "t{i}", "description": ""}}\n' for i in range(5))
+    headers = {**auth_headers, "Idempotency-Key": "import"}
+
+    first = client.post("/api/tasks/import", headers=headers, data=body)
+    second = client.post("/api/tasks/import", headers=headers, data=body)
+
+    assert first.status_code == second.status_code == 500
+    assert first.get_json()["accepted"] == 2
+    assert first.get_json()["failed_line"] == 3
+    assert second.get_json() == first.get_json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    # The retry didn't import the first chunk again
+    assert len(calls) == 2
+    assert sorted(task.name for task in db.session.query(Task)) == ["t0", "t1"]
@@ -0,0 +1,103 @@
+from focus_flow_app.__init__app import db
+from focus_flow_app.identity import CachedUser, IdentityCache, load_user
+from focus_flow_app.models import Task
+
+
+def add_task(user):
+    task = Task(user_id=user.id, name="identityTask", description="test", done=False)
+    db.session.add(task)
+    db.session.commit()
+    return task.id
+
+
+def test_identity_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("focus_flow_app.identity.time.monotonic", lambda: now[0])
+
+    cache = IdentityCache(ttl=5)
+    cache.set(CachedUser(1, "name", "email"))
+    assert cache.get(1) == CachedUser(1, "name", "email")
+
+    now[0] += 6
+    assert cache.get(1) is None
+
+
+def test_identity_cache_evicts_least_recently_used():
+    cache = IdentityCache(ttl=60, maxsize=2)
+    for user_id in (1, 2):
+        cache.set(CachedUser(user_id, "name", "email"))
+
+    cache.get(1)
+    cache.set(CachedUser(3, "name", "email"))
+
+    assert cache.get(1) is not None
+    assert cache.get(2) is None
+    assert cache.get(3) is not None
+
+
+def test_task_routes_take_one_round_trip(client, auth_headers, user, query_counter):
+    task_id = add_task(user)
+
+    # Once the list is cached the version lookup doubles as the user check
+    client.get("/api/tasks/", headers=auth_headers)
+
+    query_counter.clear()
+    assert client.get("/api/tasks/", headers=auth_headers).status_code == 200
+    assert len(query_counter) == 1
+
+    # Writes never read the user, claiming the change version is the check
+    query_counter.clear()
+    response = client.post(
+        "/api/tasks/", headers=auth_headers, json={"name": "a", "description": "b"}
+    )
+    assert response.status_code == 201
+    assert not any(statement.startswith("SELECT") for statement in query_counter)
+
+    query_counter.clear()
+    response = client.delete(f"/api/tasks/{task_id}/delete/", headers=auth_headers)
+    assert response.status_code == 200
+    assert not any(statement.startswith("SELECT") for statement in query_counter)
+
+
+def test_load_user_uses_cache(app, user, query_counter):
+    expected = CachedUser(user.id, user.username, user.email)
+
+    query_counter.clear()
+    assert load_user(expected.id) == expected
+    assert load_user(user.id) is not None
+    assert len(query_counter) == 1
+
+
+def test_disabled_cache_checks_user_every_time(app, user, query_counter):
+    app.extensions["identity_cache"].ttl = 0
+    user_id = user.id
+
+    query_counter.clear()
+    load_user(user_id)
+    load_user(user_id)
+    assert len(query_counter) == 2
+
+
+def test_deleted_user_keeps_401_and_404(client, auth_headers, user):
+    task_id = add_task(user)
+    client.get("/api/tasks/", headers=auth_headers)
+
+    db.session.delete(db.session.get(Task, task_id))
+    db.session.delete(user)
+    db.session.commit()
+
+    assert client.get("/api/tasks/", headers=auth_headers).status_code == 401
+    assert (
+        client.delete(f"/api/tasks/{task_id}/delete/", headers=auth_headers).status_code
+        == 401
+    )
+    assert (
+        client.post(
+            "/api/tasks/", headers=auth_headers, json={"name": "a", "description": "b"}
+        ).status_code
+        == 404
+    )
+    assert (
+        client.patch(f"/api/tasks/{task_id}/done/", headers=auth_headers).status_code
+        == 404
+    )
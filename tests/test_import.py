@@ -0,0 +1,102 @@
+import json
+
+from sqlalchemy import func, select
+
+from focus_flow_app.__init__app import db
+from focus_flow_app.models import Task
+
+
+def task_count():
+    return db.session.scalar(select(func.count(Task.id)))
+
+
+def ndjson(*rows):
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+def test_import_requires_auth(client, dbf):
+    assert client.post("/api/tasks/import", data=b"").status_code == 401
+
+
+def test_import_ndjson(client, auth_headers, user):
+    body = ndjson(
+        {"name": "one", "description": "first"},
+        {"name": "two", "description": "second", "done": True},
+    )
+
+    response = client.post(
+        "/api/tasks/import",
+        headers=auth_headers,
+        data=body,
+        content_type="application/x-ndjson",
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {"accepted": 2, "rejected": 0, "errors": []}
+    tasks = client.get("/api/tasks/", headers=auth_headers).get_json()
+    assert sorted((task["name"], task["done"]) for task in tasks) == [
+        ("one", False),
+        ("two", True),
+    ]
+
+
+def test_import_csv_round_trips_export(client, auth_headers, user):
+    client.post(
+        "/api/tasks/", headers=auth_headers, json={"name": "a, b", "description": "c"}
+    )
+    exported = client.get("/api/tasks/export?format=csv", headers=auth_headers).data
+
+    response = client.post(
+        "/api/tasks/import",
+        headers=auth_headers,
+        data=exported,
+        content_type="text/csv",
+    )
+
+    assert response.get_json()["accepted"] == 1
+    names = [
+        task["name"]
+        for task in client.get("/api/tasks/", headers=auth_headers).get_json()
+    ]
+    assert names == ["a, b", "a, b"]
+
+
+def test_import_reports_rejected_rows(client, auth_headers, user):
+    body = b"\n".join(
+        [
+            b'{"name": "ok", "description": "fine"}',
+            b"not json",
+            b'{"name": "no description"}',
+            b'{"name": "bad done", "description": "x", "done": "maybe"}',
+            json.dumps({"name": "x" * 201, "description": "long"}).encode(),
+        ]
+    )
+
+    data = client.post("/api/tasks/import", headers=auth_headers, data=body).get_json()
+
+    assert data["accepted"] == 1
+    assert data["rejected"] == 4
+    assert [error["line"] for error in data["errors"]] == [2, 3, 4, 5]
+    assert task_count() == 1
+
+
+def test_import_commits_per_chunk(app, client, auth_headers, user, query_counter):
+    app.config["TASKS_IMPORT_CHUNK_SIZE"] = 10
+    body = ndjson(*({"name": f"t{i}", "description": ""} for i in range(25)))
+
+    client.get("/api/tasks/export", headers=auth_headers)
+    query_counter.clear()
+    data = client.post("/api/tasks/import", headers=auth_headers, data=body).get_json()
+
+    assert data["accepted"] == 25
+    assert task_count() == 25
+    inserts = [stmt for stmt in query_counter if stmt.startswith("INSERT INTO task")]
+    assert len(inserts) == 3
+
+
+def test_import_rejects_bad_encoding(client, auth_headers, user):
+    response = client.post(
+        "/api/tasks/import", headers=auth_headers, data=b'{"name": "\xff"}'
+    )
+    assert response.status_code == 400
+    assert task_count() == 0
@@ -0,0 +1,239 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from config import TestingConfig, config_map
+from focus_flow_app.__init__app import create_app, db
+from focus_flow_app.maintenance import (
+    FileLeaderLock,
+    Job,
+    MaintenanceScheduler,
+    compact_tombstones,
+    purge_done_tasks,
+)
+from focus_flow_app.metrics import labels
+from focus_flow_app.models import IdempotencyKey, Task, TaskTombstone, User
+
+
+def add_tasks(user, *specs):
+    """(done, days old) per task, returns their ids"""
+    now = datetime.now()
+    tasks = [
+        Task(
+            name=f"t{i}",
+            description="",
+            done=done,
+            date=now - timedelta(days=age),
+            user_id=user.id,
+        )
+        for i, (done, age) in enumerate(specs)
+    ]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return [task.id for task in tasks]
+
+
+def make_user(name="testinguser"):
+    user = User(username=name, email=f"{name}@example.com", password="x")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def maintenance_app(monkeypatch, tmp_path):
+    class MaintenanceConfig(TestingConfig):
+        MAINTENANCE_ENABLED = True
+        MAINTENANCE_LOCK_FILE = str(tmp_path / "maintenance.lock")
+        # The tests call run_pending themselves
+        MAINTENANCE_POLL_INTERVAL = 3600
+        TASK_RETENTION_DAYS = 30
+        MAINTENANCE_CHUNK_SIZE = 2
+        MAINTENANCE_CHUNK_PAUSE = 0
+
+    monkeypatch.setitem(config_map, "maintenance_testing", MaintenanceConfig)
+    app = create_app("maintenance_testing")
+    with app.app_context():
+        db.create_all()
+        yield app
+        app.extensions["maintenance"].stop()
+        app.extensions["maintenance"].lock.release()
+        db.drop_all()
+
+
+def test_old_done_tasks_are_purged_in_chunks(client, user, auth_headers, query_counter):
+    old_done = add_tasks(user, (True, 40), (True, 31), (True, 90))
+    kept = add_tasks(user, (False, 40), (True, 5))
+    other = make_user("other")
+    other_done = add_tasks(other, (True, 60))
+    # As if the tasks had been written through the API
+    version = user.task_version = 5
+    db.session.commit()
+
+    query_counter.clear()
+    assert purge_done_tasks(30, chunk_size=2, pause=0) == 4
+    deletes = [s for s in query_counter if s.startswith("DELETE FROM task ")]
+
+    # Two chunks of at most two tasks, one delete per user in each
+    assert len(deletes) == 3
+    remaining = db.session.scalars(db.select(Task.id).order_by(Task.id)).all()
+    assert remaining == kept
+    assert sorted(db.session.scalars(db.select(TaskTombstone.task_id))) == sorted(
+        old_done + other_done
+    )
+
+    # Delta sync reports them like any other delete
+    changes = client.get(
+        f"/api/tasks/changes?since={version}", headers=auth_headers
+    ).get_json()
+    assert sorted(changes["deleted"]) == old_done
+    assert changes["changed"] == []
+    # A full sync has nothing to delete and skips the tombstones
+    full = client.get("/api/tasks/changes?since=0", headers=auth_headers).get_json()
+    assert full["deleted"] == []
+
+
+def test_reopened_tasks_are_not_purged(user):
+    (task_id,) = add_tasks(user, (True, 40))
+    db.session.get(Task, task_id).done = False
+    db.session.commit()
+
+    assert purge_done_tasks(30, chunk_size=10, pause=0) == 0
+    assert db.session.get(Task, task_id) is not None
+
+
+def test_old_tombstones_are_compacted_behind_a_horizon(client, user, auth_headers):
+    tasks = [
+        client.post(
+            "/api/tasks/", json={"name": name, "description": ""}, headers=auth_headers
+        ).get_json()
+        for name in ("a", "b", "c")
+    ]
+    for task in tasks:
+        client.delete(f"/api/tasks/{task['id']}/delete/", headers=auth_headers)
+    # Versions 4 and 5 deleted a and b 40 days ago, 6 deleted c just now
+    db.session.execute(
+        db.update(TaskTombstone)
+        .where(TaskTombstone.version < 6)
+        .values(deleted_at=datetime.now() - timedelta(days=40))
+    )
+    db.session.commit()
+
+    assert compact_tombstones(30, chunk_size=1, pause=0) == 2
+    assert db.session.scalars(db.select(TaskTombstone.version)).all() == [6]
+    db.session.refresh(user)
+    assert user.tombstone_horizon == 5
+
+    # Resuming from before the horizon would miss a delete, the client has
+    # to start over from 0
+    stale = client.get("/api/tasks/changes?since=3", headers=auth_headers)
+    assert stale.status_code == 409
+    assert stale.get_json()["version"] == 6
+    resumed = client.get("/api/tasks/changes?since=5", headers=auth_headers)
+    assert resumed.get_json()["deleted"] == [tasks[2]["id"]]
+
+    # Nothing left old enough, the walk stops at the first young tombstone
+    assert compact_tombstones(30, chunk_size=1, pause=0) == 0
+
+
+def test_only_one_process_holds_the_leader_lock(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    first, second = FileLeaderLock(path), FileLeaderLock(path)
+
+    assert first.acquire()
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_scheduler_runs_due_jobs_and_records_them(maintenance_app):
+    user = make_user()
+    add_tasks(user, (True, 40), (True, 40), (True, 40), (False, 40))
+    db.session.add(
+        IdempotencyKey(
+            user_id=user.id,
+            key="old",
+            fingerprint="f",
+            expires_at=datetime.now() - timedelta(seconds=1),
+        )
+    )
+    db.session.commit()
+    scheduler = maintenance_app.extensions["maintenance"]
+
+    assert scheduler.run_pending() == [
+        "done_tasks",
+        "tombstones",
+        "idempotency_keys",
+        "database_upkeep",
+    ]
+    # Nothing is due again until its interval has passed
+    assert scheduler.run_pending() == []
+
+    assert db.session.query(Task).count() == 1
+    assert db.session.query(IdempotencyKey).count() == 0
+
+    stats = maintenance_app.test_client().get("/api/health/maintenance").get_json()
+    assert stats["backend"] == "file"
+    assert stats["leader"] is True
+    assert stats["jobs"]["done_tasks"]["rows"] == 3
+    assert stats["jobs"]["idempotency_keys"]["rows"] == 1
+    assert stats["jobs"]["database_upkeep"]["last_error"] is None
+
+    registry = maintenance_app.extensions["metrics"]
+    rows = registry.counters["focusflow_maintenance_rows_total"]
+    assert rows[labels(job="done_tasks")] == 3
+    durations = registry.histograms["focusflow_maintenance_job_duration_seconds"]
+    assert sum(durations[labels(job="database_upkeep")][:-1]) == 1
+
+    metrics = maintenance_app.test_client().get("/metrics").get_data(as_text=True)
+    assert "focusflow_maintenance_leader 1" in metrics
+
+
+def test_only_the_leader_runs_jobs(maintenance_app):
+    scheduler = maintenance_app.extensions["maintenance"]
+    other = FileLeaderLock(scheduler.lock.path)
+    assert other.acquire()
+
+    assert scheduler.run_pending() == []
+    assert scheduler.stats()["leader"] is False
+    other.release()
+
+
+def test_a_failing_job_is_recorded_and_the_rest_still_run(maintenance_app, tmp_path):
+    def broken():
+        raise RuntimeError("boom")
+
+    scheduler = MaintenanceScheduler(
+        maintenance_app,
+        [Job("broken", 60, broken), Job("working", 60, lambda: 2)],
+        FileLeaderLock(str(tmp_path / "other.lock")),
+        poll_interval=60,
+    )
+
+    assert scheduler.run_pending() == ["broken", "working"]
+    jobs = scheduler.stats()["jobs"]
+    assert jobs["broken"]["failures"] == 1
+    assert jobs["broken"]["last_error"] == "RuntimeError: boom"
+    assert jobs["working"]["rows"] == 2
+    failures = maintenance_app.extensions["metrics"].counters[
+        "focusflow_maintenance_job_failures_total"
+    ]
+    assert failures == {labels(job="broken"): 1}
+    scheduler.lock.release()
+
+
+def test_disabled_in_testing(client):
+    assert client.get("/api/health/maintenance").get_json() == {"backend": "none"}
+
+
+def test_scheduler_starts_with_the_first_request(maintenance_app):
+    user = make_user()
+    token = create_access_token(identity=str(user.id))
+    response = maintenance_app.test_client().get(
+        "/api/tasks/", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert maintenance_app.extensions["maintenance"]._thread_pid is not None
@@ -0,0 +1,86 @@
+import json
+import os
+
+from focus_flow_app.metrics import LATENCY_BUCKETS, MetricsRegistry, labels, render
+
+
+def scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    return response.get_data(as_text=True)
+
+
+def test_requests_and_queries_are_recorded(client, auth_headers):
+    assert client.get("/api/tasks/", headers=auth_headers).status_code == 200
+    client.get("/nope")
+
+    text = scrape(client)
+    series = labels(blueprint="tasks", endpoint="tasks.get_tasks")
+
+    assert (
+        "focusflow_http_requests_total{"
+        + labels(
+            blueprint="tasks", endpoint="tasks.get_tasks", method="GET", status=200
+        )
+        + "} 1"
+    ) in text
+    assert (
+        "focusflow_http_requests_total{"
+        + labels(blueprint="", endpoint="unmatched", method="GET", status=404)
+        + "} 1"
+    ) in text
+    assert f"focusflow_http_request_duration_seconds_count{{{series}}} 1" in text
+    assert f"focusflow_http_response_size_bytes_count{{{series}}} 1" in text
+    # Version check for the cache, then the list itself
+    assert f'focusflow_db_queries_per_request_bucket{{{series},le="1"}} 0' in text
+    assert f'focusflow_db_queries_per_request_bucket{{{series},le="2"}} 1' in text
+    assert f"focusflow_db_query_seconds_total{{{series}}}" in text
+    assert f'focusflow_task_cache_events_total{{{labels(event="miss")}}} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    for value in (0.001, 0.02, 0.02, 20):
+        registry.observe(
+            "focusflow_http_request_duration_seconds",
+            'endpoint="x"',
+            LATENCY_BUCKETS,
+            value,
+        )
+    lines = render(registry.snapshot()).splitlines()
+    name = "focusflow_http_request_duration_seconds"
+
+    assert f"# TYPE {name} histogram" in lines
+    assert f'{name}_bucket{{endpoint="x",le="0.005"}} 1' in lines
+    assert f'{name}_bucket{{endpoint="x",le="0.025"}} 3' in lines
+    assert f'{name}_bucket{{endpoint="x",le="10.0"}} 3' in lines
+    assert f'{name}_bucket{{endpoint="x",le="+Inf"}} 4' in lines
+    assert f'{name}_count{{endpoint="x"}} 4' in lines
+
+
+def test_snapshots_from_all_workers_are_added_up(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.inc("focusflow_http_requests_total", 'endpoint="x"', 2)
+    pool = {"focusflow_db_pool_connections": {'state="checked_out"': 1}}
+
+    def write(pid, checked_out):
+        snapshot = {
+            "counters": {"focusflow_http_requests_total": {'endpoint="x"': 3}},
+            "histograms": {},
+            "collected": {
+                "focusflow_db_pool_connections": {'state="checked_out"': checked_out}
+            },
+        }
+        (tmp_path / f"metrics-{pid}.json").write_text(json.dumps(snapshot))
+
+    # A live worker (our parent stands in for it) and one that has exited
+    write(os.getppid(), 2)
+    write(2**22 + 1, 5)
+
+    merged = registry.collect(pool)
+    assert merged["counters"]["focusflow_http_requests_total"] == {'endpoint="x"': 8}
+    assert merged["collected"]["focusflow_db_pool_connections"] == {
+        'state="checked_out"': 3
+    }
+    assert (tmp_path / f"metrics-{os.getpid()}.json").exists()
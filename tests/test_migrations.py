@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def flask_db(database, *args):
+    # The CLI in its own process, as it runs for real: development config,
+    # SQLite pragmas included, and env.py's logging setup kept out of ours
+    env = {
+        **os.environ,
+        "FLASK_APP": "run.py",
+        "FLASK_CONFIG": "development",
+        "DEV_DATABASE_URL": f"sqlite:///{database}",
+    }
+    return subprocess.run(
+        [sys.executable, "-m", "flask", "db", *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_downgrade_and_upgrade_with_data(tmp_path):
+    database = tmp_path / "app.db"
+    assert flask_db(database, "upgrade").returncode == 0
+    with sqlite3.connect(database) as conn:
+        conn.execute(
+            "INSERT INTO user (id, username, email, password) "
+            "VALUES (1, 'u', 'u@example.com', 'x')"
+        )
+        conn.execute(
+            "INSERT INTO task (user_id, name, description, done, date) "
+            "VALUES (1, 'kept', '', 0, '2025-01-01 09:00:00')"
+        )
+
+    # Rebuilds user and task through batch_alter_table on the way down,
+    # which foreign keys being enforced would get in the way of
+    down = flask_db(database, "downgrade", "7c2d9a41f0b3")
+    assert down.returncode == 0, down.stderr
+    up = flask_db(database, "upgrade")
+    assert up.returncode == 0, up.stderr
+
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("SELECT name, user_id FROM task").fetchall() == [
+            ("kept", 1)
+        ]
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from focus_flow_app.models import Task
+from focus_flow_app.__init__app import db
+from focus_flow_app.pagination import decode_cursor, encode_cursor
+
+
+def seed_tasks(user, count):
+    start = datetime(2025, 1, 1, 9, 0)
+    tasks = [
+        Task(
+            user_id=user.id,
+            name=f"task{i}",
+            description="paged",
+            done=False,
+            # Pairs of tasks share a timestamp so the id tiebreak gets exercised
+            date=start + timedelta(minutes=i // 2),
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return tasks
+
+
+def test_cursor_round_trip():
+    date = datetime(2025, 3, 4, 5, 6, 7, 891011)
+    assert decode_cursor(encode_cursor(date, 42)) == (date, 42)
+
+
+def test_unpaginated_shape_is_unchanged(client, auth_headers, dbf, user):
+    seed_tasks(user, 3)
+
+    response = client.get("/api/tasks/", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert isinstance(response.get_json(), list)
+    assert len(response.get_json()) == 3
+
+
+def test_paginate_through_all_tasks(client, auth_headers, dbf, user):
+    tasks = seed_tasks(user, 7)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        url = "/api/tasks/?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert len(data["tasks"]) <= 3
+        seen.extend(task["id"] for task in data["tasks"])
+        pages += 1
+
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert seen == [task.id for task in tasks]
+
+
+def test_limit_is_clamped_to_max(app, client, auth_headers, dbf, user):
+    app.config["TASKS_MAX_PAGE_SIZE"] = 2
+    seed_tasks(user, 5)
+
+    data = client.get("/api/tasks/?limit=100", headers=auth_headers).get_json()
+
+    assert len(data["tasks"]) == 2
+    assert data["next_cursor"] is not None
+
+
+def test_invalid_pagination_args(client, auth_headers, dbf, user):
+    assert (
+        client.get("/api/tasks/?cursor=garbage", headers=auth_headers).status_code
+        == 400
+    )
+    assert client.get("/api/tasks/?limit=0", headers=auth_headers).status_code == 400
+    assert client.get("/api/tasks/?limit=abc", headers=auth_headers).status_code == 400
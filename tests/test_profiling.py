@@ -0,0 +1,59 @@
+import logging
+
+from focus_flow_app.models import Task, db
+
+
+def test_header_enables_profiling(client, auth_headers):
+    plain = client.get("/api/tasks/", headers=auth_headers)
+    assert "X-SQL-Queries" not in plain.headers
+
+    profiled = client.get("/api/tasks/", headers={**auth_headers, "X-Profile-SQL": "1"})
+    assert profiled.headers["X-SQL-Queries"] == "1"
+    assert float(profiled.headers["X-SQL-Time-Ms"]) >= 0
+    assert profiled.headers["Server-Timing"].startswith("sql;dur=")
+
+
+def test_query_counts_per_endpoint(client, auth_headers, sql_profile):
+    created = client.post(
+        "/api/tasks/", headers=auth_headers, json={"name": "a", "description": ""}
+    )
+    task_id = created.get_json()["id"]
+    client.get("/api/tasks/", headers=auth_headers)
+    client.patch(f"/api/tasks/{task_id}/done/", headers=auth_headers)
+
+    counts = {profile.endpoint: profile.count for profile in sql_profile}
+    # Claim a version and insert
+    assert counts["tasks.add_tasks"] == 2
+    # Cached version check then the list
+    assert counts["tasks.get_tasks"] == 2
+    assert counts["tasks.completed_tasks"] == 2
+
+    sites = [site for _, _, site in sql_profile[1].statements]
+    assert all(site.startswith("routes/task_routes.py:") for site in sites)
+
+
+def test_budget_and_repeated_statements_are_flagged(
+    app, client, auth_headers, user, sql_profile, caplog
+):
+    def lazy_loop():
+        # The classic N+1, one query per task
+        ids = db.session.scalars(db.select(Task.id)).all()
+        for task_id in ids:
+            db.session.get(Task, task_id, populate_existing=True)
+        return {"count": len(ids)}
+
+    app.add_url_rule("/loop", "loop", lazy_loop)
+    app.extensions["sql_profiler"].budget = 3
+    for i in range(4):
+        db.session.add(Task(name=f"t{i}", description="", user_id=user.id))
+    db.session.commit()
+
+    with caplog.at_level(logging.WARNING):
+        response = client.get("/loop")
+
+    assert response.headers["X-SQL-Budget-Exceeded"] == "3"
+    assert "over the budget of 3" in caplog.text
+    assert "ran the same statement 4 times" in caplog.text
+    [(statement, count, _)] = sql_profile[0].repeated(3)
+    assert count == 4
+    assert statement.startswith("SELECT task.id")
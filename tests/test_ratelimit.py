@@ -0,0 +1,104 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from focus_flow_app.models import User, db
+from focus_flow_app.ratelimit import (
+    MemoryRateLimitBackend,
+    RedisRateLimitBackend,
+    parse_limit,
+    refill,
+)
+
+
+def login(client, email="test@example.com", password="password123", ip="10.0.0.1"):
+    return client.post(
+        "/api/auth/login",
+        json={"email": email, "password": password},
+        environ_base={"REMOTE_ADDR": ip},
+    )
+
+
+def test_parse_limit():
+    assert parse_limit("5/60") == (5, 5 / 60)
+    assert parse_limit("10") == (10, 10.0)
+    with pytest.raises(ValueError):
+        parse_limit("0/60")
+
+
+def test_refill_takes_and_refills_tokens():
+    allowed, state, _ = refill(None, burst=2, rate=1.0, now=0.0)
+    assert allowed and state == (1.0, 0.0)
+    allowed, state, _ = refill(state, 2, 1.0, 0.0)
+    assert allowed and state == (0.0, 0.0)
+
+    allowed, state, retry_after = refill(state, 2, 1.0, 0.25)
+    assert not allowed and retry_after == pytest.approx(0.75)
+
+    # Never refills past the burst size
+    allowed, state, _ = refill(state, 2, 1.0, 100.0)
+    assert allowed and state == (1.0, 100.0)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, fake_redis):
+    if request.param == "memory":
+        return MemoryRateLimitBackend(max_keys=100)
+    return RedisRateLimitBackend(fake_redis)
+
+
+def test_backend_limits_each_key(backend):
+    assert [backend.take("a", 2, 0.001)[0] for _ in range(3)] == [True, True, False]
+    assert backend.take("b", 2, 0.001)[0]
+
+
+def test_memory_backend_evicts_idle_keys():
+    backend = MemoryRateLimitBackend(max_keys=2)
+    backend.take("a", 1, 0.001)
+    backend.take("b", 1, 0.001)
+    backend.take("a", 1, 0.001)
+    backend.take("c", 1, 0.001)
+
+    assert list(backend._buckets) == ["a", "c"]
+    # "b" was dropped so it starts over from a full bucket
+    assert backend.take("b", 1, 0.001)[0]
+
+
+def test_login_is_limited_per_email_before_the_lookup(client, user, query_counter):
+    for i in range(5):
+        assert login(client, password="wrong", ip=f"10.0.0.{i}").status_code == 200
+
+    query_counter.clear()
+    response = login(client, ip="10.0.0.99")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert query_counter == []
+
+    # Other accounts aren't affected
+    db.session.add(
+        User(
+            username="other",
+            email="other@example.com",
+            password=generate_password_hash("pw", "pbkdf2:sha256:1000"),
+        )
+    )
+    db.session.commit()
+    assert login(client, "other@example.com", "pw", ip="10.0.0.99").status_code == 200
+
+    stats = client.get("/api/health/ratelimit").get_json()
+    assert stats["rejected"] == {"login_per_email": 1}
+    assert stats["rejected_total"] == 1
+
+
+def test_login_is_limited_per_ip(client, user):
+    statuses = [
+        login(client, email=f"nobody{i}@example.com").status_code for i in range(21)
+    ]
+    assert statuses[:20] == [401] * 20
+    assert statuses[20] == 429
+    assert login(client, ip="10.0.0.2").status_code == 200
+
+
+def test_refresh_is_limited_before_the_token_check(client, dbf):
+    statuses = [client.post("/api/auth/refresh").status_code for _ in range(31)]
+    assert set(statuses[:30]) == {401}
+    assert statuses[30] == 429
@@ -0,0 +1,129 @@
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+from werkzeug.security import generate_password_hash
+
+from focus_flow_app.__init__app import db
+from focus_flow_app.models import Task, User
+from focus_flow_app.search import search_query, search_terms
+
+
+def add_task(user, name, description=""):
+    task = Task(
+        user_id=user.id,
+        name=name,
+        description=description,
+        done=False,
+        date=datetime(2025, 1, 1, 9, 0),
+    )
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+
+def search(client, headers, q, **args):
+    response = client.get(
+        "/api/tasks/search", query_string={"q": q, **args}, headers=headers
+    )
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def names(data):
+    return [task["name"] for task in data["tasks"]]
+
+
+def test_search_matches_word_prefixes(client, auth_headers, user):
+    add_task(user, "Buy groceries", "milk and eggs")
+    add_task(user, "Call the plumber")
+
+    assert names(search(client, auth_headers, "groc")) == ["Buy groceries"]
+    assert names(search(client, auth_headers, "EGG")) == ["Buy groceries"]
+    # Every word has to match
+    assert names(search(client, auth_headers, "buy plumb")) == []
+
+
+def test_name_hits_rank_before_description_hits(client, auth_headers, user):
+    add_task(user, "Weekly review", "go over the report")
+    add_task(user, "Finish the report", "for the weekly review")
+
+    assert names(search(client, auth_headers, "report")) == [
+        "Finish the report",
+        "Weekly review",
+    ]
+
+
+def test_search_only_sees_own_tasks(client, auth_headers, user):
+    other = User(
+        username="otheruser",
+        email="other@example.com",
+        password=generate_password_hash("pass"),
+    )
+    db.session.add(other)
+    db.session.commit()
+    add_task(other, "Secret plans")
+    add_task(user, "Public plans")
+
+    assert names(search(client, auth_headers, "plans")) == ["Public plans"]
+
+
+def test_index_follows_updates_and_deletes(client, auth_headers, user):
+    task = add_task(user, "Draft letter")
+
+    task.name = "Send letter"
+    db.session.commit()
+    assert names(search(client, auth_headers, "draft")) == []
+    assert names(search(client, auth_headers, "send")) == ["Send letter"]
+
+    db.session.delete(task)
+    db.session.commit()
+    assert names(search(client, auth_headers, "letter")) == []
+
+
+def test_search_pages_with_offset(client, auth_headers, user):
+    for i in range(5):
+        add_task(user, f"chore {i}")
+
+    first = search(client, auth_headers, "chore", limit=2)
+    second = search(client, auth_headers, "chore", limit=2, offset=2)
+    last = search(client, auth_headers, "chore", limit=2, offset=4)
+
+    assert first["next_offset"] == 2
+    assert second["next_offset"] == 4
+    assert last["next_offset"] is None
+    assert sorted(names(first) + names(second) + names(last)) == [
+        f"chore {i}" for i in range(5)
+    ]
+
+
+def test_search_rejects_bad_args(client, auth_headers, user):
+    assert client.get("/api/tasks/search", headers=auth_headers).status_code == 400
+    response = client.get("/api/tasks/search?q=x&offset=-1", headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_query_syntax_is_not_passed_through(client, auth_headers, user):
+    add_task(user, "Quote test")
+
+    assert search_terms('"quote" OR name:* -test^') == ["quote", "or", "name", "test"]
+    assert search(client, auth_headers, '"* :()') == {"tasks": [], "next_offset": None}
+    assert names(search(client, auth_headers, 'quote"')) == ["Quote test"]
+
+
+def test_postgres_query_uses_the_indexed_expression():
+    query = search_query("postgresql", 7, ["buy", "milk"], 20, 0)
+    sql = str(
+        query.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+    # Written out exactly as in ix_task_search, so the planner can use it,
+    # and requiring the owner's lexeme
+    assert (
+        "(to_tsvector('simple'::regconfig, (coalesce(task.name, '') || ' ') "
+        "|| coalesce(task.description, '')) "
+        "|| array_to_tsvector(ARRAY['@' || task.user_id :: text])) "
+        "@@ (to_tsquery('simple'::regconfig, 'buy:* & milk:*') "
+        "&& CAST('''@7''' AS TSQUERY))"
+    ) in sql
@@ -0,0 +1,31 @@
+import json
+from datetime import datetime
+
+from focus_flow_app import serializers
+from focus_flow_app.__init__app import db
+from focus_flow_app.models import Task
+
+
+def test_format_date_matches_strftime():
+    date = datetime(2025, 7, 3, 8, 5, 59, 999999)
+    assert serializers.format_date(date) == date.strftime("%Y-%m-%d %H:%M")
+
+
+def test_dumps_with_and_without_orjson(monkeypatch):
+    data = [{"id": 1, "name": "café", "done": False, "description": ""}]
+
+    fast = serializers.dumps(data)
+    monkeypatch.setattr(serializers, "orjson", None)
+    fallback = serializers.dumps(data)
+
+    assert fast.endswith(b"\n") and fallback.endswith(b"\n")
+    assert json.loads(fast) == json.loads(fallback) == data
+
+
+def test_null_description_is_served_as_empty_string(client, auth_headers, user):
+    db.session.add(Task(user_id=user.id, name="no description", done=False))
+    db.session.commit()
+
+    data = client.get("/api/tasks/", headers=auth_headers).get_json()
+
+    assert data[0]["description"] == ""
@@ -0,0 +1,101 @@
+from focus_flow_app.models import User
+
+
+def changes(client, headers, since):
+    response = client.get(f"/api/tasks/changes?since={since}", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def create(client, headers, name):
+    response = client.post(
+        "/api/tasks/", headers=headers, json={"name": name, "description": "sync"}
+    )
+    return response.get_json()["id"]
+
+
+def test_changes_requires_auth(client, dbf):
+    assert client.get("/api/tasks/changes").status_code == 401
+
+
+def test_changes_since_zero_returns_everything(client, auth_headers, user):
+    first = create(client, auth_headers, "first")
+    second = create(client, auth_headers, "second")
+
+    data = changes(client, auth_headers, 0)
+
+    assert data["version"] == 2
+    assert [task["id"] for task in data["changed"]] == [first, second]
+    assert data["deleted"] == []
+
+
+def test_changes_only_returns_newer_writes(client, auth_headers, user):
+    kept = create(client, auth_headers, "kept")
+    toggled = create(client, auth_headers, "toggled")
+    removed = create(client, auth_headers, "removed")
+    since = changes(client, auth_headers, 0)["version"]
+
+    client.patch(f"/api/tasks/{toggled}/done/", headers=auth_headers)
+    client.delete(f"/api/tasks/{removed}/delete/", headers=auth_headers)
+
+    data = changes(client, auth_headers, since)
+    assert data["version"] == since + 2
+    assert [task["id"] for task in data["changed"]] == [toggled]
+    assert data["changed"][0]["done"] is True
+    assert data["deleted"] == [removed]
+    assert kept not in [task["id"] for task in data["changed"]]
+
+    assert changes(client, auth_headers, data["version"]) == {
+        "version": data["version"],
+        "changed": [],
+        "deleted": [],
+    }
+
+
+def test_failed_writes_do_not_bump_version(client, auth_headers, user):
+    client.patch("/api/tasks/999/done/", headers=auth_headers)
+    client.delete("/api/tasks/999/delete/", headers=auth_headers)
+
+    assert changes(client, auth_headers, 0)["version"] == 0
+
+
+def test_batch_writes_share_one_version(client, auth_headers, user):
+    doomed = create(client, auth_headers, "doomed")
+
+    client.post(
+        "/api/tasks/batch",
+        headers=auth_headers,
+        json={
+            "operations": [
+                {"op": "create", "name": "a", "description": "b"},
+                {"op": "delete", "id": doomed},
+            ]
+        },
+    )
+
+    data = changes(client, auth_headers, 1)
+    assert data["version"] == 2
+    assert len(data["changed"]) == 1
+    assert data["deleted"] == [doomed]
+
+
+def test_changes_rejects_bad_since(client, auth_headers, user):
+    assert (
+        client.get("/api/tasks/changes?since=-1", headers=auth_headers).status_code
+        == 400
+    )
+    assert (
+        client.get("/api/tasks/changes?since=abc", headers=auth_headers).status_code
+        == 400
+    )
+
+    response = client.get("/api/tasks/changes?since=50", headers=auth_headers)
+    assert response.status_code == 409
+    assert response.get_json()["version"] == user.task_version == 0
+
+
+def test_deleted_user_gets_401(client, auth_headers, user, dbf):
+    dbf.session.delete(dbf.session.get(User, user.id))
+    dbf.session.commit()
+
+    assert client.get("/api/tasks/changes", headers=auth_headers).status_code == 401
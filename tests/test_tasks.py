@@ -249,3 +249,61 @@ def test_patch_task_done_status(client, user, dbf, auth_headers):
     assert responseFalse.status_code == 200
     assert responseFalse.is_json
     assert responseFalse.get_json()["done"] is False
+
+
+def test_task_mutations_skip_the_select(client, auth_headers, dbf, user, query_counter):
+    task = Task(user_id=user.id, name="oneStatement", description="test", done=False)
+    db.session.add(task)
+    db.session.commit()
+    task_id, old_date = task.id, task.date
+
+    query_counter.clear()
+    response = client.patch(
+        f"/api/tasks/{task_id}/",
+        headers=auth_headers,
+        json={"name": "renamed", "description": "changed"},
+    )
+    assert response.status_code == 200
+    assert response.get_json()["name"] == "renamed"
+    # Claim the change version, then one UPDATE on the task itself
+    assert len(query_counter) == 2
+    assert query_counter[1].startswith("UPDATE task")
+
+    query_counter.clear()
+    response = client.patch(f"/api/tasks/{task_id}/done/", headers=auth_headers)
+    assert response.get_json() == {"done": True}
+    assert len(query_counter) == 2
+
+    db.session.expire_all()
+    assert db.session.get(Task, task_id).date > old_date
+
+    query_counter.clear()
+    response = client.delete(f"/api/tasks/{task_id}/delete/", headers=auth_headers)
+    assert response.status_code == 200
+    # Version, DELETE and the tombstone for delta sync
+    assert len(query_counter) == 3
+    assert query_counter[1].startswith("DELETE")
+
+
+def test_patch_another_users_task(client, dbf, user):
+    userB = User(
+        username="testUserNamePatchTest",
+        email="testUserPatchTest@example.com",
+        password=generate_password_hash("pass"),
+    )
+    task = Task(user_id=user.id, name="notYours", description="test", done=False)
+    db.session.add_all([task, userB])
+    db.session.commit()
+
+    headers_b = {
+        "Authorization": f"Bearer {create_access_token(identity=str(userB.id))}"
+    }
+    response = client.patch(
+        f"/api/tasks/{task.id}/",
+        headers=headers_b,
+        json={"name": "stolen", "description": "stolen"},
+    )
+
+    assert response.status_code == 404
+    db.session.expire_all()
+    assert db.session.get(Task, task.id).name == "notYours"